@@ -2,40 +2,75 @@ from . import elements
 from .html import CustomHTML
 from .markdown import CustomMarkdown
 from .rst import CustomRst
-from .parse import HTMLParser, MDParser, Collection
+from .parse import HTMLParser, MDParser, Collection, html_backends, md_backends
 from .utils import enable_debug_mode
+from . import batch
+from .cache import ParseCache
+from .search import SearchIndex
 import typing as _t
 
+from .parse.decoding import CHUNK_SIZE, decode_chunks, decode_lines
+
 if _t.TYPE_CHECKING:
+    import os
+    from collections.abc import Buffer
+    from concurrent.futures import Executor
+
     class Readable(_t.Protocol):
-        def read(self) -> str: ...
+        def read(self, size:'int'=-1) -> _t.Union[str, bytes]: ...
 
 class HTML:
     @staticmethod
-    def from_string(html:'str'):
-        return elements.Symbol.from_html(html)
+    def from_string(html:'_t.Union[str, Buffer]', zero_copy:'bool'=False, backend:'_t.Optional[str]'=None, encoding:'_t.Optional[str]'=None):
+        return elements.Symbol.from_html(html, zero_copy, backend, encoding)
 
     @staticmethod
-    def from_file(file: 'Readable'):
-        try:
-            text = file.read()
-        except Exception as e:
-            raise IOError(f"Error reading HTML file: {e}")
+    def from_file(file: '_t.Union[Readable, Buffer]', backend:'_t.Optional[str]'=None, encoding:'_t.Optional[str]'=None):
+        """
+        `file` can be opened in text or binary mode, or be `bytes`, a `memoryview` or an `mmap`.
+        Binary input is decoded a chunk at a time with `encoding`, or the encoding declared by
+        its BOM or `<meta charset>`, otherwise UTF-8.
+        """
+        def chunks():
+            try:
+                yield from decode_chunks(file, encoding, html=True, chunk_size=CHUNK_SIZE)
+            except Exception as e:
+                raise IOError(f"Error reading HTML file: {e}")
+
+        return elements.Symbol.from_html_chunks(chunks(), backend)
+
+    @staticmethod
+    def parse_many(sources:'_t.Iterable[_t.Union[str, Buffer, os.PathLike]]', backend:'_t.Optional[str]'=None, processes:'_t.Optional[int]'=None, chunksize:'int'=16, ordered:'bool'=True, executor:'_t.Optional[Executor]'=None) -> '_t.Iterator[_t.Any]':
+        """
+        Parse many HTML documents on a pool of processes, each worker reuses its parser for
+        every document it gets. Yields a list of `batch.TREE`s per source, see `batch.run`
+        and `elements.Symbol.from_tree`. Paths are read by the workers.
+        """
+        return batch.run("html", sources, "tree", backend, processes, chunksize, ordered, executor)
 
-        return elements.Symbol.from_html(text)
+    @staticmethod
+    def render_many(sources:'_t.Iterable[_t.Union[str, Buffer, os.PathLike]]', format:'_t.Literal["html", "md", "rst"]'="html", backend:'_t.Optional[str]'=None, processes:'_t.Optional[int]'=None, chunksize:'int'=16, ordered:'bool'=True, executor:'_t.Optional[Executor]'=None) -> '_t.Iterator[_t.Any]':
+        """
+        Like `parse_many`, but yields each document rendered to `format` by the workers.
+        """
+        return batch.run("html", sources, format, backend, processes, chunksize, ordered, executor)
 
     @staticmethod
-    def from_url(url:'str'):
+    def from_url(url:'str', backend:'_t.Optional[str]'=None):
         try:
             import requests as r
-            text = r.get(url).text
-
-            if text.startswith("<!DOCTYPE html>"):
-                text = text[15:]
+            resp = r.get(url, stream=True)
+            resp.encoding = resp.encoding or "utf-8"
         except Exception as e:
             raise IOError(f"Error reading HTML from URL: {e}")
 
-        ret = elements.Symbol.from_html(text)
+        def chunks():
+            try:
+                yield from resp.iter_content(CHUNK_SIZE, decode_unicode=True)
+            except Exception as e:
+                raise IOError(f"Error reading HTML from URL: {e}")
+
+        ret = elements.Symbol.from_html_chunks(chunks(), backend)
 
         if len(ret) == 1:
             return ret[0]
@@ -44,17 +79,62 @@ class HTML:
 
 class MD:
     @staticmethod
-    def from_string(md:'str'):
-        return elements.Symbol.from_md(md)
+    def from_string(md:'_t.Union[str, Buffer]', zero_copy:'bool'=False, backend:'_t.Optional[str]'=None, encoding:'_t.Optional[str]'=None):
+        return elements.Symbol.from_md(md, zero_copy, backend, encoding)
 
     @staticmethod
-    def from_file(file: 'Readable'):
-        try:
-            text = file.read()
-        except Exception as e:
-            raise IOError(f"Error reading Markdown file: {e}")
+    def document(md:'str', zero_copy:'bool'=False, backend:'_t.Optional[str]'=None):
+        """
+        Parse `md` for editing, e.g. in a live preview. `document.edit(offset, deleted, inserted)`
+        updates `document.blocks` by re-parsing only the blocks the edit touches.
+        """
+        return elements.Symbol.md_document(md, zero_copy, backend)
 
-        return elements.Symbol.from_md(text)
+    @staticmethod
+    def from_file(file: '_t.Union[Readable, Buffer]', backend:'_t.Optional[str]'=None, encoding:'_t.Optional[str]'=None):
+        """
+        `file` can be opened in text or binary mode, or be `bytes`, a `memoryview` or an `mmap`.
+        Binary input is decoded a chunk at a time with `encoding`, or the encoding declared by
+        its BOM, otherwise UTF-8.
+        """
+        def lines():
+            try:
+                yield from decode_lines(file, encoding)
+            except Exception as e:
+                raise IOError(f"Error reading Markdown file: {e}")
+
+        return elements.Symbol.from_md(lines(), backend=backend)
+
+    @staticmethod
+    def iter_file(file: '_t.Union[Readable, Buffer, _t.Iterable[_t.Union[str, bytes]]]', backend:'_t.Optional[str]'=None, encoding:'_t.Optional[str]'=None) -> '_t.Iterator[elements.Symbol]':
+        """
+        Like `from_file`, but yields each top level symbol as soon as its block is finished.
+        `file` can also be any iterable of `str` lines (e.g. a generator) or `bytes` chunks
+        (e.g. a socket reader), so documents of any size are converted in bounded memory.
+        """
+        def lines():
+            try:
+                yield from decode_lines(file, encoding)
+            except Exception as e:
+                raise IOError(f"Error reading Markdown file: {e}")
+
+        return elements.Symbol.iter_md(lines(), backend=backend)
+
+    @staticmethod
+    def parse_many(sources:'_t.Iterable[_t.Union[str, Buffer, os.PathLike]]', backend:'_t.Optional[str]'=None, processes:'_t.Optional[int]'=None, chunksize:'int'=16, ordered:'bool'=True, executor:'_t.Optional[Executor]'=None) -> '_t.Iterator[_t.Any]':
+        """
+        Parse many Markdown documents on a pool of processes, each worker reuses its parser for
+        every document it gets. Yields a list of `batch.TREE`s per source, see `batch.run`
+        and `elements.Symbol.from_tree`. Paths are read by the workers.
+        """
+        return batch.run("md", sources, "tree", backend, processes, chunksize, ordered, executor)
+
+    @staticmethod
+    def render_many(sources:'_t.Iterable[_t.Union[str, Buffer, os.PathLike]]', format:'_t.Literal["html", "md", "rst"]'="html", backend:'_t.Optional[str]'=None, processes:'_t.Optional[int]'=None, chunksize:'int'=16, ordered:'bool'=True, executor:'_t.Optional[Executor]'=None) -> '_t.Iterator[_t.Any]':
+        """
+        Like `parse_many`, but yields each document rendered to `format` by the workers.
+        """
+        return batch.run("md", sources, format, backend, processes, chunksize, ordered, executor)
 
     @staticmethod
     def from_url(url):
@@ -67,4 +147,4 @@ class MD:
         return elements.Symbol.from_md(text)
 
 
-__all__ = ["HTML", "MD", "elements", "Collection", "HTMLParser", "MDParser", "CustomHTML", "CustomMarkdown", "CustomRst", "enable_debug_mode"]
+__all__ = ["HTML", "MD", "elements", "Collection", "HTMLParser", "MDParser", "CustomHTML", "CustomMarkdown", "CustomRst", "ParseCache", "SearchIndex", "enable_debug_mode"]
@@ -0,0 +1,137 @@
+import os
+import threading
+import typing as t
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from itertools import batched
+
+from .elements.symbol import Symbol, SymbolBuilder
+
+if t.TYPE_CHECKING:
+    from .parse import LazyText
+    from .parse.decoding import SOURCE
+    from .parse.typing import Parser
+    from .typing import ATTRS
+
+# An element is `(name, attributes, children)`, text is its content
+TREE = t.Union[str, tuple[str, 'ATTRS', tuple['TREE', ...]]]
+
+OUTPUT = t.Literal["tree", "html", "md", "rst"]
+
+
+class TreeBuilder:
+    """
+    Parser `Builder` making `TREE` tuples, the cheapest form to pickle a parsed document
+    back from another process. `Symbol.from_tree` turns them into symbols.
+    """
+
+    def element(self, name:'str', attributes:'ATTRS', children:'list[TREE]') -> 'TREE':
+        return name, attributes, tuple(children)
+
+    def text(self, content:'t.Union[str, LazyText]') -> 'TREE':
+        return content if isinstance(content, str) else content["content"]
+
+
+# Parsers by `(format, backend, output)`, kept for every document the worker gets. One set
+# per thread, parsers aren't shared between threads.
+_local = threading.local()
+
+
+def get_parser(format:'str', backend:'t.Optional[str]', output:'OUTPUT') -> 'Parser':
+    parsers = getattr(_local, "parsers", None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+
+    key = (format, backend, output)
+    parser = parsers.get(key)
+    if parser is None:
+        backends = Symbol.md_backends if format == "md" else Symbol.html_backends
+        builder = TreeBuilder() if output == "tree" else SymbolBuilder(Symbol.collection)
+        parser = parsers[key] = backends.get_backend(backend)(builder=builder)
+    return parser
+
+
+def work(format:'str', backend:'t.Optional[str]', output:'OUTPUT', sources:'t.Sequence[t.Union[SOURCE, os.PathLike]]') -> 'list[t.Union[list[TREE], str]]':
+    """
+    Parse a chunk of sources in a worker. Paths are opened by the worker, so only the path
+    is sent to it.
+    """
+    parser = get_parser(format, backend, output)
+    results = []
+    for source in sources:
+        if isinstance(source, os.PathLike):
+            with open(source, "rb") as f:
+                nodes = parser.parse(f)
+        else:
+            nodes = parser.parse(source)
+
+        if output == "tree":
+            results.append(nodes)
+        else:
+            # `to_<format>`, some symbols (e.g. text) render themselves. The `None` block of a
+            # Markdown `title:` line renders to nothing.
+            to_format = f"to_{output}"
+            results.append("\n".join(getattr(node, to_format)() for node in nodes if node is not None))
+    return results
+
+
+def run(
+    format:'t.Literal["html", "md"]',
+    sources:'t.Iterable[t.Union[SOURCE, os.PathLike]]',
+    output:'OUTPUT',
+    backend:'t.Optional[str]'=None,
+    processes:'t.Optional[int]'=None,
+    chunksize:'int'=16,
+    ordered:'bool'=True,
+    executor:'t.Optional[Executor]'=None
+) -> 't.Iterator[t.Any]':
+    """
+    Parse every source on a pool of `processes` (all CPUs by default) and yield a `TREE`
+    list for each with `output="tree"`, or its top level symbols rendered to `output` and
+    joined with newlines.
+
+    Sources are sent to the workers `chunksize` at a time and only a few chunks per worker
+    are in flight, so `sources` can be a lazy iterable of any length. Results are yielded in
+    the order of `sources`, or with `ordered=False` as `(index, result)` as they finish.
+
+    Pass an `executor` to keep its workers, and their parsers, between calls.
+    """
+    if executor is None:
+        pool = ProcessPoolExecutor(processes)
+        try:
+            yield from run(format, sources, output, backend, processes, chunksize, ordered, pool)
+        finally:
+            pool.shutdown(cancel_futures=True)
+        return
+
+    window = 4 * (processes or os.cpu_count() or 1)
+    if ordered:
+        queue:'deque[Future]' = deque()
+        for chunk in batched(sources, chunksize):
+            queue.append(executor.submit(work, format, backend, output, chunk))
+            if len(queue) >= window:
+                yield from queue.popleft().result()
+
+        while queue:
+            yield from queue.popleft().result()
+        return
+
+    # The index of every chunk's first source
+    pending:'dict[Future, int]' = {}
+
+    def finished() -> 't.Iterator[tuple[int, t.Any]]':
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            start = pending.pop(future)
+            for i, result in enumerate(future.result(), start):
+                yield i, result
+
+    index = 0
+    for chunk in batched(sources, chunksize):
+        pending[executor.submit(work, format, backend, output, chunk)] = index
+        index += len(chunk)
+        if len(pending) >= window:
+            yield from finished()
+
+    while pending:
+        yield from finished()
@@ -0,0 +1,189 @@
+import hashlib
+import marshal
+import mmap
+import os
+import tempfile
+import threading
+import typing as t
+from collections import OrderedDict
+
+from .batch import TreeBuilder
+
+if t.TYPE_CHECKING:
+    from .batch import TREE
+    from .parse.typing import Parser
+
+# Part of every key, bump it when parsers change what they build for the same text so
+# entries on disk made by older versions are never read
+CACHE_VERSION = 1
+
+
+class ParseCache:
+    """
+    Parsed documents by a hash of their text and the parser and extensions that parsed
+    them, in front of `Symbol.from_md`/`Symbol.from_html` when set as `Symbol.parse_cache`.
+
+    Documents are kept as `TREE` tuples, every read builds new symbols from them so callers
+    can change what they get. The last `maxsize` documents used are kept in memory, with a
+    `directory` the others are kept there until the files take more than `max_bytes`, the
+    least recently used are removed first. Several processes can share a directory, each
+    only evicts the files it knows about.
+
+    Only `str` and buffer sources (`bytes`, `memoryview`, `mmap`) are cached, files and
+    iterables are parsed as usual.
+    """
+
+    SUFFIX = ".tree"
+
+    def __init__(self, maxsize:'int'=1024, directory:'t.Optional[t.Union[str, os.PathLike]]'=None, max_bytes:'int'=1 << 30):
+        self.maxsize = maxsize
+        self.directory = None if directory is None else os.fspath(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self.memory:'OrderedDict[str, tuple[TREE, ...]]' = OrderedDict()
+        # File sizes by key, least recently used first
+        self.files:'OrderedDict[str, int]' = OrderedDict()
+        self.size = 0
+        self._lock = threading.Lock()
+
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(self.SUFFIX)]
+            for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+                size = entry.stat().st_size
+                self.files[entry.name.removesuffix(self.SUFFIX)] = size
+                self.size += size
+            self.evict()
+
+    @staticmethod
+    def key(format:'str', parser:'type[Parser]', source:'t.Any', encoding:'t.Optional[str]'=None) -> 't.Optional[str]':
+        """
+        The key of `source` parsed by `parser`, `None` if it can't be cached.
+        """
+        if isinstance(source, str):
+            data = source.encode("utf-8", "surrogatepass")
+        elif isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+            data = source
+        else:
+            return None
+
+        extensions = [f"{ext.__module__}.{ext.__qualname__}" for ext in getattr(parser, "extensions", ())]
+        config = (CACHE_VERSION, marshal.version, format, f"{parser.__module__}.{parser.__qualname__}", extensions, isinstance(source, str), encoding)
+        digest = hashlib.blake2b(repr(config).encode(), digest_size=20)
+        digest.update(data)
+        return digest.hexdigest()
+
+    def path(self, key:'str') -> 'str':
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key:'str') -> 't.Optional[tuple[TREE, ...]]':
+        with self._lock:
+            trees = self.memory.get(key)
+            if trees is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return trees
+
+        if self.directory is not None:
+            path = self.path(key)
+            try:
+                with open(path, "rb") as f:
+                    trees = marshal.load(f)
+                # The access time of the entry, for eviction by other processes too
+                os.utime(path)
+            except (OSError, EOFError, ValueError, TypeError):
+                trees = None
+
+            if trees is not None:
+                with self._lock:
+                    if key in self.files:
+                        self.files.move_to_end(key)
+                    self.hits += 1
+                    self.remember(key, trees)
+                return trees
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key:'str', trees:'tuple[TREE, ...]'):
+        with self._lock:
+            self.remember(key, trees)
+
+        if self.directory is None:
+            return
+
+        try:
+            data = marshal.dumps(trees)
+        except ValueError:
+            # Attributes an extension set to something other than plain data
+            return
+
+        # Written next to the entry and renamed, readers never see part of it
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.path(key))
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self.size += len(data) - self.files.pop(key, 0)
+            self.files[key] = len(data)
+            self.evict()
+
+    def evict(self):
+        # Called with the lock held, or before the cache is shared
+        while self.size > self.max_bytes and self.files:
+            key, size = self.files.popitem(last=False)
+            self.size -= size
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def remember(self, key:'str', trees:'tuple[TREE, ...]'):
+        # Called with the lock held
+        self.memory[key] = trees
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def parse(self, format:'str', parser:'type[Parser]', source:'t.Any', encoding:'t.Optional[str]'=None) -> 't.Optional[tuple[TREE, ...]]':
+        """
+        The `TREE`s of `source`, parsed with `parser` if they aren't cached. `None` if
+        `source` can't be cached.
+        """
+        key = self.key(format, parser, source, encoding)
+        if key is None:
+            return None
+
+        trees = self.get(key)
+        if trees is None:
+            instance = parser(builder=TreeBuilder())
+            # Backends written before `encoding` existed only take the source
+            trees = tuple(instance.parse(source) if encoding is None else instance.parse(source, encoding))
+            self.put(key, trees)
+        return trees
+
+    def clear(self):
+        """
+        Remove every entry, from memory and from the directory.
+        """
+        with self._lock:
+            self.memory.clear()
+            files, self.files = self.files, OrderedDict()
+            self.size = 0
+
+        for key in files:
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
@@ -1,5 +1,7 @@
+import itertools as it
 import typing as t
-from frozendict import frozendict
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
 
 if t.TYPE_CHECKING:
     from .symbol import Symbol
@@ -28,7 +30,15 @@ class Copy:
         return self.data
 
 T5 = t.TypeVar("T5", bound=CopyProtocol)
-HASHABLE_ATTRS = str | bool | int | float | HashableList['HASHABLE_ATTRS'] | HashableDict[str, 'HASHABLE_ATTRS']
+# Attribute values as index keys, lists become tuples and dicts frozensets of their items
+HASHABLE_ATTRS = t.Union[str, bool, int, float, tuple['HASHABLE_ATTRS', ...], frozenset[tuple[str, 'HASHABLE_ATTRS']]]
+
+def make_hashable(value: 'ATTR_TYPES') -> 'HASHABLE_ATTRS':
+    if isinstance(value, list):
+        return tuple([make_hashable(item) for item in value])
+    if isinstance(value, dict):
+        return frozenset((key, make_hashable(item)) for key, item in value.items())
+    return value
 
 class Fetcher(t.Generic[T1, T2, T5]):
     def __init__(self, data: 't.Union[GetProtocol[T1, T2], dict[T1, T2]]', default:'T5'=None):
@@ -42,73 +52,417 @@ class Fetcher(t.Generic[T1, T2, T5]):
         if isinstance(self.data, dict):
             return self.data.get(name, self.default)
         return self.data.get(name, self.default)
-class InnerHTML:
-    def __init__(self, inner):
-        self.inner = inner
-
-        self.ids    : 'dict[str|None, list[Symbol]]'                = {}
-        self.classes: 'dict[str, list[Symbol]]'                     = {}
-        self.tags   : 'dict[type[Symbol], list[Symbol]]'            = {}
-        self.attrs  : 'dict[str, dict[ATTR_TYPES, list[Symbol]]]'   = {}
-        self.text   : 'dict[str, list[Symbol]]'                     = {}
-
-        self.children_ids    : 'dict[str|None, list[Symbol]]'       = {}
-        self.children_classes: 'dict[str, list[Symbol]]'            = {}
-        self.children_tags   : 'dict[type[Symbol], list[Symbol]]'   = {}
-        self.children_attrs  : 'dict[str, dict[str, list[Symbol]]]' = {}
-        self.children_text   : 'dict[str, list[Symbol]]'            = {}
-
-    def add_elm(self, elm: 'Symbol'):
-        def make_hashable(a):
-            if   isinstance(a, list): a = tuple([make_hashable(arg) for arg in a])
-            elif isinstance(a, dict): a = frozendict({k: make_hashable(v) for k, v in a.items()})
 
-            return a
 
-        self.children_ids.setdefault(elm.get_prop("id", None), []).append(elm)
-        [self.children_classes.setdefault(c, []).append(elm) for c in elm.classes]
-        self.children_tags.setdefault(type(elm), []).append(elm)
+# Labels of the symbols in an index. They stand for tuples of ints compared in order, so
+# there's always room for more between two, kept as strings that compare the same way
+# because the garbage collector doesn't track those.
+LABEL = str
 
-        # Normalize keys when adding to children_attrs
-        for prop, value in elm.props.items():
-            key = make_hashable(value)
-            self.children_attrs.setdefault(prop, {}).setdefault(key, []).append(elm)
-
-        self.children_text.setdefault(elm.text, []).append(elm)
+def encode(parts: 'tuple[int, ...]') -> 'LABEL':
+    label = []
+    for n in parts:
+        # A character for the sign and number of hex digits, then the digits, negative
+        # numbers counting down from the largest with as many
+        digits = format(abs(n), "x")
+        if n < 0:
+            label.append(chr(0x50 - len(digits)) + format(16 ** len(digits) + n, f"0{len(digits)}x"))
+        else:
+            label.append(chr(0x50 + len(digits)) + digits)
+    return "".join(label)
+
+def decode(label: 'LABEL') -> 'tuple[int, ...]':
+    parts, i = [], 0
+    while i < len(label):
+        size = ord(label[i]) - 0x50
+        n = int(label[i + 1:i + 1 + abs(size)], 16)
+        parts.append(n if size > 0 else n - 16 ** -size)
+        i += 1 + abs(size)
+    return tuple(parts)
+
+def between(low: 'LABEL', high: 'LABEL', count: 'int') -> 'list[LABEL]':
+    """
+    `count` labels in order between `low` and `high`, which are next to each other in their
+    index.
+    """
+    low_parts, high_parts = decode(low), decode(high)
+    if low_parts[:-1] + (low_parts[-1] + count,) < high_parts:
+        return [encode(low_parts[:-1] + (low_parts[-1] + i,)) for i in range(1, count + 1)]
+
+    n = len(low_parts)
+    if high_parts[:n] == low_parts:
+        # Longer labels are after `low`, these end just before the next part of `high`
+        top = high_parts[n]
+        return [encode(low_parts + (i,)) for i in range(top - count, top)]
+    return [encode(low_parts + (i,)) for i in range(1, count + 1)]
+
+
+class DocumentIndex:
+    """
+    The index of a prepared tree, built in the one walk `Symbol.prepare` makes and kept up
+    to date as the tree is changed.
+
+    Every symbol gets a label when it's entered and another once its children are done, in
+    document order, so its subtree is what's labelled between the two. Ids, classes, tags
+    and attributes map to sorted label lists and a query on any symbol is a bisect of the
+    list for its range. There's always room for more labels between two, so a new subtree
+    is labelled without relabelling anything and the ranges of its ancestors stay as they
+    are.
+
+    The length of the text of every symbol is indexed on the first text query, after that
+    a change only reads the text of the changed subtree and its ancestors.
+    """
+
+    def __init__(self, root: 'Symbol', parent: 't.Optional[Symbol]' = None, context: 't.Optional[dict[str, t.Any]]' = None):
+        from .symbol import Symbol
+
+        # What the root was prepared with, its children are prepared with the same
+        self.root = root
+        self.parent = parent
+        self.context = context or {}
+
+        # Symbols whose `text` isn't the text of their children, e.g. `Text`
+        self.plain_text = Symbol.text
+        self.hooks = Symbol.before_prepare, Symbol.after_prepare
+
+        self.symbols: 'dict[LABEL, Symbol]' = {}
+
+        self.ids    : 'dict[t.Optional[str], list[LABEL]]'              = {}
+        self.classes: 'dict[str, list[LABEL]]'                          = {}
+        self.tags   : 'dict[type[Symbol], list[LABEL]]'                 = {}
+        self.attrs  : 'dict[str, dict[HASHABLE_ATTRS, list[LABEL]]]'    = {}
+
+        # The length of the text of every symbol, `None` until the first text query. Symbols
+        # inside those with their own text are `opaque`, their text is read by the query.
+        self.text_lengths: 't.Optional[dict[LABEL, int]]' = None
+        self.lengths: 'dict[int, list[LABEL]]' = {}
+        self.opaque: 'list[LABEL]' = []
+
+        # Changes made in a `batch`, applied once it's done
+        self.pending: 'list[tuple[t.Literal["add", "remove"], Symbol, Symbol]]' = []
+        self.depth = 0
+        # Set when a change couldn't be applied, the tree is prepared again instead
+        self.stale = False
+
+    @staticmethod
+    def labels() -> 't.Iterator[LABEL]':
+        return (chr(0x50 + len(digits)) + digits for digits in map("{:x}".format, it.count()))
+
+    def enter(self, symbol: 'Symbol', label: 'LABEL'):
+        """
+        Add `symbol` before its children.
+        """
+        document = symbol.document = InnerHTML(symbol, self, label)
+        self.symbols[label] = symbol
+
+        props = symbol.props
+        # The lists to take it out of again, the props may have changed by then
+        entries = document.entries = [self.ids.setdefault(props.get("id", None), []), self.tags.setdefault(type(symbol), [])]
+        for c in symbol.classes:
+            entries.append(self.classes.setdefault(c, []))
+        for prop, value in props.items():
+            entries.append(self.attrs.setdefault(prop, {}).setdefault(make_hashable(value), []))
+
+        for labels in entries:
+            # Labels come in order while the tree is prepared, only new subtrees go in between
+            if not labels or labels[-1] < label:
+                labels.append(label)
+            else:
+                insort(labels, label)
+
+    def leave(self, symbol: 'Symbol', label: 'LABEL'):
+        """
+        Finish `symbol` after its children.
+        """
+        symbol.document.end = label
+
+    def indexed(self, symbol: 'Symbol') -> 'bool':
+        document = symbol.document
+        return document.index is self and self.symbols.get(document.start) is symbol
+
+    def remove(self, symbol: 'Symbol', parent: 't.Optional[Symbol]' = None):
+        """
+        Take the subtree of `symbol` out of `parent`, it's prepared on its own when it's used
+        again.
+        """
+        texts = self.text_lengths is not None
+        if texts:
+            length = self.text_lengths.get(symbol.document.start, 0)
+
+        stack = [symbol]
+        while stack:
+            descendant = stack.pop()
+            document = descendant.document
+            if document.index is self and self.symbols.get(document.start) is descendant:
+                del self.symbols[document.start]
+                for labels in document.entries:
+                    del labels[bisect_left(labels, document.start)]
+                if texts:
+                    self.drop_text(document.start)
+                # Its range is gone, the whole subtree is prepared again when it's used
+                descendant.document = InnerHTML(descendant)
+                descendant.prepared = False
+                stack.extend(descendant.children)
+
+        symbol.document = InnerHTML(symbol)
+        symbol.prepared = False
+        if texts and parent is not None and self.indexed(parent):
+            self.retext(parent, -length)
+
+    def plain(self, symbol: 'Symbol') -> 'bool':
+        """
+        Whether `symbol` is in this tree and it and its ancestors have no prepare hooks, so
+        its children are prepared with the root's context and nothing else reads them.
+        """
+        while symbol is not None:
+            cls = type(symbol)
+            if (cls.before_prepare, cls.after_prepare) != self.hooks:
+                return False
+            if symbol is self.root:
+                return True
+            symbol = symbol.parent
+        return False
+
+    def insert(self, parent: 'Symbol', child: 'Symbol') -> 'bool':
+        """
+        Prepare and add `child` of `parent`, with any children next to it that aren't
+        indexed either. `False` if that can't be done without preparing the tree again.
+        """
+        children = parent.children
+        # Children are mostly added at the end
+        i = next((i for i in range(len(children) - 1, -1, -1) if children[i] is child), None)
+        if i is None:
+            return True
+        if not self.plain(parent):
+            return False
+
+        lo, hi = i, i + 1
+        while lo and not self.indexed(children[lo - 1]):
+            lo -= 1
+        while hi < len(children) and not self.indexed(children[hi]):
+            hi += 1
+
+        low = children[lo - 1].document.end if lo else parent.document.start
+        high = children[hi].document.start if hi < len(children) else parent.document.end
+
+        run = children[lo:hi]
+        count, stack = 0, list(run)
+        while stack:
+            count += 1
+            stack.extend(stack.pop().children)
+
+        labels = iter(between(low, high, 2 * count))
+        try:
+            for symbol in run:
+                symbol.prepare_into(self, parent, self.context, labels)
+        except StopIteration:
+            # The hooks of the new symbols added more of them
+            return False
+
+        if self.text_lengths is not None:
+            for symbol in run:
+                self.add_text_of(parent, symbol)
+        return True
+
+    def change(self, change: 't.Literal["add", "remove"]', parent: 'Symbol', child: 'Symbol'):
+        """
+        `child` was added to or removed from `parent`, applied now or when the `batch` is done.
+        """
+        self.pending.append((change, parent, child))
+        if not self.depth:
+            self.commit()
+
+    def commit(self):
+        pending, self.pending = self.pending, []
+        if self.stale:
+            return
+
+        for change, parent, child in pending:
+            if change == "remove" and self.indexed(child):
+                self.remove(child, parent)
+
+        for change, parent, child in pending:
+            if change == "add" and self.indexed(parent) and not self.indexed(child) and not self.insert(parent, child):
+                self.invalidate(parent)
+                return
+
+    def invalidate(self, symbol: 'Symbol'):
+        # Symbols up to the root are prepared again when they are used
+        self.stale = True
+        while symbol is not None:
+            symbol.prepared = False
+            if symbol is self.root:
+                break
+            symbol = symbol.parent
+
+    @contextmanager
+    def batch(self):
+        self.depth += 1
+        try:
+            yield self
+        finally:
+            self.depth -= 1
+            if not self.depth:
+                self.commit()
+
+    def positions(self, labels: 't.Sequence[LABEL]', start: 'LABEL', end: 'LABEL') -> 'list[Symbol]':
+        symbols = self.symbols
+        return [symbols[label] for label in labels[bisect_right(labels, start):bisect_left(labels, end)]]
+
+    def text_spans(self, symbol: 'Symbol') -> 'tuple[int, list[tuple[LABEL, int]], list[LABEL]]':
+        """
+        The length of the text of `symbol`, the length of the text of every symbol in its
+        subtree and the labels of those inside symbols with their own text.
+        """
+        length = 0
+        spans: 'list[tuple[LABEL, int]]' = []
+        opaque: 'list[LABEL]' = []
+
+        # Symbols whose text is still being read, finished at the `leave` marker after their children
+        leave = object()
+        entered: 'list[tuple[LABEL, int]]' = []
+        stack: 'list[t.Any]' = [symbol]
+        while stack:
+            symbol = stack.pop()
+            if symbol is leave:
+                label, start = entered.pop()
+                spans.append((label, length - start))
+                continue
+
+            document = symbol.document
+            indexed = document.index is self
+            if type(symbol).text is self.plain_text:
+                if indexed:
+                    entered.append((document.start, length))
+                    stack.append(leave)
+                stack.extend(symbol.children)
+                continue
+
+            part = len(symbol.text)
+            length += part
+            if indexed:
+                spans.append((document.start, part))
+
+            inside = symbol.children[:] if symbol.children else []
+            while inside:
+                descendant = inside.pop()
+                if descendant.document.index is self:
+                    opaque.append(descendant.document.start)
+                inside.extend(descendant.children)
+
+        return length, spans, opaque
+
+    def build_text_index(self):
+        _, spans, opaque = self.text_spans(self.root)
+        self.text_lengths = dict(spans)
+        self.lengths = {}
+        for label, span in sorted(spans):
+            self.lengths.setdefault(span, []).append(label)
+        self.opaque = sorted(opaque)
+
+    def add_text(self, label: 'LABEL', length: 'int'):
+        self.text_lengths[label] = length
+        insort(self.lengths.setdefault(length, []), label)
+
+    def drop_text(self, label: 'LABEL'):
+        length = self.text_lengths.pop(label, None)
+        labels = self.opaque if length is None else self.lengths[length]
+        i = bisect_left(labels, label)
+        if i < len(labels) and labels[i] == label:
+            del labels[i]
+        if length is not None and not labels:
+            del self.lengths[length]
+
+    def retext(self, symbol: 'Symbol', delta: 'int') -> 'bool':
+        """
+        The text of `symbol` grew by `delta` characters, update it and its ancestors. Returns
+        whether any of them has its own text.
+        """
+        inside = False
+        while symbol is not None:
+            plain = type(symbol).text is self.plain_text
+            inside = inside or not plain
+            label = symbol.document.start
+            old = self.text_lengths.get(label) if symbol.document.index is self else None
+            if old is not None:
+                # Symbols with their own text may or may not read their children's
+                new = old + delta if plain else len(symbol.text)
+                if new != old:
+                    self.drop_text(label)
+                    self.add_text(label, new)
+                delta = new - old
+
+            if symbol is self.root:
+                break
+            symbol = symbol.parent
+        return inside
+
+    def add_text_of(self, parent: 'Symbol', symbol: 'Symbol'):
+        """
+        Index the text of `symbol`, just added to `parent`.
+        """
+        length, spans, opaque = self.text_spans(symbol)
+        if self.retext(parent, length):
+            opaque.extend(label for label, _ in spans)
+            spans = []
+
+        for label, span in spans:
+            self.add_text(label, span)
+        for label in opaque:
+            insort(self.opaque, label)
+
+    def get_by_text(self, text: 'str', start: 'LABEL', end: 'LABEL') -> 'list[Symbol]':
+        if self.text_lengths is None:
+            self.build_text_index()
+
+        candidates = self.lengths.get(len(text), [])
+        # Only symbols with text of the right length are read, their text is kept until they change
+        found = [
+            symbol for symbol in map(self.symbols.__getitem__, candidates[bisect_right(candidates, start):bisect_left(candidates, end)])
+            if symbol.text == text
+        ]
+
+        inside = [symbol for symbol in self.positions(self.opaque, start, end) if symbol.text == text]
+        if inside:
+            found = sorted(found + inside, key=lambda symbol: symbol.document.start)
+        return found
 
-        def concat(d1: 'dict', *d2: 'dict'):
-            ret = {}
 
-            for dict_ in list(d2) + [d1]:
-                for k, v in dict_.items():
-                    ret.setdefault(k, []).extend(v)
+class InnerHTML:
+    """
+    Queries over the descendants of `inner`, the range between its labels in the
+    `DocumentIndex` of the tree it was prepared in. Empty until then.
+    """
 
-            return ret
+    __slots__ = ("inner", "index", "start", "end", "entries")
 
-        # Normalize keys in elm.props for attrs merging
-        normalized_props = {
-            prop: {make_hashable(value): [elm]}
-            for prop, value in elm.props.items()
-        }
+    def __init__(self, inner: 'Symbol', index: 't.Optional[DocumentIndex]' = None, start: 'LABEL' = ""):
+        self.inner = inner
+        self.index = index
+        self.start = start
+        self.end = start
+        self.entries: 'list[list[LABEL]]' = []
 
-        self.ids     = concat(self.ids, elm.inner_html.ids, {elm.get_prop("id", None): [elm]})
-        self.classes = concat(self.classes, elm.inner_html.classes, {c: [elm] for c in elm.classes})
-        self.tags    = concat(self.tags, elm.inner_html.tags, {type(elm): [elm]})
-        self.attrs   = concat(self.attrs, elm.inner_html.attrs, normalized_props)
-        self.text    = concat(self.text, elm.inner_html.text, {elm.text: [elm]})
+    def lookup(self, mapping: 'dict[t.Any, list[LABEL]]', key: 't.Any') -> 'list[Symbol]':
+        if self.index is None:
+            return []
+        return self.index.positions(mapping.get(key, ()), self.start, self.end)
 
     def get_elements_by_id(self, id: 'str'):
-        return self.ids.get(id, [])
+        return [] if self.index is None else self.lookup(self.index.ids, id)
 
     def get_elements_by_class_name(self, class_name: 'str'):
-        return self.classes.get(class_name, [])
+        return [] if self.index is None else self.lookup(self.index.classes, class_name)
 
     def get_elements_by_tag_name(self, tag: 'str'):
-        # Find the tag class by name
-        for tag_class, elements in self.tags.items():
-            if tag_class.__name__.lower() == tag.lower():
-                return elements
-        return []
+        if self.index is None:
+            return []
+
+        # Find the tag classes by name
+        found = [elm for tag_class in self.index.tags if tag_class.__name__.lower() == tag.lower() for elm in self.lookup(self.index.tags, tag_class)]
+        if len({type(elm) for elm in found}) > 1:
+            found.sort(key=lambda elm: elm.document.start)
+        return found
 
     def find(self, key:'str'):
         if key.startswith("#"):
@@ -119,10 +473,28 @@ class InnerHTML:
             return self.get_elements_by_tag_name(key)
 
     def get_by_text(self, text:'str'):
-        return self.text.get(text, [])
-
-    def get_by_attr(self, attr:'str', value:'str'):
-        return self.attrs.get(attr, {}).get(value, [])
+        if self.index is None:
+            return []
+        return self.index.get_by_text(text, self.start, self.end)
+
+    def get_by_attr(self, attr:'str', value:'ATTR_TYPES'):
+        if self.index is None:
+            return []
+        return self.lookup(self.index.attrs.get(attr, {}), make_hashable(value))
+
+    def select(self, selector:'str') -> 'list[Symbol]':
+        """
+        The descendants matching the CSS `selector`, in document order.
+        """
+        from .selector import compile_selector
+        return list(compile_selector(selector).iter(self))
+
+    def select_one(self, selector:'str') -> 't.Optional[Symbol]':
+        """
+        The first descendant matching the CSS `selector`, the rest aren't looked for.
+        """
+        from .selector import compile_selector
+        return next(compile_selector(selector).iter(self), None)
 
     def advanced_find(self, tag:'str', attrs:'dict[t.Literal["text"] | str, str | bool | int | float | tuple[str, str | bool | int | float] | list[str | bool | int | float | tuple[str, str | bool | int | float]]]' = None):
         attrs = dict(attrs or {})
@@ -145,6 +517,39 @@ class InnerHTML:
             tags = filter(lambda e: check_attr(e, k, v) if not isinstance(v, list) else all([check_attr(e, k, i) for i in v]), tags)
         return list(tags)
 
+    # Direct children, grouped when asked for
+
+    def group(self, key: 't.Callable[[Symbol], t.Iterable[t.Any]]') -> 'dict[t.Any, list[Symbol]]':
+        groups: 'dict[t.Any, list[Symbol]]' = {}
+        for child in self.inner.children:
+            for k in key(child):
+                groups.setdefault(k, []).append(child)
+        return groups
+
+    @property
+    def children_ids(self) -> 'dict[t.Optional[str], list[Symbol]]':
+        return self.group(lambda child: [child.get_prop("id", None)])
+
+    @property
+    def children_classes(self) -> 'dict[str, list[Symbol]]':
+        return self.group(lambda child: child.classes)
+
+    @property
+    def children_tags(self) -> 'dict[type[Symbol], list[Symbol]]':
+        return self.group(lambda child: [type(child)])
+
+    @property
+    def children_attrs(self) -> 'dict[str, dict[HASHABLE_ATTRS, list[Symbol]]]':
+        attrs: 'dict[str, dict[HASHABLE_ATTRS, list[Symbol]]]' = {}
+        for child in self.inner.children:
+            for prop, value in child.props.items():
+                attrs.setdefault(prop, {}).setdefault(make_hashable(value), []).append(child)
+        return attrs
+
+    @property
+    def children_text(self) -> 'dict[str, list[Symbol]]':
+        return self.group(lambda child: [child.text])
+
     @property
     def id(self):
         return Fetcher(self.children_ids, [])
@@ -155,4 +560,4 @@ class InnerHTML:
 
     @property
     def tag(self):
-        return Fetcher(self.children_tags, [])
\ No newline at end of file
+        return Fetcher(self.children_tags, [])
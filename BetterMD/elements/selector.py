@@ -0,0 +1,384 @@
+import re
+import typing as t
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from heapq import merge
+
+from .comment import Comment
+from .text import Text
+
+if t.TYPE_CHECKING:
+    from .symbol import Symbol
+    from .document import HASHABLE_ATTRS, InnerHTML, LABEL
+    from ..typing import ATTR_TYPES
+
+IDENT = r"-?[_a-zA-Z][\w-]*"
+
+TOKEN_RE = re.compile(rf"""
+    (?P<combinator>\s*[>,]\s*|\s+)
+  | (?P<tag>{IDENT}|\*)
+  | \#(?P<id>{IDENT})
+  | \.(?P<cls>{IDENT})
+  | \[\s*(?P<attr>{IDENT})\s*(?:(?P<op>[~|^$*]?=)\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<value>[^\]\s]+))\s*)?\]
+  | :(?P<pseudo>nth-child|nth-last-child|first-child|last-child)(?:\(\s*(?P<nth>[^)]*?)\s*\))?
+""", re.VERBOSE)
+
+NTH_RE = re.compile(r"(?P<a>[+-]?\d*)n\s*(?:(?P<sign>[+-])\s*(?P<b>\d+))?|(?P<only>[+-]?\d+)")
+
+ATTR_TESTS: 'dict[str, t.Callable[[str, str], bool]]' = {
+    "=": lambda text, value: text == value,
+    "~=": lambda text, value: value in text.split(),
+    "^=": lambda text, value: bool(value) and text.startswith(value),
+    "$=": lambda text, value: bool(value) and text.endswith(value),
+    "*=": lambda text, value: bool(value) and value in text,
+    "|=": lambda text, value: text == value or text.startswith(value + "-"),
+}
+
+
+def attribute_text(value: 'ATTR_TYPES') -> 'str':
+    # What the attribute is written as by `Symbol.handle_props`
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return ""
+    if isinstance(value, list):
+        return " ".join(map(str, value))
+    if isinstance(value, dict):
+        return "; ".join(f"{k}:{v}" for k, v in value.items())
+    return str(value)
+
+
+def attribute_seed(values: 'dict[HASHABLE_ATTRS, list[LABEL]]', value: 'str') -> 't.Optional[list[list[LABEL]]]':
+    """
+    The label lists of the attribute values written as `value`, `None` if that can't be
+    told from the indexed values.
+    """
+    seed = []
+    for key, labels in values.items():
+        if isinstance(key, tuple):
+            if not all(isinstance(item, str) for item in key):
+                return None
+            text = " ".join(key)
+        elif isinstance(key, (frozenset, int, float)):
+            # Dicts are indexed without their order, and numbers that are equal share a key
+            # (`True`, `1` and `1.0`) so only one of their written forms is known
+            return None
+        else:
+            text = attribute_text(key)
+        if text == value:
+            seed.append(labels)
+    return seed
+
+
+def parse_nth(selector: 'str', nth: 'str') -> 'tuple[int, int]':
+    nth = nth.lower()
+    if nth in ("odd", "even"):
+        return 2, 1 if nth == "odd" else 0
+
+    match = NTH_RE.fullmatch(nth)
+    if match is None:
+        raise ValueError(f"Invalid `:nth-child` argument `{nth}` in selector `{selector}`")
+    if match["only"] is not None:
+        return 0, int(match["only"])
+
+    a = {"": 1, "+": 1, "-": -1}.get(match["a"])
+    b = int(match["b"] or 0)
+    return int(match["a"]) if a is None else a, -b if match["sign"] == "-" else b
+
+
+class Compound:
+    """
+    Simple selectors that all have to match one symbol, e.g. `p.note[lang=en]:first-child`.
+    """
+
+    __slots__ = ("tag", "ids", "classes", "attrs", "nth")
+
+    def __init__(self):
+        self.tag: 't.Optional[str]' = None
+        self.ids: 'list[str]' = []
+        self.classes: 'list[str]' = []
+        self.attrs: 'list[tuple[str, t.Optional[str], str]]' = []
+        # `(a, b, from_end)`, the position counted from 1 is `a*n + b` for some n >= 0
+        self.nth: 'list[tuple[int, int, bool]]' = []
+
+    def matches(self, symbol: 'Symbol', positions: 'dict[int, tuple[int, int]]') -> 'bool':
+        if self.tag is not None and tag_name(type(symbol)) != self.tag:
+            return False
+
+        props = symbol.props
+        if self.ids and any(props.get("id", None) != id for id in self.ids):
+            return False
+        if self.classes:
+            classes = symbol.classes
+            if any(cls not in classes for cls in self.classes):
+                return False
+
+        for name, op, value in self.attrs:
+            if name not in props:
+                return False
+            if op is not None and not ATTR_TESTS[op](attribute_text(props[name]), value):
+                return False
+
+        if self.nth:
+            position, count = element_position(symbol, positions)
+            for a, b, from_end in self.nth:
+                n = count + 1 - position if from_end else position
+                if a == 0:
+                    if n != b:
+                        return False
+                elif (n - b) % a or (n - b) // a < 0:
+                    return False
+
+        return True
+
+
+def size(seed: 'list[list[LABEL]]') -> 'int':
+    return sum(map(len, seed))
+
+
+# Lower case class names, as tags are looked for by `InnerHTML.find`
+TAG_NAMES: 'dict[type[Symbol], str]' = {}
+
+def tag_name(cls: 'type[Symbol]') -> 'str':
+    name = TAG_NAMES.get(cls)
+    if name is None:
+        name = TAG_NAMES[cls] = cls.__name__.lower()
+    return name
+
+
+def is_element(symbol: 'Symbol') -> 'bool':
+    return not isinstance(symbol, (Text, Comment))
+
+
+def element_position(symbol: 'Symbol', positions: 'dict[int, tuple[int, int]]') -> 'tuple[int, int]':
+    """
+    Where `symbol` is among the elements of its parent counted from 1, and how many there are.
+    Worked out for all of them at once and kept in `positions` for the rest of the query.
+    """
+    if id(symbol) not in positions:
+        parent = symbol.parent
+        if parent is None:
+            return 1, 1
+
+        elements = [child for child in parent.children if is_element(child)]
+        for position, element in enumerate(elements, 1):
+            positions[id(element)] = position, len(elements)
+    return positions.get(id(symbol), (1, 1))
+
+
+class Selector:
+    """
+    A compiled CSS selector. Compound, descendant (` `), child (`>`), attribute and
+    `:nth-child` selectors are supported, several of them can be given separated by `,`.
+
+    Every selector starts from the smallest of the `DocumentIndex` lists for the ids,
+    classes, tag and `[name=value]` attributes of its compounds in the range of the symbol
+    queried, only walking the subtree if it has none of those. A compound before the last
+    narrows the search to the subtrees of its matches. The rest is checked on each
+    candidate from there up through its ancestors, matches are found lazily and in
+    document order.
+    """
+
+    def __init__(self, selector: 'str'):
+        self.selector = selector
+        # Each is the compounds with the combinator before each (`None` for the first)
+        self.selectors: 'list[list[tuple[t.Optional[str], Compound]]]' = []
+
+        current: 'list[tuple[t.Optional[str], Compound]]' = []
+        compound, combinator = None, None
+        pos = 0
+        text = selector.strip()
+        while pos < len(text):
+            match = TOKEN_RE.match(text, pos)
+            if match is None:
+                raise ValueError(f"Invalid selector `{selector}` at `{text[pos:]}`")
+            pos = match.end()
+
+            if match["combinator"] is not None:
+                symbol = match["combinator"].strip() or " "
+                if compound is None:
+                    raise ValueError(f"Invalid selector `{selector}`, `{symbol}` without a selector before it")
+                current.append((combinator, compound))
+                compound, combinator = None, symbol
+                if symbol == ",":
+                    self.selectors.append(current)
+                    current, combinator = [], None
+                continue
+
+            if compound is None:
+                compound = Compound()
+
+            if match["tag"] is not None:
+                if compound.tag is not None or compound.ids or compound.classes or compound.attrs or compound.nth:
+                    raise ValueError(f"Invalid selector `{selector}`, the tag has to come first")
+                if match["tag"] != "*":
+                    compound.tag = match["tag"].lower()
+            elif match["id"] is not None:
+                compound.ids.append(match["id"])
+            elif match["cls"] is not None:
+                compound.classes.append(match["cls"])
+            elif match["attr"] is not None:
+                value = next((v for v in (match["dq"], match["sq"], match["value"]) if v is not None), "")
+                compound.attrs.append((match["attr"], match["op"], value))
+            else:
+                pseudo = match["pseudo"]
+                if pseudo in ("first-child", "last-child"):
+                    compound.nth.append((0, 1, pseudo == "last-child"))
+                elif match["nth"] is None:
+                    raise ValueError(f"Invalid selector `{selector}`, `:{pseudo}` needs an argument")
+                else:
+                    compound.nth.append((*parse_nth(selector, match["nth"]), pseudo == "nth-last-child"))
+
+        if compound is None:
+            raise ValueError(f"Invalid selector `{selector}`, it ends without a selector")
+        current.append((combinator, compound))
+        self.selectors.append(current)
+
+    def matches_up(self, parts: 'list[tuple[t.Optional[str], Compound]]', i: 'int', symbol: 'Symbol', positions: 'dict[int, tuple[int, int]]', failed: 'set[tuple[int, int]]') -> 'bool':
+        """
+        Whether the ancestors of `symbol`, which matched `parts[i]`, match the parts before it.
+        """
+        while i:
+            combinator = parts[i][0]
+            compound = parts[i - 1][1]
+            if combinator == ">":
+                symbol = symbol.parent
+                if symbol is None or not compound.matches(symbol, positions):
+                    return False
+                i -= 1
+                continue
+
+            # Any ancestor can match, remembering the ones that didn't lead anywhere
+            ancestor = symbol.parent
+            while ancestor is not None:
+                key = (id(ancestor), i - 1)
+                if key not in failed and compound.matches(ancestor, positions):
+                    if self.matches_up(parts, i - 1, ancestor, positions, failed):
+                        return True
+                    failed.add(key)
+                ancestor = ancestor.parent
+            return False
+        return True
+
+    @staticmethod
+    def seed(inner: 'InnerHTML', compound: 'Compound', start: 'LABEL', end: 'LABEL') -> 't.Optional[list[list[LABEL]]]':
+        """
+        The labels between `start` and `end` of the smallest index list for `compound`,
+        several lists for a tag with more than one class. `None` if none are indexed.
+        """
+        index = inner.index
+        seeds: 'list[list[list[LABEL]]]' = [[index.ids.get(id, [])] for id in compound.ids]
+        seeds.extend([index.classes.get(cls, [])] for cls in compound.classes)
+        if compound.tag is not None:
+            seeds.append([labels for tag, labels in index.tags.items() if tag_name(tag) == compound.tag])
+
+        slices = [[labels[bisect_right(labels, start):bisect_left(labels, end)] for labels in seed] for seed in seeds]
+        smallest = min(map(size, slices), default=None)
+
+        for name, op, value in compound.attrs:
+            values = index.attrs.get(name, {})
+            # Only worth reading the values of the attribute when there are fewer than candidates
+            if op == "=" and (smallest is None or len(values) < smallest):
+                seed = attribute_seed(values, value)
+                if seed is not None:
+                    slices.append([labels[bisect_right(labels, start):bisect_left(labels, end)] for labels in seed])
+                    smallest = min(smallest or size(slices[-1]), size(slices[-1]))
+
+        if not slices:
+            return None
+        return min(slices, key=size)
+
+    @staticmethod
+    def symbols(inner: 'InnerHTML', seed: 'list[list[LABEL]]') -> 't.Iterator[Symbol]':
+        symbols = inner.index.symbols
+        last = None
+        for label in (seed[0] if len(seed) == 1 else merge(*seed)):
+            # A class given twice is indexed twice
+            if label != last:
+                yield symbols[label]
+            last = label
+
+    @staticmethod
+    def walk(symbol: 'Symbol') -> 't.Iterator[Symbol]':
+        # Every element below `symbol`, when nothing indexed can be started from
+        stack = list(reversed(symbol.children))
+        while stack:
+            symbol = stack.pop()
+            if is_element(symbol):
+                yield symbol
+            stack.extend(reversed(symbol.children))
+
+    def candidates(self, inner: 'InnerHTML', parts: 'list[tuple[t.Optional[str], Compound]]', positions: 'dict[int, tuple[int, int]]') -> 't.Iterator[Symbol]':
+        """
+        Symbols that could match, the ones matching the last compound at least.
+        """
+        start, end = inner.start, inner.end
+        subject = parts[-1][1]
+        seed = self.seed(inner, subject, start, end)
+
+        # Every compound before the last matches an ancestor of what's found, if one of
+        # them is rarer only the subtrees of its matches are searched
+        anchor, anchor_seed = None, None
+        smallest = None if seed is None else size(seed)
+        for _, compound in parts[:-1]:
+            found = self.seed(inner, compound, start, end)
+            if found is not None and (smallest is None or size(found) < smallest):
+                anchor, anchor_seed, smallest = compound, found, size(found)
+
+        if anchor is not None:
+            # Unless it matches the symbol queried or its ancestors, all of the subtree is below it then
+            ancestor = inner.inner
+            while ancestor is not None and not anchor.matches(ancestor, positions):
+                ancestor = ancestor.parent
+
+            if ancestor is None:
+                below = start
+                for symbol in self.symbols(inner, anchor_seed):
+                    document = symbol.document
+                    if document.start < below or not anchor.matches(symbol, positions):
+                        # Inside the last one, already searched
+                        continue
+                    below = document.end
+                    found = self.seed(inner, subject, document.start, document.end)
+                    yield from self.walk(symbol) if found is None else self.symbols(inner, found)
+                return
+
+        yield from self.walk(inner.inner) if seed is None else self.symbols(inner, seed)
+
+    def iter(self, inner: 'InnerHTML') -> 't.Iterator[Symbol]':
+        """
+        The descendants of `inner` matching the selector, lazily and in document order.
+        """
+        if inner.index is None:
+            return iter(())
+
+        positions: 'dict[int, tuple[int, int]]' = {}
+        failed: 'set[tuple[int, int]]' = set()
+
+        def matches(parts: 'list[tuple[t.Optional[str], Compound]]') -> 't.Iterator[Symbol]':
+            last = len(parts) - 1
+            matches, matches_up = parts[last][1].matches, self.matches_up
+            for symbol in self.candidates(inner, parts, positions):
+                if matches(symbol, positions) and is_element(symbol) and (not last or matches_up(parts, last, symbol, positions, failed)):
+                    yield symbol
+
+        if len(self.selectors) == 1:
+            return matches(self.selectors[0])
+        return self.union([matches(parts) for parts in self.selectors])
+
+    @staticmethod
+    def union(found: 'list[t.Iterator[Symbol]]') -> 't.Iterator[Symbol]':
+        # Matches of several selectors in document order, once each
+        last = None
+        for symbol in merge(*found, key=lambda symbol: symbol.document.start):
+            if symbol is not last:
+                yield symbol
+            last = symbol
+
+
+@lru_cache(maxsize=512)
+def compile_selector(selector: 'str') -> 'Selector':
+    """
+    The compiled `selector`, kept for the next query with the same one.
+    """
+    return Selector(selector)
@@ -3,18 +3,27 @@ import typing as t
 from ..markdown import CustomMarkdown
 from ..html import CustomHTML
 from ..rst import CustomRst
-from ..parse import HTMLParser, MDParser, ELEMENT, TEXT, Collection
-from ..utils import List, set_recursion_limit
-from ..typing import ATTR_TYPES
-from .document import InnerHTML
+from ..parse import ELEMENT, TEXT, Collection, LazyText, Backends, MDDocument, html_backends, md_backends, copy_attributes
+from ..utils import List
+from ..typing import ATTR_TYPES, ATTRS
+from .document import DocumentIndex, InnerHTML
 
 import itertools as it
+import threading
+from contextlib import contextmanager
+
+if t.TYPE_CHECKING:
+    from ..parse.decoding import SOURCE
+    from ..batch import TREE
+    from ..cache import ParseCache
 
 T = t.TypeVar("T", bound=ATTR_TYPES)
 T1 = t.TypeVar("T1", bound=t.Union[ATTR_TYPES, t.Any])
 
-
-set_recursion_limit(10000)
+# Symbols rendered so far by the `Symbol.render` call running in this thread, per format
+_rendered = threading.local()
+# How many prepare walks are running in this thread, hooks changing the tree in them don't update the index
+_preparing = threading.local()
 
 class Symbol:
     html: 't.Union[str, CustomHTML]' = ""
@@ -22,16 +31,26 @@ class Symbol:
     md: 't.Union[str, CustomMarkdown]' = ""
     rst: 't.Union[str, CustomRst]' = ""
     type: 't.Literal["block", "void", "inline"]' = "inline"
+    nl: 'bool' = False
 
     collection = Collection()
-    html_parser = HTMLParser()
-    md_parser = MDParser()
+    # Parsers hold per document state, every call gets its own instance of the backend
+    html_backends:'Backends' = html_backends
+    md_backends:'Backends' = md_backends
+    # Set to a `ParseCache` to keep documents `from_md`/`from_html` parsed
+    parse_cache:'t.Optional[ParseCache]' = None
+
+    # The text of the subtree, or its range of the parts gathered by `cache_text`
+    _text_cache:'t.Union[None, str, tuple[list[str], int, int]]' = None
 
     _cuuid:'it.count' = None
+    _cuuid_lock:'threading.Lock' = None
+    _prepare_locks:'tuple[threading.RLock, ...]' = tuple(threading.RLock() for _ in range(64))
 
     def __init_subclass__(cls, **kwargs) -> None:
         cls.collection.add_symbols(cls)
         cls._cuuid = it.count()
+        cls._cuuid_lock = threading.Lock()
         super().__init_subclass__(**kwargs)
 
     def __init__(self, inner:'list[Symbol]'=None, **props:'ATTR_TYPES'):
@@ -47,7 +66,8 @@ class Symbol:
 
         self.children:'List[Symbol]'  = List(inner) or List()
         self.props: 'dict[str, ATTR_TYPES]' = props
-        self.nuuid = next(cls._cuuid)
+        with cls._cuuid_lock:
+            self.nuuid = next(cls._cuuid)
 
     @property
     def styles(self):
@@ -64,10 +84,60 @@ class Symbol:
     
     @property
     def text(self) -> 'str':
-        if not self.prepared:
-            self.prepare()
-        
-        return "".join([e.text for e in self.children])
+        """
+        The text of every `Text` in the subtree, kept until the subtree changes.
+        """
+        cache = self._text_cache
+        if cache is None:
+            self.ensure_prepared()
+            parts = self.cache_text()
+            cache = self._text_cache
+            if cache is None:
+                return "".join(parts)
+        if type(cache) is not str:
+            parts, start, end = cache
+            cache = self._text_cache = "".join(parts[start:end])
+        return cache
+
+    def cache_text(self) -> 'list[str]':
+        """
+        Gather the text of the subtree in one walk, every symbol in it keeps its range of the
+        parts and only joins them when its `text` is read. Whenever a symbol's text is kept so
+        is all of its children's, so a change only has to drop them up to the first symbol
+        that has none kept. Nothing is kept if a symbol in it has its own idea of its text
+        and has children.
+        """
+        parts: 'list[str]' = []
+        spans: 'list[tuple[Symbol, int, int]]' = []
+        exact = True
+        plain = Symbol.text
+
+        # Each symbol being gathered, what's left of its children and where its text starts
+        stack: 'list[tuple[Symbol, t.Iterator[Symbol], int]]' = [(self, iter(self.children[:]), 0)]
+        while stack:
+            symbol, children, start = stack[-1]
+            for child in children:
+                if type(child).text is not plain:
+                    # `Text` and anything else with its own idea of its text
+                    parts.append(child.text)
+                    exact = exact and not child.children
+                    continue
+
+                cache = child._text_cache
+                if cache is None:
+                    stack.append((child, iter(child.children[:]), len(parts)))
+                    break
+                if type(cache) is not str:
+                    cache = child._text_cache = "".join(cache[0][cache[1]:cache[2]])
+                parts.append(cache)
+            else:
+                stack.pop()
+                spans.append((symbol, start, len(parts)))
+
+        if exact:
+            for symbol, start, end in spans:
+                symbol._text_cache = (parts, start, end)
+        return parts
 
     def copy(self, styles:'dict[str,str]'=None):
         if inner is None:
@@ -83,24 +153,60 @@ class Symbol:
     def set_parent(self, parent:'Symbol'):
         self.parent = parent
         self.parent.add_child(self)
-        self.prepared = False
 
     def change_parent(self, new_parent:'Symbol'):
         self.parent.remove_child(self)
         self.set_parent(new_parent)
-        self.prepared = False
 
     def add_child(self, symbol:'Symbol'):
         self.children.append(symbol)
-        self.prepared = False
+        symbol.parent = self
+        self.changed("add", symbol)
 
     def remove_child(self, symbol:'Symbol'):
         self.children.remove(symbol)
-        self.prepared = False
+        symbol.parent = None
+        self.changed("remove", symbol)
 
     def extend_children(self, symbols:'list[Symbol]'):
         self.children.extend(symbols)
-        self.prepared = False
+        for symbol in symbols:
+            symbol.parent = self
+            self.changed("add", symbol)
+
+    def changed(self, change:'t.Literal["add", "remove"]', child:'Symbol'):
+        """
+        Keep the index of the prepared tree up to date after `child` was added or removed,
+        only the changed subtree is prepared. Symbols that aren't prepared, or are changed
+        by a prepare hook, are prepared again when they are used. The text kept by the
+        symbol and its ancestors is dropped.
+        """
+        symbol = self
+        while symbol is not None and symbol._text_cache is not None:
+            symbol._text_cache = None
+            symbol = symbol.parent
+
+        index = self.document.index
+        if self.prepared and index is not None and not index.stale and not getattr(_preparing, "depth", 0):
+            index.change(change, self, child)
+        else:
+            self.prepared = False
+
+    @contextmanager
+    def batch(self):
+        """
+        Change the prepared tree of the symbol without updating its index after every
+        change, all of them are applied when the block is done. Queries in the block see
+        the tree as it was, except that text queries don't find symbols whose text it
+        changed.
+        """
+        index = self.document.index if self.prepared else None
+        if index is None:
+            yield self
+            return
+
+        with index.batch():
+            yield self
 
     def has_child(self, child:'type[Symbol]'):
         for e in self.children:
@@ -108,24 +214,73 @@ class Symbol:
                 return e
         return False
 
-    def prepare(self, parent:'Symbol'=None, dom:'list[Symbol]' = None, *args, **kwargs):
-        if dom is None:
-            dom = []
-        dom.append(self)
-
-        self.prepared = True
-        self.parent = parent
-
-        [symbol.prepare(self, dom.copy(), *args, **kwargs) for symbol in self.children]
+    def prepare(self, parent:'Symbol'=None, **kwargs):
+        """
+        Link up and index the subtree, every symbol's `document` is its range of one
+        `DocumentIndex` built in the same walk. It's walked with an explicit stack so depth is
+        only limited by memory, subclasses hook in with `before_prepare` and `after_prepare`.
+        """
+        index = DocumentIndex(self, parent, kwargs)
+        self.prepare_into(index, parent, kwargs, index.labels())
+        return self
 
-        if self.parent is not None:
-            self.parent.inner_html.add_elm(self)
+    def prepare_into(self, index:'DocumentIndex', parent:'t.Optional[Symbol]', kwargs:'dict[str, t.Any]', labels:'t.Iterator[str]'):
+        """
+        Prepare the subtree into `index`, labelled in order from `labels`.
+        """
+        _preparing.depth = getattr(_preparing, "depth", 0) + 1
+        try:
+            stack: 'list[tuple[Symbol, Symbol, dict[str, t.Any], bool]]' = [(self, parent, kwargs, False)]
+
+            while stack:
+                symbol, parent, context, done = stack.pop()
+                if done:
+                    symbol.after_prepare(parent, **context)
+                    # Only flagged once the whole subtree is done so other threads never render a half prepared tree
+                    symbol.prepared = True
+                    index.leave(symbol, next(labels))
+                    continue
+
+                symbol.parent = parent
+                children_context = symbol.before_prepare(parent, **context)
+                index.enter(symbol, next(labels))
+                stack.append((symbol, parent, context, True))
+                stack.extend((child, symbol, children_context, False) for child in reversed(symbol.children))
+        finally:
+            _preparing.depth -= 1
+
+    def before_prepare(self, parent:'Symbol', **kwargs) -> 'dict[str, t.Any]':
+        """
+        Called before the children are prepared, `kwargs` come from the parent's
+        `before_prepare`. Returns the keyword arguments passed on to the children.
+        """
+        return kwargs
+
+    def after_prepare(self, parent:'Symbol', **kwargs):
+        """
+        Called once the children are prepared, with the same arguments as `before_prepare`.
+        """
+
+    def ensure_prepared(self) -> 'Symbol':
+        """
+        Prepare the symbol if it isn't already, safe to call from several threads at once.
+        """
+        if not self.prepared:
+            with self._prepare_locks[id(self) % len(self._prepare_locks)]:
+                if not self.prepared:
+                    # Prepared on its own but left where it is, changes to it still reach its ancestors
+                    parent = self.parent
+                    self.prepare()
+                    self.parent = parent
 
         return self
 
     def replace_child(self, old:'Symbol', new:'Symbol'):
         i = self.children.index(old)
         self.children[i] = new
+        old.parent, new.parent = None, self
+        self.changed("remove", old)
+        self.changed("add", new)
 
     def handle_props(self):
         props = {**({"class": self.classes} if self.classes else {}), **({"style": self.styles} if self.styles else {}), **self.props}
@@ -143,10 +298,56 @@ class Symbol:
                 raise TypeError(f"Unsupported type for prop {k}: {type(v)}")
         return (" " + " ".join(filter(None, prop_list))) if prop_list else ""
 
+    def render(self, format:'t.Literal["html", "md", "rst"]') -> 'str':
+        """
+        Render the subtree with an explicit stack, every symbol after its children.
+
+        Each symbol is rendered by `render_<format>`, which reads its children's output with
+        `to_<format>` as before; those calls return the already rendered strings, so custom
+        renderers never recurse either.
+        """
+        rendered: 't.Optional[dict[int, str]]' = getattr(_rendered, format, None)
+        if rendered is not None and id(self) in rendered:
+            return rendered[id(self)]
+
+        self.ensure_prepared()
+
+        to_format = f"to_{format}"
+        render_format = f"render_{format}"
+        base = getattr(Symbol, to_format)
+
+        outer, rendered = rendered, {}
+        setattr(_rendered, format, rendered)
+        try:
+            stack: 'list[tuple[Symbol, bool]]' = [(self, False)]
+            while stack:
+                symbol, done = stack.pop()
+                if symbol is not self and getattr(type(symbol), to_format) is not base:
+                    # Renders itself (e.g. `Text`), children included
+                    rendered[id(symbol)] = getattr(symbol, to_format)()
+                elif done:
+                    rendered[id(symbol)] = getattr(symbol, render_format)()
+                    # Only the parent reads them, anything else gets them rendered again
+                    for child in symbol.children:
+                        rendered.pop(id(child), None)
+                else:
+                    stack.append((symbol, True))
+                    stack.extend((child, False) for child in reversed(symbol.children))
+
+            return rendered[id(self)]
+        finally:
+            setattr(_rendered, format, outer)
+
     def to_html(self, inner=0) -> 'str':
-        if not self.prepared:
-            self.prepare()
+        return self.render("html")
 
+    def to_md(self) -> 'str':
+        return self.render("md")
+
+    def to_rst(self) -> 'str':
+        return self.render("rst")
+
+    def render_html(self) -> 'str':
         if isinstance(self.html, CustomHTML):
             return self.html.to_html(self.children, self, self.parent)
 
@@ -158,10 +359,7 @@ class Symbol:
             assert not inner_HTML, "Void elements should not have any inner HTML"
             return f"<{self.html}{self.handle_props()} />"
 
-    def to_md(self) -> 'str':
-        if not self.prepared:
-            self.prepare()
-
+    def render_md(self) -> 'str':
         if isinstance(self.md, CustomMarkdown):
             return self.md.to_md(self.children, self, self.parent)
 
@@ -177,10 +375,7 @@ class Symbol:
 
         return f"{self.md}{inner_md}"
 
-    def to_rst(self) -> 'str':
-        if not self.prepared:
-            self.prepare()
-
+    def render_rst(self) -> 'str':
         if isinstance(self.rst, CustomRst):
             return self.rst.to_rst(self.children, self, self.parent)
 
@@ -188,56 +383,136 @@ class Symbol:
         return f"{self.rst}{inner_rst}{self.rst}\n"
 
     @classmethod
-    def from_html(cls, text:'str') -> 'List[Symbol]':
-        parsed = cls.html_parser.parse(text)
-        return List([cls.collection.find_symbol(elm['name'], raise_errors=True).parse(elm) for elm in parsed])
+    def from_html(cls, text:'SOURCE', zero_copy:'bool'=False, backend:'t.Optional[str]'=None, encoding:'t.Optional[str]'=None) -> 'List[Symbol]':
+        if cls.parse_cache is not None:
+            trees = cls.parse_cache.parse("html", cls.html_backends.get_backend(backend), text, encoding)
+            if trees is not None:
+                return List(cls.from_tree(tree) for tree in trees)
+
+        parser = cls.html_backends.get_backend(backend)(zero_copy=zero_copy, builder=SymbolBuilder(cls.collection))
+        # Backends written before `encoding` existed only take the source
+        return List(parser.parse(text) if encoding is None else parser.parse(text, encoding))
 
     @classmethod
-    def from_md(cls, text: str) -> 'List[Symbol]':
-        parsed = cls.md_parser.parse(text)
-        return List([cls.collection.find_symbol(elm['name'] , raise_errors=True).parse(elm) for elm in parsed])
+    def from_html_chunks(cls, chunks:'t.Iterable[str]', backend:'t.Optional[str]'=None) -> 'List[Symbol]':
+        parser = cls.html_backends.get_backend(backend)(builder=SymbolBuilder(cls.collection))
+        for chunk in chunks:
+            parser.feed(chunk)
+
+        return List(parser.close())
 
     @classmethod
-    def parse(cls, text:'ELEMENT|TEXT') -> 'Symbol':
-        def handle_element(element:'ELEMENT|TEXT'):
-            if element['type'] == 'text':
-                text = cls.collection.find_symbol("text", raise_errors=True)
-                assert text is not None, "`collection.find_symbol` is broken"
-                return text(element['content'])
+    def from_md(cls, text:'SOURCE', zero_copy:'bool'=False, backend:'t.Optional[str]'=None, encoding:'t.Optional[str]'=None) -> 'List[Symbol]':
+        if cls.parse_cache is not None:
+            trees = cls.parse_cache.parse("md", cls.md_backends.get_backend(backend), text, encoding)
+            if trees is not None:
+                return List(cls.from_tree(tree) for tree in trees)
+
+        parser = cls.md_backends.get_backend(backend)(zero_copy=zero_copy, builder=SymbolBuilder(cls.collection))
+        # Backends written before `encoding` existed only take the source
+        return List(parser.parse(text) if encoding is None else parser.parse(text, encoding))
+
+    @classmethod
+    def iter_md(cls, text:'SOURCE', zero_copy:'bool'=False, backend:'t.Optional[str]'=None, encoding:'t.Optional[str]'=None) -> 't.Iterator[Symbol]':
+        """
+        Yield top level symbols as soon as their block is finished, see `MDParser.iter_blocks`.
+        """
+        parser = cls.md_backends.get_backend(backend)(zero_copy=zero_copy, builder=SymbolBuilder(cls.collection))
+        iter_blocks = getattr(parser, "iter_blocks", None)
+        if iter_blocks is None:
+            # Backends that can only parse whole documents
+            yield from (parser.parse(text) if encoding is None else parser.parse(text, encoding))
+        else:
+            yield from iter_blocks(text, encoding)
+
+    @classmethod
+    def md_document(cls, text:'str', zero_copy:'bool'=False, backend:'t.Optional[str]'=None) -> 'MDDocument':
+        """
+        Parse `text` into an `MDDocument` of top level symbols, its `edit` re-parses only the
+        blocks an edit touches and splices the new symbols into `blocks`.
+        """
+        parser = cls.md_backends.get_backend(backend)(zero_copy=zero_copy, builder=SymbolBuilder(cls.collection))
+        return MDDocument(text, parser)
 
-            symbol_cls = cls.collection.find_symbol(element['name'], raise_errors=True)
-            assert symbol_cls is not None, "`collection.find_symbol` is broken"
+    @classmethod
+    def from_tree(cls, tree:'t.Optional[TREE]') -> 't.Optional[Symbol]':
+        """
+        Build symbols from a `TREE`, e.g. one from `MD.parse_many`. Trees can be shared (see
+        `ParseCache`), the symbols get their own copy of the attributes. The `None` block of
+        a Markdown `title:` line is passed through, as the parsers return it.
+        """
+        if tree is None:
+            return None
+
+        builder = SymbolBuilder(cls.collection)
+        if isinstance(tree, str):
+            return builder.text(tree)
+
+        # Element, its remaining children and the symbols built for the ones before
+        stack: 'list[tuple[TREE, t.Iterator[TREE], list[Symbol]]]' = [(tree, iter(tree[2]), [])]
+        while True:
+            node, children, inner = stack[-1]
+            for child in children:
+                if isinstance(child, str):
+                    inner.append(builder.text(child))
+                else:
+                    stack.append((child, iter(child[2]), []))
+                    break
+            else:
+                stack.pop()
+                symbol = builder.element(node[0], copy_attributes(node[1]), inner)
+                if not stack:
+                    return symbol
+                stack[-1][2].append(symbol)
 
-            return symbol_cls.parse(element)
+    @classmethod
+    def parse(cls, text:'ELEMENT|TEXT') -> 'Symbol':
+        builder = SymbolBuilder(cls.collection)
+
+        def handle_text(node:'TEXT'):
+            # Lazy text nodes are handed over as is so the string is only built when read
+            return builder.text(node if isinstance(node, LazyText) else node["content"])
 
         if text["type"] == "text":
-            return cls.collection.find_symbol("text", raise_errors=True)(text["content"])
+            return handle_text(text)
+
+        # Element, its remaining children and the symbols built for the ones before
+        stack: 'list[tuple[ELEMENT, t.Iterator[ELEMENT|TEXT], list[Symbol]]]' = [(text, iter(text["children"]), [])]
+        while True:
+            element, children, inner = stack[-1]
+            for child in children:
+                if child["type"] == "text":
+                    inner.append(handle_text(child))
+                else:
+                    stack.append((child, iter(child["children"]), []))
+                    break
+            else:
+                stack.pop()
+                if not stack:
+                    return cls(inner=inner, **cls.parse_attributes(element["attributes"]))
 
-        # Extract attributes directly from the attributes dictionary
-        attributes = text["attributes"]
+                stack[-1][2].append(builder.element(element["name"], element["attributes"], inner))
 
+    @staticmethod
+    def parse_attributes(attributes:'ATTRS') -> 'ATTRS':
+        """
+        Split the `class` and `style` attributes into a list and a dict, in place.
+        """
         # Handle class attribute separately if it exists
-        classes:'list[str]' = []
         if "class" in attributes:
-            classes = attributes["class"].split() if isinstance(attributes["class"], str) else attributes["class"]
-            attributes["class"] = classes
+            classes = attributes["class"]
+            if isinstance(classes, str):
+                attributes["class"] = classes.split()
 
         # Handle style attribute separately if it exists
-        styles = {}
         if "style" in attributes:
             style_str = attributes["style"]
             if isinstance(style_str, str):
-                styles = dict(item.split(":") for item in style_str.split(";") if ":" in item)
-            elif isinstance(style_str, dict):
-                styles = style_str
-            attributes["style"] = styles
-
-        inner=[handle_element(elm) for elm in text["children"]]
+                attributes["style"] = dict(item.split(":") for item in style_str.split(";") if ":" in item)
+            elif not isinstance(style_str, dict):
+                attributes["style"] = {}
 
-        return cls(
-            inner=inner,
-            **attributes
-        )
+        return attributes
 
     def get_prop(self, prop:'str', default: 'T1'=None) -> 'ATTR_TYPES| T1':
         try:
@@ -261,6 +536,23 @@ class Symbol:
 
     @property
     def inner_html(self) -> 'InnerHTML':
-        if not self.prepared:
-            self.prepare()
+        self.ensure_prepared()
         return self.document
+
+
+class SymbolBuilder:
+    """
+    Parser `Builder` creating symbols directly, without an `ELEMENT`/`TEXT` tree in between.
+    """
+
+    def __init__(self, collection:'Collection'):
+        self.collection = collection
+        self.text_symbol = collection.find_symbol("text", raise_errors=True)
+
+    def element(self, name:'str', attributes:'ATTRS', children:'list[Symbol]') -> 'Symbol':
+        symbol_cls = self.collection.find_symbol(name, raise_errors=True)
+        return symbol_cls(inner=children, **symbol_cls.parse_attributes(attributes))
+
+    def text(self, content:'str | LazyText') -> 'Symbol':
+        # Lazy text nodes are handed over as is so the string is only built when read
+        return self.text_symbol(content)
@@ -200,8 +200,8 @@ class Table(Symbol):
         super().__init__(inner, **props)
 
 
-    def prepare(self, parent: Symbol = None, dom: list[Symbol] = None, *args, **kwargs):
-        return super().prepare(parent, dom, *args, **kwargs, table=self)
+    def before_prepare(self, parent: Symbol, **kwargs):
+        return {**kwargs, "table": self}
     
     def to_dict(self):
         return {
@@ -226,8 +226,7 @@ class Table(Symbol):
         return self
 
     def to_pandas(self):
-        if not self.prepared:
-            self.prepare()
+        self.ensure_prepared()
 
         logger.debug("Converting Table to pandas DataFrame")
         try:
@@ -285,8 +284,7 @@ class Table(Symbol):
             raise
 
     def to_list(self):
-        if not self.prepared:
-            self.prepare()
+        self.ensure_prepared()
         ret = []
 
         if self.head is not None:
@@ -359,8 +357,7 @@ class THead(Symbol):
         return self
 
     def to_list(self) -> 'list[list[str]]':
-        if not self.prepared:
-            self.prepare()
+        self.ensure_prepared()
 
         return [row.to_list() for row in self.data]
 
@@ -374,12 +371,12 @@ class THead(Symbol):
 
         return self
 
-    def prepare(self, parent = None, dom=None, table=None, *args, **kwargs):
+    def before_prepare(self, parent, table=None, **kwargs):
         assert isinstance(table, Table)
 
         self.table = table
         self.table.head = self
-        return super().prepare(parent, dom, *args, **kwargs, table=table, head=self)
+        return {**kwargs, "table": table, "head": self}
 
 class TBody(Symbol):
     html = "tbody"
@@ -399,8 +396,7 @@ class TBody(Symbol):
         return iter(self.data)
 
     def to_pandas(self) -> 'list[pd.Series]':
-        if not self.prepared:
-            self.prepare()
+        self.ensure_prepared()
 
         logger.debug("Converting TBody to pandas format")
         data = [e.to_pandas() for e in self.data]
@@ -424,8 +420,7 @@ class TBody(Symbol):
             raise ImportError("`tables` extra is required to use `from_pandas`")
 
     def to_list(self):
-        if not self.prepared:
-            self.prepare()
+        self.ensure_prepared()
 
         return [row.to_list() for row in self.data]
 
@@ -443,12 +438,12 @@ class TBody(Symbol):
 
         return self
 
-    def prepare(self, parent = None, dom=None, table=None, *args, **kwargs):
+    def before_prepare(self, parent, table=None, **kwargs):
         assert isinstance(table, Table)
 
         self.table = table
         self.table.body = self
-        return super().prepare(parent, dom, *args, **kwargs, table=table, head=self)
+        return {**kwargs, "table": table, "head": self}
 
 class TFoot(Symbol):
     html = "tfoot"
@@ -469,8 +464,7 @@ class TFoot(Symbol):
         return iter(self.data)
 
     def to_pandas(self):
-        if not self.prepared:
-            self.prepare()
+        self.ensure_prepared()
 
         logger.debug("Converting TFoot to pandas format")
         data = [e.to_pandas() for e in self.data]
@@ -494,8 +488,7 @@ class TFoot(Symbol):
             raise ImportError("`tables` extra is required to use `from_pandas`")
 
     def to_list(self):
-        if not self.prepared:
-            self.prepare()
+        self.ensure_prepared()
 
         return [e.to_list() for e in self.data]
     
@@ -506,12 +499,12 @@ class TFoot(Symbol):
             self.add_child(Tr.from_list(row))
         return self
 
-    def prepare(self, parent = None, dom=None, table=None, *args, **kwargs):
+    def before_prepare(self, parent, table=None, **kwargs):
         assert isinstance(table, Table)
 
         self.table = table
         self.table.foot = self
-        return super().prepare(parent, dom, *args, **kwargs, table=table, head=self)
+        return {**kwargs, "table": table, "head": self}
 
 class Tr(Symbol):
     html = "tr"
@@ -532,8 +525,7 @@ class Tr(Symbol):
         return iter(self.data)
 
     def to_pandas(self):
-        if not self.prepared:
-            self.prepare()
+        self.ensure_prepared()
 
         if isinstance(self.head, THead):
             raise ValueError("This `Tr` is a header row and cannot be converted to a pandas `Series`")
@@ -571,8 +563,7 @@ class Tr(Symbol):
             raise ImportError("`tables` extra is required to use `from_pandas`")
 
     def to_list(self):
-        if not self.prepared:
-            self.prepare()
+        self.ensure_prepared()
 
         return [e.data for e in self.data]
 
@@ -585,7 +576,7 @@ class Tr(Symbol):
 
         return self
 
-    def prepare(self, parent = None, dom=None, table=None, head:'THead|TBody|TFoot'=None, *args, **kwargs):
+    def before_prepare(self, parent, table=None, head:'THead|TBody|TFoot'=None, **kwargs):
         assert isinstance(table, Table)
         if not isinstance(head, (THead, TBody, TFoot)):
             head = TBody()
@@ -596,12 +587,11 @@ class Tr(Symbol):
         self.table = table
         self.head = head
         self.head.data.append(self)
-        ret = super().prepare(parent, dom, *args, **kwargs, table=table, row=self, head=head)
+        return {**kwargs, "table": table, "row": self, "head": head}
 
+    def after_prepare(self, parent, **kwargs):
         self.table.widths = [max(len(max(("" if col is None else col.data).splitlines(), key=len, default="")), width or 0, 3) for col, width in it.zip_longest(self.data, self.table.widths,  fillvalue=None)]
 
-        return ret
-
 class Data(Symbol):
     def __init__(self, inner: list[Symbol] = None, **props: 'ATTR_TYPES'):
         super().__init__(inner, **props)
@@ -615,7 +605,7 @@ class Data(Symbol):
     def width(self):
         return len(self.data)
     
-    def prepare(self, parent = None, dom=None, table=None, head=None, row=None, *args, **kwargs):
+    def before_prepare(self, parent, table=None, head=None, row=None, **kwargs):
         if not isinstance(row, Tr):
             row = Tr()
             self.change_parent(row)
@@ -627,10 +617,10 @@ class Data(Symbol):
                 row.change_parent(head)
 
         if isinstance(head, THead):
-            return self.head_prepare(parent, dom, table, row, *args, **kwargs)
-        return self.data_prepare(parent, dom, table, row, *args, **kwargs)
+            return self.head_prepare(parent, table, row, **kwargs)
+        return self.data_prepare(parent, table, row, **kwargs)
 
-    def data_prepare(self, parent = None, dom=None, table=None, row=None, *args, **kwargs):
+    def data_prepare(self, parent = None, table=None, row=None, **kwargs):
         assert isinstance(table, Table)
         self.table = table
         self.row = row
@@ -645,9 +635,9 @@ class Data(Symbol):
 
         self.header = op_get(self.table.headers, len(self.row.data) - 1, HeadlessTd())
         self.table.cols[self.header].append(self)
-        return super().prepare(parent, dom, *args, **kwargs, table=table, data=self)
+        return {**kwargs, "table": table, "data": self}
 
-    def head_prepare(self, parent = None, dom=None, table=None, row=None, *args, **kwargs):
+    def head_prepare(self, parent = None, table=None, row=None, **kwargs):
         assert isinstance(table, Table)
         self.table = table
         self.row = row
@@ -656,7 +646,7 @@ class Data(Symbol):
         self.header = self
         self.table.cols[self] = []
         self.table.headers.append(self)
-        return super().prepare(parent, dom, *args, **kwargs, table=table, data=self)
+        return {**kwargs, "table": table, "data": self}
 
     def __len__(self):
         return len(self.data)
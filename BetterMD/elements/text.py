@@ -1,6 +1,11 @@
+from functools import cached_property
+
 from .symbol import Symbol
+from .document import InnerHTML
 from ..markdown import CustomMarkdown
 from ..html import CustomHTML
+from ..parse import LazyText
+from ..utils import List
 
 
 # This is not equivalent to the html span or p tags but instead just raw text
@@ -11,12 +16,57 @@ class Text(Symbol):
     html = "raw_text"
     rst = "raw_text"
 
-    def __init__(self, text:'str'="", **props):
+    # Most symbols in a document are text, they only hold their string until something
+    # asks for the rest of what a `Symbol` has
+    parent = None
+    prepared = False
+    html_written_props = ""
+    # Shared by every `Text` until a child is added to it
+    children:'List[Symbol]' = ()
+
+    def __init__(self, text:'str | LazyText'="", **props):
         self._text = text
-        return super().__init__(**props)
+        if props:
+            self.props = props
+
+    @cached_property
+    def props(self) -> 'dict':
+        return {}
+
+    def add_child(self, symbol:'Symbol'):
+        self.own_children()
+        super().add_child(symbol)
+
+    def extend_children(self, symbols:'list[Symbol]'):
+        self.own_children()
+        super().extend_children(symbols)
+
+    def remove_child(self, symbol:'Symbol'):
+        self.own_children()
+        super().remove_child(symbol)
+
+    def replace_child(self, old:'Symbol', new:'Symbol'):
+        self.own_children()
+        super().replace_child(old, new)
+
+    def own_children(self):
+        if isinstance(self.children, tuple):
+            self.children = List()
+
+    @cached_property
+    def document(self) -> 'InnerHTML':
+        return InnerHTML(self)
+
+    @cached_property
+    def nuuid(self) -> 'int':
+        cls = type(self)
+        with cls._cuuid_lock:
+            return next(cls._cuuid)
 
     @property
     def text(self):
+        if isinstance(self._text, LazyText):
+            self._text = self._text["content"]
         return self._text
 
     def to_html(self, indent=0):
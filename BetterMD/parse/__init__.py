@@ -1,6 +1,13 @@
 from .collection import Collection
-from .typing import ELEMENT, TEXT
+from .typing import ELEMENT, TEXT, EVENT, Builder
+from .nodes import LazyText, ElementNode, TextNode, copy_attributes
+from .decoding import decode_chunks, detect_encoding
 from .html import HTMLParser
-from .markdown import MDParser
+from .stdlib_html import StdlibHTMLParser
+from .markdown import MDParser, MDDocument
+from .backends import Backends
 
-__all__ = ["Collection", "HTMLParser", "MDParser", "ELEMENT", "TEXT"]
\ No newline at end of file
+html_backends = Backends("builtin", builtin=HTMLParser, stdlib=StdlibHTMLParser)
+md_backends = Backends("builtin", builtin=MDParser)
+
+__all__ = ["Collection", "HTMLParser", "StdlibHTMLParser", "MDParser", "MDDocument", "Backends", "Builder", "html_backends", "md_backends", "ELEMENT", "TEXT", "EVENT", "LazyText", "ElementNode", "TextNode", "copy_attributes", "decode_chunks", "detect_encoding"]
\ No newline at end of file
@@ -0,0 +1,45 @@
+import threading
+import typing as t
+
+if t.TYPE_CHECKING:
+    from .typing import Parser
+
+class Backends:
+    """
+    Named parser classes for one input format. A backend is picked per call by name,
+    or falls back to `default`, which can be changed globally with `set_default`.
+    """
+
+    def __init__(self, default: 'str', **backends: 'type[Parser]'):
+        # Replaced rather than mutated, parsers already running keep the mapping they looked up
+        self.backends: 'dict[str, type[Parser]]' = backends
+        self.default = default
+        self._lock = threading.Lock()
+
+    def add_backend(self, name: 'str', parser_class: 'type[Parser]'):
+        with self._lock:
+            self.backends = {**self.backends, name: parser_class}
+
+    def remove_backend(self, name: 'str'):
+        with self._lock:
+            if name == self.default:
+                raise ValueError(f"Backend `{name}` is the default backend and can't be removed.")
+
+            backends = dict(self.backends)
+            del backends[name]
+            self.backends = backends
+
+    def set_default(self, name: 'str'):
+        with self._lock:
+            if name not in self.backends:
+                raise ValueError(f"Backend `{name}` not found, available backends are: {', '.join(self.backends)}.")
+            self.default = name
+
+    def get_backend(self, name: 't.Optional[str]' = None) -> 'type[Parser]':
+        if name is None:
+            name = self.default
+
+        try:
+            return self.backends[name]
+        except KeyError:
+            raise ValueError(f"Backend `{name}` not found, available backends are: {', '.join(self.backends)}.") from None
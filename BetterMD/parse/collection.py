@@ -8,6 +8,8 @@ class Collection:
         self.symbols = list(symbols)
         self.cached = False
         self.qual_names_cache = {}
+        # Name exactly as given (e.g. `DIV`) -> symbol, so the lookup is one dict hit per node
+        self.names_cache: 'dict[str, type[Symbol]]' = {}
 
     @property
     def qual_keys(self):
@@ -15,6 +17,7 @@ class Collection:
             return self.qual_names_cache
         
         self.qual_names_cache = {s.__qualname__.lower(): s for s in self.symbols}
+        self.names_cache = {}
         self.cached = True
         return self.qual_names_cache
 
@@ -33,9 +36,15 @@ class Collection:
     def find_symbol(self, name:'str', raise_errors:'t.Literal[True]') -> 't.Union[type[Symbol], t.NoReturn]': ...
 
     def find_symbol(self, name:'str', raise_errors:'bool'=False):
+        if self.cached:
+            symbol = self.names_cache.get(name)
+            if symbol is not None:
+                return symbol
+
         lname = name.lower()
         if lname in self.qual_keys:
-            return self.qual_keys[lname]
+            symbol = self.names_cache[name] = self.qual_keys[lname]
+            return symbol
 
 
         if raise_errors:
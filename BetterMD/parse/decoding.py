@@ -0,0 +1,211 @@
+import codecs
+import itertools
+import re
+import typing as t
+from collections.abc import Buffer
+
+if t.TYPE_CHECKING:
+    class Readable(t.Protocol):
+        def read(self, size:'int'=-1) -> 't.Union[str, bytes]': ...
+
+    SOURCE = t.Union[str, Buffer, Readable, t.Iterable[t.Union[str, bytes]]]
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_ENCODING = "utf-8"
+
+# Longest first, the UTF-32 LE BOM starts with the UTF-16 LE one
+BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+BOM_SIZE = max(len(bom) for bom, _ in BOMS)
+
+# How far into an HTML document `<meta charset>` is looked for, as in the HTML prescan
+PRESCAN_SIZE = 1024
+
+CHARSET_RE = re.compile(rb"""<meta[^>]*?charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.IGNORECASE)
+XML_DECL_RE = re.compile(rb"""^<\?xml[^>]*?encoding\s*=\s*["']([a-zA-Z0-9_.:-]+)""")
+
+def lookup(encoding:'str') -> 't.Optional[str]':
+    try:
+        return codecs.lookup(encoding).name
+    except LookupError:
+        return None
+
+def detect_encoding(head:'bytes', html:'bool'=False, default:'str'=DEFAULT_ENCODING) -> 'str':
+    """
+    Guess the encoding of a document from its first bytes.
+
+    A byte order mark wins, then for HTML an XML declaration or a `<meta charset>` in the
+    first `PRESCAN_SIZE` bytes, otherwise `default`.
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+
+    if html:
+        head = head[:PRESCAN_SIZE]
+        match = XML_DECL_RE.match(head) or CHARSET_RE.search(head)
+        if match:
+            encoding = lookup(match.group(1).decode("ascii"))
+            # A declared UTF-16/32 without a BOM can't be right, the declaration itself was ASCII
+            if encoding is not None and not encoding.startswith(("utf-16", "utf-32")):
+                return encoding
+
+    return default
+
+def decode_chunks(source:'SOURCE', encoding:'t.Optional[str]'=None, html:'bool'=False, chunk_size:'int'=CHUNK_SIZE) -> 't.Iterator[str]':
+    """
+    Lazily decode `source` into `str` chunks.
+
+    `source` can be a `str`, anything supporting the buffer protocol (`bytes`,
+    `bytearray`, `memoryview`, `mmap`), a file like object opened in text or binary
+    mode or an iterable of `str` or `bytes` chunks or lines, see `decode_iter`. Buffers
+    are sliced without copying, so only the `chunk_size` bytes being decoded are ever
+    held as `str`. Without an `encoding` it is detected with `detect_encoding`.
+    """
+    if isinstance(source, str):
+        for i in range(0, len(source), chunk_size):
+            yield source[i:i+chunk_size]
+        return
+
+    if not isinstance(source, Buffer):
+        if hasattr(source, "read"):
+            yield from decode_stream(source, encoding, html, chunk_size)
+        else:
+            yield from decode_iter(source, encoding, html)
+        return
+
+    view = memoryview(source)
+
+    # Released on the way out so an `mmap` can be closed as soon as parsing is done
+    with view, view.cast("B") as view:
+        if encoding is None:
+            encoding = detect_encoding(bytes(view[:PRESCAN_SIZE]), html)
+
+        decoder = codecs.getincrementaldecoder(encoding)()
+        for i in range(0, len(view), chunk_size):
+            text = decoder.decode(view[i:i+chunk_size])
+            if text:
+                yield text
+
+        text = decoder.decode(b"", True)
+        if text:
+            yield text
+
+def read_chunks(file:'Readable', chunk_size:'int'=CHUNK_SIZE) -> 't.Iterator[t.Union[str, bytes]]':
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+def decode_stream(file:'Readable', encoding:'t.Optional[str]'=None, html:'bool'=False, chunk_size:'int'=CHUNK_SIZE) -> 't.Iterator[str]':
+    return decode_iter(read_chunks(file, chunk_size), encoding, html)
+
+def decode_iter(chunks:'t.Iterable[t.Union[str, bytes]]', encoding:'t.Optional[str]'=None, html:'bool'=False) -> 't.Iterator[str]':
+    """
+    Decode an iterable of chunks or lines, e.g. a file, a socket reader or a generator.
+    `str` chunks are passed through, `bytes` are decoded incrementally.
+    """
+    chunks = iter(chunks)
+    for chunk in chunks:
+        if chunk:
+            break
+    else:
+        return
+
+    if isinstance(chunk, str):
+        # Already decoded, e.g. by a file opened in text mode
+        yield chunk
+        yield from chunks
+        return
+
+    head = [chunk]
+    if encoding is None:
+        # The first chunk can be a single line, or split the BOM
+        size = PRESCAN_SIZE if html else BOM_SIZE
+        length = len(chunk)
+        while length < size:
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            head.append(chunk)
+            length += len(chunk)
+        encoding = detect_encoding(b"".join(head), html)
+
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in itertools.chain(head, chunks):
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+
+    text = decoder.decode(b"", True)
+    if text:
+        yield text
+
+def iter_lines(chunks:'t.Iterable[str]') -> 't.Iterator[str]':
+    """
+    Split decoded chunks into lines without line endings, the same lines as
+    `str.splitlines` on the whole text.
+    """
+    rest = ""
+    for chunk in chunks:
+        text = rest + chunk if rest else chunk
+        # A `\r` at the end may be the first half of a `\r\n` split across chunks
+        held = text.endswith("\r")
+        if held:
+            text = text[:-1]
+
+        lines = text.splitlines(True)
+        rest = ""
+        if lines:
+            last = lines[-1].splitlines()[0]
+            if last == lines[-1]:
+                # No line ending yet, the line continues in the next chunk
+                rest = lines.pop()
+
+        for line in lines:
+            yield line.splitlines()[0]
+
+        if held:
+            rest += "\r"
+
+    if rest:
+        yield from rest.splitlines()
+
+def decode_lines(source:'SOURCE', encoding:'t.Optional[str]'=None, chunk_size:'int'=CHUNK_SIZE) -> 't.Iterator[str]':
+    """
+    Lazily split `source` into lines without line endings.
+
+    The items of an iterable of `str` (a generator, `str.splitlines()`) are taken as
+    lines, with or without their line endings. Files, buffers and iterables of `bytes`
+    are decoded with `decode_chunks` and split wherever their lines end.
+    """
+    if isinstance(source, str):
+        yield from source.splitlines()
+        return
+
+    if isinstance(source, Buffer) or hasattr(source, "read"):
+        yield from iter_lines(decode_chunks(source, encoding, chunk_size=chunk_size))
+        return
+
+    items = iter(source)
+    for first in items:
+        break
+    else:
+        return
+
+    if not isinstance(first, str):
+        yield from iter_lines(decode_iter(itertools.chain([first], items), encoding))
+        return
+
+    for item in itertools.chain([first], items):
+        if item:
+            yield from item.splitlines()
+        else:
+            yield ""
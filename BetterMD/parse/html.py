@@ -1,13 +1,58 @@
-from .typing import ELEMENT, TEXT, ELEMENT_TYPES
+from .typing import ELEMENT, TEXT, EVENT, ELEMENT_TYPES, Builder
+from .nodes import LazyText, ElementNode, TextNode
+from .decoding import CHUNK_SIZE, decode_chunks
 from ..typing import ATTRS
 import typing as t
+import sys
 import re
 
+if t.TYPE_CHECKING:
+    from .decoding import SOURCE
+
+BLOCK_ELEMENTS = frozenset(ELEMENT_TYPES["block"])
+INLINE_ELEMENTS = frozenset(ELEMENT_TYPES["inline"])
+VOID_ELEMENTS = frozenset(ELEMENT_TYPES["void"])
+
 class HTMLParser:
-    NON_PARSING_TAGS = ["script", "style", "textarea", "pre"]
+    NON_PARSING_TAGS = frozenset(["script", "style", "textarea", "pre"])
     WS_RE = re.compile(r"\s+")
+    NON_WS_RE = re.compile(r"\S")
+
+    # Tokenizer patterns. All of them are anchored with `pattern.match(html, pos)`
+    # so the source is never copied while scanning.
+    TAG_NAME_RE = re.compile(r"[^\s/>]*")
+    # Tag name, then the raw attribute text (quote aware) up to `>`
+    START_TAG_RE = re.compile(r"""([^\s/>]*)((?:[^>"'`]+|"[^"]*"|'[^']*'|`[^`]*`|["'`])*+)>""")
+    # Same, but an unmatched quote means the tag continues in the next chunk
+    STRICT_START_TAG_RE = re.compile(r"""([^\s/>]*)((?:[^>"'`]+|"[^"]*"|'[^']*'|`[^`]*`)*+)>""")
+    CLOSING_TAG_RE = re.compile(r"([^>]*)>")
+    # What has to be fed before a construct waiting for more data can end, see `push`
+    TAG_END_RE = re.compile(">")
+    TEXT_END_RE = re.compile("<")
+    COMMENT_END_RE = re.compile("-->")
+    ATTR_RE = re.compile(
+        r"""([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|`([^`]*)`|([^\s>]*)))?"""
+    )
+
+    _closing_res: 'dict[str, re.Pattern[str]]' = {}
+
+    # Events tokenized before they're built, when building a tree
+    EVENTS_PER_BUILD = 1024
+
+    def __init__(self, zero_copy: 'bool' = False, compact: 'bool' = False, builder: 't.Optional[Builder]' = None):
+        """
+        With `zero_copy`, text nodes are `LazyText` slices of the source whose content is
+        only built when read.
 
-    def __init__(self):
+        With `compact`, the tree is made of `ElementNode`/`TextNode` objects instead of dicts.
+
+        With a `builder`, no tree of nodes is made at all, `builder.element` is called as
+        each element closes and the parser returns what it built.
+        """
+        self.zero_copy = zero_copy
+        self.compact = compact
+        self.builder = builder
+        self._process_text_node = self.process_text_node
         self.reset()
 
     @property
@@ -16,8 +61,6 @@ class HTMLParser:
 
     def reset(self):
         self.dom: 'list[ELEMENT|TEXT]' = []
-        self.buffer = ""
-        self.state = ""
         self.current_tag = {
             "type": "element",
             "name": "dom",
@@ -26,9 +69,22 @@ class HTMLParser:
             "parent": None
         }
         self.tag = ""
-        self.non_parsing_content = ""
-        self.in_non_parsing_tag = False
-        self.current_non_parsing_tag = None
+
+        # Incremental tokenizer state, see `feed`
+        self.rawdata = ""
+        # Chunks fed after `rawdata` that can't end what it's waiting for, and the pattern
+        # one has to match (with how many characters before it) to tokenize again
+        self.pending: 'list[str]' = []
+        self.until: 't.Optional[tuple[re.Pattern[str], int]]' = None
+        self.tail = ""
+        self.raw_tag: 't.Optional[str]' = None
+        self.searched = 0
+        self.open_tags: 'list[str]' = []
+        self.events: 'list[EVENT]' = []
+        # Whether events are built into a tree as they're tokenized, `iterparse` yields them
+        self.building = True
+        # Open elements in builder mode: name, attributes, built children
+        self.stack: 'list[tuple[str, ATTRS, list]]' = []
 
     def create_element(
         self,
@@ -42,6 +98,9 @@ class HTMLParser:
         if attrs is None:
             attrs = {}
 
+        if self.compact:
+            return ElementNode(name, attrs, children, self.current_tag)
+
         return {
             "type": "element",
             "name": name,
@@ -50,73 +109,268 @@ class HTMLParser:
             "parent": self.current_tag
         }
 
-    def create_text(self, content: 'str') -> 'TEXT':
+    def create_text(self, content: 'str | LazyText') -> 'TEXT':
+        if isinstance(content, LazyText):
+            return content
+
+        if self.compact:
+            return TextNode(content)
+
         return {
             "type": "text",
             "content": content,
             "name": "text"
         }
 
-    def parse(self, html: 'str') -> 'list[ELEMENT]':
+    def closing_re(self, tag: 'str') -> 're.Pattern[str]':
+        """
+        Return the (cached) case-insensitive pattern matching the closing tag of a raw text element.
+        """
+        pattern = self._closing_res.get(tag)
+        if pattern is None:
+            pattern = self._closing_res[tag] = re.compile(f"</{re.escape(tag)}>", re.IGNORECASE)
+        return pattern
+
+    def parse(self, html: 'SOURCE', encoding: 't.Optional[str]' = None) -> 'list[ELEMENT]':
+        """
+        Parse a whole document.
+
+        `html` can also be `bytes`, a `memoryview`, an `mmap` or a file, decoded a chunk at
+        a time with `encoding`, or the encoding found by `detect_encoding`.
+        """
         self.reset()
-        i = 0
+        if isinstance(html, str):
+            self.feed(html)
+        else:
+            for chunk in decode_chunks(html, encoding, html=True):
+                self.feed(chunk)
+        return self.close()
+
+    def feed(self, data: 'str'):
+        """
+        Feed a chunk of the document to the parser.
+
+        Anything that can't be tokenized yet (a tag, comment or raw text element split
+        across chunks) is kept until the next call to `feed` or `close`.
+        """
+        if self.push(data):
+            self.goahead(False)
+            self.build(self.pop_events())
+
+    def push(self, data: 'str') -> 'bool':
+        """
+        Add `data` to the unparsed data, returns whether any of it can be tokenized.
+
+        Chunks that can't end the construct waiting for more data are only kept in a list,
+        the data is joined once one can, so a construct split across many chunks is copied
+        once instead of once per chunk.
+        """
+        if self.until is not None:
+            pattern, overlap = self.until
+            # The end can start in the chunks before
+            data_tail = self.tail + data
+            if pattern.search(data_tail) is None:
+                self.pending.append(data)
+                self.tail = data_tail[max(0, len(data_tail) - overlap):]
+                return False
+
+        if self.pending:
+            self.rawdata = "".join([self.rawdata, *self.pending, data])
+            self.pending = []
+        else:
+            self.rawdata = self.rawdata + data if self.rawdata else data
+        self.until = None
+        return True
+
+    def waiting_for(self, html: 'str', start: 'int') -> 't.Optional[tuple[re.Pattern[str], int]]':
+        """
+        What can end the construct at `start` that needs more data, `None` if anything can.
+        """
+        if self.raw_tag is not None:
+            return self.closing_re(self.raw_tag), len(self.raw_tag) + 2
+        if not html.startswith("<", start):
+            return self.TEXT_END_RE, 0
+        if html.startswith("<!--", start):
+            return self.COMMENT_END_RE, 2
+        if len(html) - start < 4 and "<!--".startswith(html[start:]):
+            return None
+        return self.TAG_END_RE, 0
+
+    def close(self) -> 'list[ELEMENT]':
+        """
+        Parse any remaining buffered data and return the finished DOM.
+        """
+        self.until = None
+        self.push("")
+        self.goahead(True)
+        self.build(self.pop_events())
+        return self.dom
+
+    def iterparse(self, source: 'SOURCE', chunk_size: 'int' = CHUNK_SIZE, encoding: 't.Optional[str]' = None) -> 't.Iterator[EVENT]':
+        """
+        Lazily yield `(event, name, data)` tuples for `source`, a string, an iterable of chunks
+        or anything `parse` accepts.
+
+        - `("start", name, attributes)` when an element opens
+        - `("end", name, None)` when it closes
+        - `("text", "text", content)` for text, with whitespace already processed
+        - `("comment", "comment", content)` for comments
 
-        while i < len(html):
-            char = html[i]
-            if self.in_non_parsing_tag:
-                closing_tag = f"</{self.current_non_parsing_tag}>"
-                if html[i:i+len(closing_tag)].lower() == closing_tag.lower():
-                    # Found closing tag, create element with unparsed content
-                    self.children.append(self.create_text(self.non_parsing_content))
+        In zero copy mode `content` is a `LazyText` node.
+
+        No tree is built, so memory stays flat however large the document is.
+        """
+        self.reset()
+        self.building = False
+        for chunk in decode_chunks(source, encoding, html=True, chunk_size=chunk_size):
+            if self.push(chunk):
+                self.goahead(False)
+                yield from self.pop_events()
+
+        self.until = None
+        self.push("")
+        self.goahead(True)
+        yield from self.pop_events()
+
+    def build_events(self):
+        """
+        Build the events tokenized so far, so a large chunk (e.g. a whole document given to
+        `parse`) never has all of its events in memory at once as well as the tree.
+        """
+        if self.building:
+            self.build(self.pop_events())
+
+    def pop_events(self) -> 'list[EVENT]':
+        events = self.events
+        self.events = []
+        return events
+
+    def build(self, events: 't.Iterable[EVENT]'):
+        """
+        Tree builder: turn an event stream into nested `ELEMENT`/`TEXT` dicts under `self.dom`.
+        """
+        if self.builder is not None:
+            return self.build_with(self.builder, events)
+
+        for event, name, data in events:
+            if event == "start":
+                elm = self.create_element(name, data)
+                self.children.append(elm)
+                self.current_tag = elm
+            elif event == "text":
+                self.children.append(self.create_text(data))
+            elif event == "end":
+                if self.current_tag["parent"] is not None:
+                    # After closing a block element, trim first/last newlines in children.
+                    # Raw text elements (e.g. `pre`) keep their content untouched.
+                    name = self.current_tag["name"]
+                    if self.is_block_element(name) and name not in self.NON_PARSING_TAGS:
+                        self.trim_block_element_whitespace(self.current_tag)
                     self.current_tag = self.current_tag["parent"]
+            elif event == "comment":
+                self.children.append(self.create_element("comment", children=[self.create_text(data)]))
+
+    def build_with(self, builder: 'Builder', events: 't.Iterable[EVENT]'):
+        # Text directly inside a block element is always stripped by `process_text_node`,
+        # so unlike `build` there are no newlines left to trim here
+        stack = self.stack
+        children = stack[-1][2] if stack else self.dom
+
+        for event, name, data in events:
+            if event == "start":
+                children = []
+                stack.append((name, data, children))
+            elif event == "text":
+                children.append(builder.text(data))
+            elif event == "end":
+                if stack:
+                    name, attrs, elm_children = stack.pop()
+                    children = stack[-1][2] if stack else self.dom
+                    children.append(builder.element(name, attrs, elm_children))
+            elif event == "comment":
+                children.append(builder.element("comment", {}, [builder.text(data)]))
+
+    def goahead(self, end: 'bool'):
+        html = self.rawdata
+        i = 0
+        n = len(html)
+        find = html.find
 
-                    self.in_non_parsing_tag = False
-                    self.current_non_parsing_tag = None
-                    self.non_parsing_content = ""
-                    i += len(closing_tag)
-                else:
-                    self.non_parsing_content += char
-                    i += 1
-                continue
-
-            elif char == '<':
-                if self.buffer:
-                    # Process buffer according to current tag type
-                    processed_text = self.process_text_node(
-                        self.buffer, self.current_tag["name"]
-                    )
-                    if processed_text:
-                        self.children.append(self.create_text(processed_text))
-                    self.buffer = ""
-
-                # Check for comment
-                if html[i:i+4] == '<!--':
-                    i = self.handle_comment(html, i + 4)
-                elif html[i + 1] == '/':
-                    # Closing tag
-                    i = self.handle_closing_tag(html, i + 2)
-                    if self.current_tag["parent"] is not None:
-                        # After closing a block element, trim first/last newlines in children
-                        if self.is_block_element(self.current_tag["name"]):
-                            self.trim_block_element_whitespace(self.current_tag)
-                        self.current_tag = self.current_tag["parent"]
-                else:
-                    # Opening tag
-                    i = self.handle_opening_tag(html, i + 1)
-                    # Check if we entered a non-parsing tag
-                    if self.tag.lower() in self.NON_PARSING_TAGS:
-                        self.in_non_parsing_tag = True
-                        self.current_non_parsing_tag = self.tag
+        while i < n:
+            if self.raw_tag is not None:
+                j = self.handle_raw_text(html, i, end)
             else:
-                self.buffer += char
-                i += 1
+                lt = find("<", i)
+                if lt == -1:
+                    if not end:
+                        # The text may continue in the next chunk
+                        break
+                    lt = n
+
+                if lt > i:
+                    self.handle_data(html, i, lt)
+                    i = lt
+                    if lt == n:
+                        break
+
+                if html.startswith("<!--", i):
+                    j = self.handle_comment(html, i + 4, end)
+                elif html.startswith("</", i):
+                    j = self.handle_closing_tag(html, i + 2, end)
+                elif not end and n - i < 4 and "<!--".startswith(html[i:]):
+                    # Could still become a comment
+                    break
+                elif html.startswith("<!", i) and not html.startswith("<!-", i):
+                    j = self.handle_declaration(html, i + 2, end)
+                else:
+                    j = self.handle_opening_tag(html, i + 1, end)
 
-        if self.buffer:
-            processed_text = self.process_text_node(self.buffer, self.current_tag["name"])
-            if processed_text:
-                self.children.append(self.create_text(processed_text))
+            if j < 0:
+                # Incomplete construct, wait for more data
+                break
 
-        return self.dom
+            self.searched = 0
+            i = j
+
+            if len(self.events) >= self.EVENTS_PER_BUILD:
+                self.build_events()
+
+        self.rawdata = html[i:] if i < n else ""
+        if not end and (i < n or self.raw_tag is not None):
+            self.until = self.waiting_for(html, i)
+            if self.until is not None:
+                self.tail = html[max(i, n - self.until[1]):]
+
+        if end:
+            # Close anything left open so every start has a matching end
+            while self.open_tags:
+                self.events.append(("end", self.open_tags.pop(), None))
+
+    def handle_data(self, html: 'str', start: 'int', stop: 'int'):
+        # Process text according to current tag type
+        text = self.text_slice(html, start, stop, self.open_tags[-1] if self.open_tags else "dom")
+        if text is not None:
+            self.events.append(("text", "text", text))
+
+    def text_slice(self, html: 'str', start: 'int', stop: 'int', parent_tag: 't.Optional[str]' = None) -> 't.Optional[str | LazyText]':
+        """
+        Text content of `html[start:stop]`, whitespace processed for `parent_tag` unless it's `None`.
+        Processed text that ends up empty is returned as `None`.
+
+        In zero copy mode a `LazyText` is returned instead of a string.
+        """
+        if not self.zero_copy:
+            text = html[start:stop]
+            return text if parent_tag is None else (self.process_text_node(text, parent_tag) or None)
+
+        if parent_tag is None:
+            return LazyText(html, start, stop)
+
+        if parent_tag.lower() not in INLINE_ELEMENTS and self.NON_WS_RE.search(html, start, stop) is None:
+            # Whitespace only text is stripped away in block and unknown elements
+            return None
+
+        return LazyText(html, start, stop, self._process_text_node, parent_tag)
 
     def process_text_node(self, text: str, parent_tag: str) -> str:
         """
@@ -126,26 +380,22 @@ class HTMLParser:
         if parent_tag in self.NON_PARSING_TAGS:
             return text
 
-        if self.is_block_element(parent_tag):
-            collapsed = self.WS_RE.sub(" ", text)
-            return collapsed.strip()
+        collapsed = self.WS_RE.sub(" ", text)
 
-        if self.is_inline_element(parent_tag):
-            collapsed = self.WS_RE.sub(" ", text)
+        if parent_tag in INLINE_ELEMENTS:
             return collapsed
 
-        # For unknown tags, default to collapsing whitespace
-        collapsed = re.sub(r'\s+', ' ', text)
+        # Block and unknown tags both strip the collapsed text
         return collapsed.strip()
 
     def is_block_element(self, tag: str) -> bool:
-        return tag in ELEMENT_TYPES.get("block", [])
+        return tag in BLOCK_ELEMENTS
 
     def is_inline_element(self, tag: str) -> bool:
-        return tag in ELEMENT_TYPES.get("inline", [])
+        return tag in INLINE_ELEMENTS
 
     def is_void_element(self, tag: str) -> bool:
-        return tag in ELEMENT_TYPES.get("void", [])
+        return tag in VOID_ELEMENTS
 
     def trim_block_element_whitespace(self, element: 'ELEMENT'):
         """
@@ -159,6 +409,8 @@ class HTMLParser:
         # Remove first newline in first text node if present
         for child in children:
             if child["type"] == "text":
+                if isinstance(child, LazyText) and not child.materialized:
+                    break  # Stripped when it's built
                 content = child["content"]
                 if content.startswith("\n"):
                     child["content"] = content[1:]
@@ -169,108 +421,118 @@ class HTMLParser:
         # Remove last newline in last text node if present
         for child in reversed(children):
             if child["type"] == "text":
+                if isinstance(child, LazyText) and not child.materialized:
+                    break  # Stripped when it's built
                 content = child["content"]
                 if content.endswith('\n'):
                     child["content"] = content[:-1]
                 break  # Only last text node
 
-    def handle_opening_tag(self, html: 'str', start: 'int') -> 'int':
-        i = start
-        self.tag = ""
+    def handle_opening_tag(self, html: 'str', start: 'int', end: 'bool' = True) -> 'int':
+        match = (self.START_TAG_RE if end else self.STRICT_START_TAG_RE).match(html, start)
+        if match is None:
+            if not end:
+                return -1
+
+            # Unterminated tag, the rest of the document is the tag
+            match = self.TAG_NAME_RE.match(html, start)
+            tag, attr_text, i = match.group(), html[match.end():], len(html)
+            is_self_closing = False
+        else:
+            tag, attr_text = match.groups()
+            i = match.end()
+            # An unquoted value ending in `/` also marks the tag as self-closing
+            is_self_closing = html[i-2] == "/"
+
+        self.tag = tag = sys.intern(tag)
         attrs: 'dict[str, t.Union[str, bool, int, float]]' = {}
 
-        # Get tag name
-        while i < len(html) and not html[i].isspace() and html[i] != '>':
-            self.tag += html[i]
-            i += 1
+        if attr_text:
+            for attr in self.ATTR_RE.finditer(attr_text):
+                name, double, single, back, bare = attr.groups()
+                if double is not None:
+                    value = double
+                elif single is not None:
+                    value = single
+                elif back is not None:
+                    value = back
+                elif bare is not None:
+                    value = bare
+                else:
+                    value = True  # Default for boolean attributes
 
-        # Skip whitespace
-        while i < len(html) and html[i].isspace():
-            i += 1
+                attrs[sys.intern(name)] = value
 
-        # Parse attributes
-        while i < len(html) and html[i] != '>' and html[i:i+1] != '/>':
-            if html[i].isspace():
-                i += 1
-                continue
+        self.events.append(("start", tag, attrs))
 
-            # Get attribute name
-            attr = ""
-            while i < len(html) and not html[i].isspace() and html[i] != '=' and html[i] != '>':
-                attr += html[i]
-                i += 1
+        lower = tag.lower()
+        if is_self_closing or lower in VOID_ELEMENTS:
+            self.events.append(("end", tag, None))
+            return i
 
-            if attr == "/" and html[i-1:i+1] == "/>":
-                break
+        self.open_tags.append(tag)
 
-            # Skip whitespace
-            while i < len(html) and html[i].isspace():
-                i += 1
-
-            value = True  # Default for boolean attributes
-
-            # Get attribute value if it exists
-            if i < len(html) and html[i] == '=':
-                i += 1
-                # Skip whitespace
-                while i < len(html) and html[i].isspace():
-                    i += 1
-
-                quote = html[i] if html[i] in '"\'`' else None
-                if quote:
-                    i += 1
-                    value = ""
-                    while i < len(html) and html[i] != quote:
-                        value += html[i]
-                        i += 1
-                    i += 1  # Skip closing quote
-                else:
-                    value = ""
-                    while i < len(html) and not html[i].isspace() and html[i] != '>':
-                        value += html[i]
-                        i += 1
-
-            if attr:
-                attrs[attr] = value
-
-            # Skip whitespace
-            while i < len(html) and html[i].isspace():
-                i += 1
-
-        # Handle self-closing tags
-        tag = self.create_element(self.tag, attrs)
-        is_self_closing = html[i-1] == '/'
-        if is_self_closing or self.is_void_element(self.tag.lower()):
-            self.children.append(tag)
+        if lower in self.NON_PARSING_TAGS:
+            self.raw_tag = tag
+
+        return i
+
+    def handle_raw_text(self, html: 'str', start: 'int', end: 'bool' = True) -> 'int':
+        """
+        Consume the unparsed content of a raw text element (e.g. `script`) up to and including its closing tag.
+        """
+        tag = self.raw_tag
+        match = self.closing_re(tag).search(html, start + self.searched)
+        if match is None:
+            if not end:
+                # The closing tag may be split across chunks, so rescan its length next time
+                self.searched = max(0, len(html) - start - len(tag) - 2)
+                return -1
+            stop = len(html)
         else:
-            self.children.append(tag)
-            self.current_tag = tag
+            stop = match.start()
 
-        return i + 1
+        self.events.append(("text", "text", self.text_slice(html, start, stop)))
+        self.events.append(("end", self.open_tags.pop(), None))
+        self.raw_tag = None
 
-    def handle_closing_tag(self, html: 'str', start: 'int') -> 'int':
-        i = start
-        tag = ""
+        return match.end() if match is not None else stop
 
-        # Get tag name
-        while i < len(html) and html[i] != '>':
-            tag += html[i]
-            i += 1
-        self.tag = tag
-        return i + 1
+    def handle_closing_tag(self, html: 'str', start: 'int', end: 'bool' = True) -> 'int':
+        match = self.CLOSING_TAG_RE.match(html, start)
+        if match is None:
+            if not end:
+                return -1
+            self.tag = html[start:]
+            i = len(html)
+        else:
+            self.tag = match.group(1)
+            i = match.end()
 
-    def handle_comment(self, html: 'str', start: 'int') -> 'int':
-        i = start
-        comment = ""
+        # Closing tags always close the innermost open element
+        if self.open_tags:
+            self.events.append(("end", self.open_tags.pop(), None))
 
-        # Get comment content until -->
-        while i < len(html) - 2:
-            if html[i:i+3] == '-->':
-                break
-            comment += html[i]
-            i += 1
+        return i
+
+    def handle_comment(self, html: 'str', start: 'int', end: 'bool' = True) -> 'int':
+        stop = html.find("-->", start + self.searched)
+        if stop == -1:
+            if not end:
+                self.searched = max(0, len(html) - start - 2)
+                return -1
+            stop = len(html)
 
-        # Create comment element
-        self.children.append(self.create_element("comment", children=[self.create_text(comment)]))
+        self.events.append(("comment", "comment", self.text_slice(html, start, stop)))
+
+        return stop + 3  # Skip past -->
+
+    def handle_declaration(self, html: 'str', start: 'int', end: 'bool' = True) -> 'int':
+        """
+        Skip `<!DOCTYPE ...>` and other declarations, they have no place in the DOM.
+        """
+        stop = html.find(">", start)
+        if stop == -1:
+            return -1 if not end else len(html)
 
-        return i + 3  # Skip past -->
+        return stop + 1
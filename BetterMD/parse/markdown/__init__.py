@@ -1,4 +1,5 @@
 from .extensions import BaseExtension, Extension
 from .parser import MDParser
+from .document import MDDocument
 
 MDParser.add_extension(BaseExtension)
\ No newline at end of file
@@ -0,0 +1,326 @@
+import itertools
+import re
+import typing as t
+
+from .parser import MDParser
+
+if t.TYPE_CHECKING:
+    from ..typing import ELEMENT
+
+    # Text, number of top level blocks and the head its `title:` line set (if any)
+    SEGMENT = tuple[str, int, t.Optional[ELEMENT]]
+
+# The line endings `str.splitlines` splits on
+LINE_END_RE = re.compile(r"\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+
+# Segments per chunk, chunks are split once they have twice as many
+CHUNK = 64
+
+
+class FenwickTree:
+    """
+    Sums of the first `i` of a list of non-negative numbers, with both changing a number
+    and summing in O(log n).
+    """
+
+    def __init__(self, values:'t.Iterable[int]'=()):
+        self.values = list(values)
+        tree = [0, *self.values]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def __len__(self):
+        return len(self.values)
+
+    def set(self, i:'int', value:'int'):
+        delta = value - self.values[i]
+        self.values[i] = value
+        tree = self.tree
+        i += 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i:'int') -> 'int':
+        tree = self.tree
+        total = 0
+        while i:
+            total += tree[i]
+            i &= i - 1
+        return total
+
+    def search(self, total:'int') -> 'tuple[int, int]':
+        """
+        The first `i` whose sum with the numbers before it is more than `total`, and the sum
+        of the numbers before it. `i` is `len(self)` if there is none.
+        """
+        tree = self.tree
+        i = 0
+        before = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            if i + step < len(tree) and before + tree[i + step] <= total:
+                i += step
+                before += tree[i]
+            step >>= 1
+        return i, before
+
+
+class MDDocument:
+    """
+    A parsed Markdown document that is kept up to date with edits to its text.
+
+    The document is split into segments at the lines where the parser holds no state, see
+    `MDParser.at_boundary`. For every segment its text, the number of top level blocks it
+    parsed to and the head its `title:` line set (if any) are recorded. An edit re-parses
+    from the start of the segment it falls in until the parser is back at a boundary the old
+    text had after the edit, and only those blocks are replaced.
+
+    Segments are kept in chunks of about `CHUNK`, with the length and block count of every
+    chunk in a `FenwickTree`, so finding the segment an offset falls in and the blocks
+    before it doesn't depend on the size of the document. The time an edit takes depends on
+    the size of the blocks it touches, apart from moving the blocks after them in
+    `self.blocks`, which is a `list` for callers.
+    """
+
+    def __init__(self, text:'str'="", parser:'t.Optional[MDParser]'=None):
+        self.parser = MDParser() if parser is None else parser
+        self.chunks:'list[list[SEGMENT]]' = []
+        self.chunk_lengths = FenwickTree()
+        self.chunk_blocks = FenwickTree()
+        # Characters in the text
+        self.length = len(text)
+
+        segments, self.blocks, _ = self.parse_from(text)
+        self.replace(0, 0, 0, segments)
+        self._text:'t.Optional[str]' = text
+
+    @property
+    def text(self) -> 'str':
+        # Joined when asked for after an edit
+        if self._text is None:
+            self._text = "".join(segment[0] for chunk in self.chunks for segment in chunk)
+        return self._text
+
+    @property
+    def head(self) -> 't.Union[ELEMENT, list]':
+        # The last `title:` line wins, as in a full parse
+        for chunk in reversed(self.chunks):
+            for _, _, head in reversed(chunk):
+                if head is not None:
+                    return head
+        return []
+
+    def parse_from(self, text:'str', after:'t.Iterable[str]'=(), start:'int'=0):
+        """
+        Parse `text`, which starts at the boundary `start`, and then the segments `after`
+        it. Every line of `text` is whole, as is every segment.
+
+        Parsing stops early at the start of the first segment the parser is at a boundary
+        for, the rest of the document is the same from there. Returns the segments parsed,
+        their blocks and how many of `after` were parsed.
+        """
+        parser = self.parser
+        lengths:'list[int]' = []
+        counts:'list[int]' = []
+        heads:'list[t.Optional[ELEMENT]]' = []
+        parts = [text]
+        blocks:'list[ELEMENT]' = []
+
+        segment_start = start
+        segment_blocks = 0
+        head = None
+
+        def boundary(pos:'int'):
+            nonlocal segment_start, segment_blocks, head
+            lengths.append(pos - segment_start)
+            counts.append(len(blocks) - segment_blocks)
+            heads.append(parser.head if parser.head is not head else None)
+            segment_start, segment_blocks, head = pos, len(blocks), parser.head
+
+        def lines():
+            nonlocal head
+            # The parser was reset when it asked for the first line
+            head = parser.head
+            search = LINE_END_RE.search
+            pos = start
+            for n, part in enumerate(itertools.chain([text], after)):
+                if n:
+                    if pos > segment_start and parser.at_boundary():
+                        boundary(pos)
+                        return
+                    parts.append(part)
+
+                offset = pos
+                length = len(part)
+                i = 0
+                while i < length:
+                    # The blocks of the previous line are in `blocks` by now
+                    if offset + i > segment_start and parser.at_boundary():
+                        boundary(offset + i)
+
+                    found = search(part, i)
+                    if found is None:
+                        yield part[i:]
+                        i = length
+                    else:
+                        yield part[i:found.start()]
+                        i = found.end()
+                pos = offset + length
+
+        blocks.extend(parser.iter_line_blocks(lines()))
+
+        parsed = "".join(parts)
+        if segment_start < start + len(parsed):
+            boundary(start + len(parsed))
+
+        segments:'list[SEGMENT]' = []
+        pos = 0
+        for length, count, segment_head in zip(lengths, counts, heads):
+            segments.append((parsed[pos:pos + length], count, segment_head))
+            pos += length
+
+        return segments, blocks, len(parts) - 1
+
+    def locate(self, offset:'int') -> 'tuple[int, int, int, int]':
+        """
+        The chunk and index of the first segment that ends after `offset`, where it starts
+        and the number of blocks before it. `(len(self.chunks), 0, self.length, len(self.blocks))`
+        if there is none.
+        """
+        c, start = self.chunk_lengths.search(offset)
+        index = self.chunk_blocks.prefix(c)
+        if c == len(self.chunks):
+            return c, 0, start, index
+
+        for i, (text, count, _) in enumerate(self.chunks[c]):
+            if start + len(text) > offset:
+                return c, i, start, index
+            start += len(text)
+            index += count
+        raise AssertionError("chunk lengths are out of date")
+
+    def segments(self, c:'int', i:'int') -> 't.Iterator[SEGMENT]':
+        """
+        The segments from the `i`th of chunk `c` to the end of the document.
+        """
+        chunks = self.chunks
+        if c < len(chunks):
+            yield from itertools.islice(chunks[c], i, None)
+        for chunk in itertools.islice(chunks, c + 1, None):
+            yield from chunk
+
+    def replace(self, c:'int', i:'int', count:'int', segments:'list[SEGMENT]'):
+        """
+        Replace `count` segments from the `i`th of chunk `c` with `segments`.
+        """
+        chunks = self.chunks
+        end = c
+        pos = i + count
+        while end < len(chunks) and pos > len(chunks[end]):
+            pos -= len(chunks[end])
+            end += 1
+
+        merged = chunks[c][:i] if c < len(chunks) else []
+        merged.extend(segments)
+        if end < len(chunks):
+            merged.extend(chunks[end][pos:])
+            end += 1
+
+        # The number of chunks only changes if they get too big or too few segments are left
+        old = end - c
+        if old and old <= len(merged) <= old * 2 * CHUNK:
+            pieces = old
+        else:
+            pieces = -(-len(merged) // CHUNK)
+        bounds = [len(merged) * k // pieces for k in range(pieces + 1)] if pieces else []
+        chunks[c:end] = new = [merged[a:b] for a, b in zip(bounds, bounds[1:])]
+
+        lengths = [sum(len(text) for text, _, _ in chunk) for chunk in new]
+        counts = [sum(n for _, n, _ in chunk) for chunk in new]
+        if pieces == old:
+            for k in range(pieces):
+                self.chunk_lengths.set(c + k, lengths[k])
+                self.chunk_blocks.set(c + k, counts[k])
+        else:
+            values = self.chunk_lengths.values
+            values[c:end] = lengths
+            self.chunk_lengths = FenwickTree(values)
+            values = self.chunk_blocks.values
+            values[c:end] = counts
+            self.chunk_blocks = FenwickTree(values)
+
+    def edit(self, offset:'int', deleted:'int', inserted:'str') -> 'tuple[int, int, list[ELEMENT]]':
+        """
+        Replace `deleted` characters at `offset` with `inserted` and re-parse the blocks
+        the edit touches.
+
+        Returns `(start, stop, blocks)`, the old `self.blocks[start:stop]` were replaced with
+        `blocks` in place.
+        """
+        if offset < 0 or deleted < 0 or offset + deleted > self.length:
+            raise ValueError(f"Edit of {deleted} characters at {offset} is outside the document")
+
+        # The segment the edit starts in. The end of the text isn't a boundary, and an edit
+        # right after a `\r` can make it a `\r\n`, those start in the segment before.
+        c, i, start, index = self.locate(offset)
+        if c == len(self.chunks) and c:
+            back = True
+        elif start == offset and offset:
+            previous = self.chunks[c][i-1] if i else self.chunks[c-1][-1]
+            back = previous[0].endswith("\r")
+        else:
+            back = False
+        if back:
+            c, i = (c, i - 1) if i else (c - 1, len(self.chunks[c-1]) - 1)
+            text, count, _ = self.chunks[c][i]
+            start -= len(text)
+            index -= count
+
+        if not deleted and not inserted:
+            return index, index, []
+
+        # The segments the edit touches, and the ones after them until the new text ends
+        # with a whole line
+        segments = self.segments(c, i)
+        parts = []
+        count = 0
+        blocks = 0
+        end = start
+        for text, n, _ in segments:
+            parts.append(text)
+            count += 1
+            blocks += n
+            end += len(text)
+            if end >= offset + deleted:
+                break
+        text = "".join(parts)
+        text = text[:offset-start] + inserted + text[offset+deleted-start:]
+
+        for segment in segments:
+            if text and LINE_END_RE.match(text[-1]) and not (text[-1] == "\r" and segment[0].startswith("\n")):
+                segments = itertools.chain([segment], segments)
+                break
+            text += segment[0]
+            count += 1
+            blocks += segment[1]
+
+        self._text = None
+        self.length += len(inserted) - deleted
+
+        def after() -> 't.Iterator[str]':
+            nonlocal blocks
+            for segment in segments:
+                yield segment[0]
+                # Only counted once it was parsed, parsing can stop at the start of any of them
+                blocks += segment[1]
+
+        new_segments, new_blocks, parsed = self.parse_from(text, after(), start)
+
+        self.replace(c, i, count + parsed, new_segments)
+        stop = index + blocks
+        self.blocks[index:stop] = new_blocks
+        return index, stop, new_blocks
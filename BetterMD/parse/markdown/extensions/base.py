@@ -32,70 +32,117 @@ def char_isin(text, pattern):
 
 
 class BaseExtension(Extension):
+    # Compiled once, `top_level_tags` hands out these objects. The parser only tries them on
+    # lines starting with one of their `trigger` characters and passes handlers the match.
+    BLOCKQUOTE_RE = re.compile(r"^> (.*)$")
+    CODE_BLOCK_RE = re.compile(r"^```([A-Za-z]*)?$")
+    H_RE = re.compile(r"^(#{1,6})(?: (.*))?$")
+    HR_RE = re.compile(r"^---+$")
+    BR_RE = re.compile(r"^\s*$")
+    UL_RE = re.compile(r"^(\s*)(-|\+|\*)(?: +(?:\[( |x|X)\])?(.*))?$")
+    OL_RE = re.compile(r"^(\s*)(\d)(\.|\))(?: +(?:\[( |x|X)\] *)?(.*)?)?$")
+    THEAD_RE = re.compile(r"^\|(?::?-+:?\|)+$")
+    TR_RE = re.compile(r"^\|(?:[^|\n]+\|)+$")
+    TITLE_RE = re.compile(r"^title:(?: (.+))?$")
+
+    # Inline patterns are matched with `pattern.match(text, pos)` where one of their
+    # `trigger` characters is found
+    INLINE_LINK_RE = re.compile(r"\[")
+    # Labels stop at the next bracket, so a failed match never scans past it
+    AUTOMATIC_LINK_RE = re.compile(r"<([^<>]+)>")
+    REFERENCE_DEFINITION_RE = re.compile(r"\[([^\[\]]+)\]:\s*([^\s]+)")
+    REFERENCE_RE = re.compile(r"\[([^\[\]]+)\]\[([^\[\]]+)\]\s*")
+    IMAGE_RE = re.compile(r"!\[")
+    BRACKET_RE = re.compile(r"[\[\]]")
+    # A run of `*` or `_`, paired up by the parser's delimiter stack. `bold_and_italic`, `bold`
+    # and `italic` pair runs of three, two and one.
+    EMPHASIS_RE = re.compile(r"\*+|_+")
+    CODE_RE = re.compile(r"(`+)([\s\S]*?)\1")
+
     @property
     def name(self):
         return "Base Extension"
 
     def init(self, parser:'MDParser'):
         super().init(parser)
-        self.table = []
-        self.thead = ""
-        self.tcols = []
-        self.had_thead = False
-        self.list_stack:'list[t.Union[OL_LIST, UL_LIST]]' = []
+        self.load_state(None)
         self.code_index = 0
         self.pre_dom = []
+        self.brackets_text:'t.Optional[str]' = None
+        self.brackets:'dict[int, int]' = {}
+
+    def save_state(self):
+        return self.table, self.thead, self.tcols, self.had_thead, self.list_stack
+
+    def load_state(self, state):
+        if state is None:
+            state = [], "", [], False, []
+        self.table, self.thead, self.tcols, self.had_thead, self.list_stack = state
+
+    def at_boundary(self) -> 'bool':
+        # A table row waiting to see if a delimiter row makes it the header
+        return not self.thead
 
     @property
     def top_level_tags(self) -> 'dict[str, ELM_TYPE_W_END | ELM_TYPE_WO_END]':
         return {
             "blockquote": {
-                "pattern": r"^> (.*)$",
+                "pattern": self.BLOCKQUOTE_RE,
+                "trigger": ">",
                 "handler": self.handle_blockquote,
                 "end": self.end_blockquote
             },
             "code": {
-                "pattern": r"^```([A-Za-z]*)?$",
+                "pattern": self.CODE_BLOCK_RE,
+                "trigger": "`",
                 "handler": self.handle_code,
                 "end": self.end_code
             },
             "h": {
-                "pattern": r"^(#{1,6})(?: (.*))?$",
+                "pattern": self.H_RE,
+                "trigger": "#",
                 "handler": self.handle_h,
                 "end": None
             },
             "hr": {
-                "pattern": r"^---+$",
+                "pattern": self.HR_RE,
+                "trigger": "-",
                 "handler": self.handle_hr,
                 "end": None
             },
             "br": {
-                "pattern": r"^\s*$",
+                "pattern": self.BR_RE,
+                "trigger": ["", " "],
                 "handler": self.handle_br,
                 "end": None
             },
             "ul": {
-                "pattern": r"^(\s*)(-|\+|\*)(?: +(?:\[( |x|X)\])?(.*))?$",
+                "pattern": self.UL_RE,
+                "trigger": " -+*",
                 "handler": self.handle_ul,
                 "end": self.end_list
             },
             "ol": {
-                "pattern": r"^(\s*)(\d)(\.|\))(?: +(?:\[( |x|X)\] *)?(.*)?)?$",
+                "pattern": self.OL_RE,
+                "trigger": " 0123456789",
                 "handler": self.handle_ol,
                 "end": self.end_list
             },
             "thead": {
-                "pattern": r"^\|(?::?-+:?\|)+$",
+                "pattern": self.THEAD_RE,
+                "trigger": "|",
                 "handler": self.handle_thead,
                 "end": self.end_table
             },
             "tr": {
-                "pattern": r"^\|(?:[^|\n]+\|)+$",
+                "pattern": self.TR_RE,
+                "trigger": "|",
                 "handler": self.handle_tr,
                 "end": self.end_table
             },
             "title": {
-                "pattern": r"^title:(?: (.+))?$",
+                "pattern": self.TITLE_RE,
+                "trigger": "t",
                 "handler": self.handle_title,
                 "end": None
             }
@@ -105,39 +152,51 @@ class BaseExtension(Extension):
     def text_tags(self):
         return {
             "inline_link": {
-                "pattern": r"(?<!!)\[",
+                "pattern": self.INLINE_LINK_RE,
+                "trigger": "[",
                 "handler": self.inline_link
             },
             "automatic_link": {
-                "pattern": r"^<([^>]+)>",
+                "pattern": self.AUTOMATIC_LINK_RE,
+                "trigger": "<",
                 "handler": self.automatic_link
             },
             "reference_definition": {
-                "pattern": r"^\[([^\]]+)\]:\s*([^\s]+)",
+                "pattern": self.REFERENCE_DEFINITION_RE,
+                "trigger": "[",
                 "handler": self.reference_definition
             },
             "reference": {
-                "pattern": r"^\[([^\]]+)\]\[([^\]]+)\]\s*",
+                "pattern": self.REFERENCE_RE,
+                "trigger": "[",
                 "handler": self.reference
             },
             "image": {
-                "pattern": r"^!\[",
+                "pattern": self.IMAGE_RE,
+                "trigger": "!",
                 "handler": self.image
             },
             "bold_and_italic": {
-                "pattern": [r"^([\*_])([\*_]){2}([^\*\n\r]+?)\2{2}\1", r"^([\*_]){2}([\*_])([^\*\n\r]+?)\2\1{2}"],
-                "handler": self.bold_and_italic
+                "pattern": self.EMPHASIS_RE,
+                "trigger": "*_",
+                "handler": self.bold_and_italic,
+                "delimiter": 3
             },
             "bold": {
-                "pattern": r"^([\*_])\1{1}(.+?)\1{2}",
-                "handler": self.bold
+                "pattern": self.EMPHASIS_RE,
+                "trigger": "*_",
+                "handler": self.bold,
+                "delimiter": 2
             },
             "italic": {
-                "pattern": r"^([\*_])([^\*\n\r]+?)\1",
-                "handler": self.italic
+                "pattern": self.EMPHASIS_RE,
+                "trigger": "*_",
+                "handler": self.italic,
+                "delimiter": 1
             },
             "code": {
-                "pattern": r"^(`+)([\s\S]*?)\1",
+                "pattern": self.CODE_RE,
+                "trigger": "`",
                 "handler": self.code
             }
         }
@@ -146,30 +205,46 @@ class BaseExtension(Extension):
 
     ########## Paragraph Handlers ##########
 
-    def inline_link(self, text:'str'):
-        def handle_alt(text:'str'):
-            ob = 0
-            alt = ""
-            i = 0
-
-            for i, char in enumerate(text):
-                if char == "[":
-                    ob += 1
-                elif char == "]":
-                    ob -= 1
-                    if ob == 0:
-                        break
-
-                alt += char
-
-            return alt[1:], i+1
-
-        def handle_link(text:'str'):
-            i = 1
-            link = ""
+    def closing_bracket(self, text:'str', start:'int') -> 't.Optional[int]':
+        # Brackets are paired for the whole paragraph in one pass, rather than scanning
+        # ahead from every `[`, which is quadratic when they aren't closed
+        if self.brackets_text is not text:
+            stack = []
+            self.brackets = {}
+            for match in self.BRACKET_RE.finditer(text):
+                if match.group() == "[":
+                    stack.append(match.start())
+                elif stack:
+                    self.brackets[stack.pop()] = match.start()
+            self.brackets_text = text
+        return self.brackets.get(start)
+
+    def parse_link(self, text:'str', start:'int') -> 't.Optional[tuple[str, t.Optional[str], t.Optional[str], int]]':
+        """
+        Read `[alt](href "title")` starting at the `[` at `start`.
+
+        Returns the alt text, href, title and the end of the link, or `None` if there is no
+        link there.
+        """
+        i = self.closing_bracket(text, start)
+        if i is None:
+            return None
+
+        alt = text[start+1:i]
+        i += 1
+        if not text.startswith("(", i) or i + 1 >= len(text):
+            return None
+
+        # Href, either `<...>` or up to a space or `)`
+        href = None
+        if text[i+1] == ")":
+            i += 1
+        elif text[i+1] not in "'\"":
+            link = []
             link_mode = None # True - <>, False - " "
             obs = 0
             esc = False
+            i += 1
             while i < len(text):
                 char = text[i]
                 if link_mode is None:
@@ -178,11 +253,11 @@ class BaseExtension(Extension):
                         obs = 1
                     else:
                         link_mode = False
-                        link = char
+                        link.append(char)
 
                 elif esc:
                     esc = False
-                    link += char
+                    link.append(char)
 
                 elif char == "\\":
                     esc = True
@@ -190,246 +265,105 @@ class BaseExtension(Extension):
                 elif link_mode:
                     if char == "<":
                         obs += 1
-                        if obs != 1:
-                            link += char
+                        link.append(char)
                     elif char == ">":
                         obs -= 1
                         if obs == 0:
-                            return link, i+1
-                        else:
-                            link += char
+                            i += 1
+                            break
+                        link.append(char)
                     else:
-                        link += char
+                        link.append(char)
 
-                elif char == " ":
-                    return link, i
-
-                elif char == ")":
-                    return link, i
+                elif char in " )":
+                    break
 
                 else:
-                    link += char
+                    link.append(char)
 
                 i += 1
-            return link, i
-
-        def handle_title(text:'str'):
-            i = text[1:].index(text[0])
-            return text[1:i+1], i+1
-
-        assert len(text) >= 4
+            href = "".join(link)
 
-        if text[1] != "]":
-            alt, i = handle_alt(text)
-        else:
-            alt = None
-            i = 2
-        if text[i+1] in ["'", '"']:
-            href = None
-            index = 0
-
-        elif text[i+1] != ")":
-            href, index = handle_link(text[i:])
-        else:
-            href = None
-            index = 1
-        i += index
+        # Title, quoted with `"` or `'`
+        title = None
+        if i + 1 < len(text) and text[i+1] in "'\"":
+            end = text.find(text[i+1], i + 2)
+            if end == -1:
+                return None
+            title = text[i+2:end]
+            i = end + 1
 
-        if len(text)-1 <= i or text[i+1] not in ['"', "'"]:
-            title = None
+        return alt, href, title, min(i + 1, len(text))
 
-        else:
-            title, index = handle_title(text[i+1:])
-            i += index + 2
+    def inline_link(self, match:'re.Match[str]'):
+        link = self.parse_link(match.string, match.start())
+        if link is None:
+            return None
 
+        alt, href, title, end = link
         el = self.create_element("a", {"class": "inline-link", **({"href": href} if href else {}), **({"title": title} if title is not None else {})}, [self.create_text(alt)] if alt else [])
-        return el, i
-
-    def automatic_link(self, text:'str'):
-        match = re.match(self.text_tags["automatic_link"]["pattern"], text)
-
-        assert match is not None, "Automatic link not found"
+        return el, end
 
+    def automatic_link(self, match:'re.Match[str]'):
         url = match.group(1)
-        return self.create_element("a", {"class": "automatic-link", "href": url}, [self.create_text(url)]), match.end() - match.start()
-
-    def reference_definition(self, text:'str'):
-        match = re.match(self.text_tags["reference_definition"]["pattern"], text)
-        assert match is not None, "Reference definition not found"
+        return self.create_element("a", {"class": "automatic-link", "href": url}, [self.create_text(url)]), match.end()
 
+    def reference_definition(self, match:'re.Match[str]'):
         label = match.group(1)
         url = match.group(2)
-        return self.create_element("a", {"class": ["ref-def"], "href": url, "ref": True, "refId":label}, [self.create_text(label)])
-
-    def reference(self, text:'str'):
-        match = re.match(self.text_tags["reference"]["pattern"], text)
-        assert match is not None, "Reference not found"
+        return self.create_element("a", {"class": ["ref-def"], "href": url, "ref": True, "refId":label}, [self.create_text(label)]), match.end()
 
+    def reference(self, match:'re.Match[str]'):
         label = match.group(1)
         ref = match.group(2)
-        return self.create_element("a", { "class": ["ref"], "ref": True, "refId":ref }, [self.create_text(label)])
-
-    def image(self, text:'str'):
-        def handle_alt(text:'str'):
-            ob = 0
-            alt = ""
-            i = 0
-
-            for i, char in enumerate(text):
-                if char == "[":
-                    ob += 1
-                elif char == "]":
-                    ob -= 1
-                    if ob == 0:
-                        break
-
-                alt += char
-
-            return alt[1:], i+1
-
-        def handle_link(text:'str'):
-            i = 1
-            link = ""
-            link_mode = None # True - <>, False - " "
-            obs = 0
-            esc = False
-            while i < len(text):
-                char = text[i]
-                if link_mode is None:
-                    if char == "<":
-                        link_mode = True
-                        obs = 1
-                    else:
-                        link_mode = False
-                        link = char
-
-                elif esc:
-                    esc = False
-                    link += char
-
-                elif char == "\\":
-                    esc = True
-
-                elif link_mode:
-                    if char == "<":
-                        obs += 1
-                        if obs != 1:
-                            link += char
-                    elif char == ">":
-                        obs -= 1
-                        if obs == 0:
-                            return link, i+1
-                        else:
-                            link += char
-                    else:
-                        link += char
-
-                elif char == " ":
-                    return link, i
-
-                elif char == ")":
-                    return link, i
-
-                else:
-                    link += char
-
-                i += 1
-            return link, i
-
-        def handle_title(text:'str'):
-            i = text[1:].index(text[0])
-            return text[1:i+1], i+1
-
-        assert len(text) >= 5
-
-        if text[1] != "]":
-            alt, i = handle_alt(text)
-        else:
-            alt = None
-            i = 2
-        if text[i+1] in ["'", '"']:
-            href = None
-            index = 0
-
-        elif text[i+1] != ")":
-            href, index = handle_link(text[i:])
-        else:
-            href = None
-            index = 1
-        i += index
+        return self.create_element("a", { "class": ["ref"], "ref": True, "refId":ref }, [self.create_text(label)]), match.end()
 
-        if len(text)-1 <= i or text[i+1] not in ['"', "'"]:
-            title = None
-
-        else:
-            title, index = handle_title(text[i+1:])
-            i += index + 2
+    def image(self, match:'re.Match[str]'):
+        link = self.parse_link(match.string, match.start() + 1)
+        if link is None:
+            return None
 
+        alt, href, title, end = link
         el = self.create_element("img", {**({"href": href} if href else {}), **({"title": title} if title is not None else {})}, [self.create_text(alt)] if alt else [])
-        return el, i
-
-    def bold(self, text:'str'):
-        match = re.match(self.text_tags["bold"]["pattern"], text)
-        assert match is not None, "Bold not found"
-
-        content = match.group(2)
-        return self.create_element("strong", children=self.parse_text(content)), match.end() - match.start()
+        return el, end
 
-    def italic(self, text:'str'):
-        match = re.match(self.text_tags["italic"]["pattern"], text)
-        assert match is not None, "Italic not found"
+    def bold(self, char:'str', children:'list[ELEMENT | TEXT]'):
+        return self.create_element("strong", children=children)
 
-        content = match.group(2)
-        return self.create_element("em", children=self.parse_text(content)), match.end() - match.start()
-
-    def bold_and_italic(self, text:'str'):
-        m1 = re.match(self.text_tags["bold_and_italic"]["pattern"][0], text)
-        m2 = re.match(self.text_tags["bold_and_italic"]["pattern"][1], text)
-        match = m1 or m2
-        assert match is not None, "Bold and italic not found"
-
-        content = match.group(3)
-        return self.create_element("strong", {"class": ["italic-bold" if m1 else "bold-italic"]}, children=[self.create_element("em", children=self.parse_text(content))]), match.end() - match.start()
+    def italic(self, char:'str', children:'list[ELEMENT | TEXT]'):
+        return self.create_element("em", children=children)
 
-    def code(self, text:'str'):
-        match = re.match(self.text_tags["code"]["pattern"], text)
-        assert match is not None, "Code not found"
+    def bold_and_italic(self, char:'str', children:'list[ELEMENT | TEXT]'):
+        return self.create_element("strong", {"class": ["italic-bold"]}, children=[self.create_element("em", children=children)])
 
-        return self.create_element("code", {"class": ["codespan"]}, [self.create_text(match.group(2))]), match.end() - match.start()
+    def code(self, match:'re.Match[str]'):
+        return self.create_element("code", {"class": ["codespan"]}, [self.create_text(match.group(2))]), match.end()
 
     ########## Top Level Handlers ##########
 
     # Blockquote
 
-    def handle_blockquote(self, line: 'str'):
+    def handle_blockquote(self, match: 're.Match[str]'):
         if self.block != "BLOCKQUOTE":
-            self.start_block("BLOCKQUOTE", self.end_blockquote)
-
-        match = re.match(self.top_level_tags["blockquote"]["pattern"], line)
-        assert match is not None, "Blockquote not found"
+            self.start_container("BLOCKQUOTE", self.end_blockquote)
 
+        # The rest of the line is parsed inside the blockquote, as are lines of text after it
         self.handle_text(match.group(1))
 
     def end_blockquote(self):
-        subparser = self.parser_class()
-        children = subparser.parse(self.buffer)
-        return self.create_element("blockquote", children=children)
+        return self.create_element("blockquote", children=self.end_container())
 
     # Code
 
-    def handle_code(self, line: 'str'):
-        if not self.parsing[0]:
+    def handle_code(self, match: 're.Match[str]'):
+        if self.block is not None and self.block.startswith("CODE:"):
+            # Closing fence
             self.end_block(parse=False)
-        else:
-            self.parsing = False, ["code"]
+            return
 
-        if self.block is None or not self.block.startswith("CODE:"):
-            match = re.match(self.top_level_tags["code"]["pattern"], line)
-            assert match is not None, "Code block not found"
-            lang = match.group(1) or ""
-            self.start_block(f"CODE:{lang}", self.end_code)
-        else:
-            self.end_block()
+        lang = match.group(1) or ""
+        self.start_block(f"CODE:{lang}", self.end_code)
+        self.parsing = False, ["code"]
 
     def end_code(self):
         lang = self.block[5:]
@@ -439,10 +373,7 @@ class BaseExtension(Extension):
 
     # List
 
-    def handle_ul(self, line: 'str'):
-        match = re.match(self.top_level_tags["ul"]["pattern"], line)
-        assert match is not None, "UL not found"
-
+    def handle_ul(self, match: 're.Match[str]'):
         indent = len(match.group(1))
         type = match.group(2)
         input = match.group(3) != None
@@ -456,10 +387,7 @@ class BaseExtension(Extension):
         # Store the indent level and content for proper nesting
         self.list_stack.append({"list":"ul", "input":input, "checked": checked, "indent": indent, "contents": contents, "type": type})
 
-    def handle_ol(self, line: 'str'):
-        match = re.match(self.top_level_tags["ol"]["pattern"], line)
-        assert match is not None, "OL not found"
-
+    def handle_ol(self, match: 're.Match[str]'):
         indent = len(match.group(1))
         num = int(match.group(2))
         type = match.group(3)
@@ -570,7 +498,8 @@ class BaseExtension(Extension):
 
     # TR
 
-    def handle_tr(self, line: 'str'):
+    def handle_tr(self, match: 're.Match[str]'):
+        line = match.string
         if self.had_thead:
             self.table.append(line)
             return
@@ -581,7 +510,8 @@ class BaseExtension(Extension):
         self.thead = line
 
 
-    def handle_thead(self, line: 'str'):
+    def handle_thead(self, match: 're.Match[str]'):
+        line = match.string
         if not self.thead:
             self.handle_text(line)
         elif self.had_thead:
@@ -611,6 +541,11 @@ class BaseExtension(Extension):
             ] for row in self.table
         ]
 
+        # The next table starts from scratch
+        self.table = []
+        self.thead = ""
+        self.had_thead = False
+
         return self.create_element(
                 "table",
                 children=[
@@ -641,17 +576,14 @@ class BaseExtension(Extension):
 
     # Br
 
-    def handle_br(self, line: 'str'):
+    def handle_br(self, match: 're.Match[str]'):
         self.end_block()
         return self.create_element("br")
 
     # Header
 
-    def handle_h(self, line: 'str'):
+    def handle_h(self, match: 're.Match[str]'):
         self.end_block()
-        match = re.match(self.top_level_tags["h"]["pattern"], line)
-        assert match is not None, "Header not found"
-
         level = len(match.group(1))
         content = match.group(2)
 
@@ -659,14 +591,11 @@ class BaseExtension(Extension):
 
     # Horizontal rule
 
-    def handle_hr(self, line: 'str'):
+    def handle_hr(self, match: 're.Match[str]'):
         self.end_block()
         return self.create_element("hr", {})
 
-    def handle_title(self, line: 'str'):
+    def handle_title(self, match: 're.Match[str]'):
         self.end_block()
-        match = re.match(self.top_level_tags["title"]["pattern"], line)
-        assert match is not None, "Title not found"
-
         title = match.group(1)
         self.head = self.create_element("head", children=[self.create_element("title", children=[self.create_text(title)])])
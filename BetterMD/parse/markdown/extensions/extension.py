@@ -6,12 +6,20 @@ if t.TYPE_CHECKING:
     from ..parser import MDParser
 
 class Extension(ABC):
+    # Whether the elements its inline tags make depend on nothing but the text, so they can
+    # be reused for the same text, see `MDParser.inline_memo`
+    memoize = True
+
     def __init__(self, parser_class:'type[MDParser]'):
         self.parser_class = parser_class
 
     def init(self, parser:'MDParser'):
         self.parser = parser
-        self.dom = parser.dom
+
+    @property
+    def dom(self) -> 'list[ELEMENT|TEXT]':
+        # The current container's, it changes as nested containers are parsed
+        return self.parser.dom
 
     @property
     @abstractmethod
@@ -27,6 +35,25 @@ class Extension(ABC):
     def text_tags(self) -> 'dict[str, ELM_TEXT]':
         ...
 
+    def at_boundary(self) -> 'bool':
+        """
+        Whether the extension holds nothing for the next lines outside of a block, see
+        `MDParser.at_boundary`. Extensions keeping state between lines must override this.
+        """
+        return True
+
+    def save_state(self) -> 't.Any':
+        """
+        The state this extension keeps between lines, set aside while a nested container is
+        parsed with the same extension and given back to `load_state` after it.
+        """
+        return None
+
+    def load_state(self, state:'t.Any'):
+        """
+        Restore a state from `save_state`, or start a new container's with `None`.
+        """
+
     @property
     def buffer(self) -> 'str':
         return self.parser.buffer
@@ -63,6 +90,12 @@ class Extension(ABC):
     def end_block(self, parse=True):
         self.parser.end_block(parse)
 
+    def start_container(self, block:'str', end_func:'t.Callable[[], None]'):
+        self.parser.start_container(block, end_func)
+
+    def end_container(self) -> 'list[ELEMENT|TEXT]':
+        return self.parser.end_container()
+
     def handle_text(self, line:'str'):
         self.parser.handle_text(line)
 
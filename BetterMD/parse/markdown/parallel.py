@@ -0,0 +1,132 @@
+import re
+import typing as t
+from bisect import bisect_right
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import repeat
+
+from .parser import MDParser
+
+if t.TYPE_CHECKING:
+    from ..typing import ELEMENT, Builder
+    from . import Extension
+
+# Fence lines of `BaseExtension`, only used to pick split points. Whether a split point
+# really is a boundary is checked with `MDParser.at_boundary` while parsing.
+FENCE_RE = re.compile(r"^```[A-Za-z]*$", re.M)
+
+
+def split_points(text:'str', size:'int') -> 'list[int]':
+    """
+    Pre-scan `text` for the starts of segments of about `size` characters. Segments start
+    after an empty line that isn't inside a code fence or after a table row, where a new
+    parser starts in the same state as one that parsed the text before.
+    """
+    starts = [0]
+    fences = [match.start() for match in FENCE_RE.finditer(text)]
+    length = len(text)
+    pos = size
+    while pos < length:
+        found = text.find("\n\n", pos)
+        if found == -1 or found + 2 >= length:
+            break
+
+        # An odd number of fences before the empty line, it's in a code block
+        i = bisect_right(fences, found)
+        if i % 2:
+            if i == len(fences):
+                break
+            pos = fences[i]
+            continue
+
+        # A lone table row waits for a delimiter row after empty lines too
+        if text.startswith("|", text.rfind("\n", 0, found) + 1):
+            pos = found + 1
+            continue
+
+        starts.append(found + 2)
+        pos = found + 2 + size
+    return starts
+
+
+def parse_segment(options:'tuple[bool, bool, t.Optional[Builder]]', extensions:'list[type[Extension]]', segment:'str') -> 'tuple[list[ELEMENT], t.Optional[ELEMENT], bool]':
+    """
+    Parse one segment in a worker with a new parser. Returns its blocks, the head its
+    `title:` lines set (if any) and whether the parser was at a boundary after its last line.
+    """
+    zero_copy, compact, builder = options
+    parser = MDParser(zero_copy=zero_copy, compact=compact, builder=builder)
+    # The extensions of the parser that split the text, which may not be the ones
+    # registered in this process
+    parser.extensions = extensions
+
+    head = None
+    boundary = False
+
+    def lines():
+        nonlocal head, boundary
+        head = parser.head
+        yield from segment.splitlines()
+        boundary = parser.at_boundary()
+
+    blocks = list(parser.iter_line_blocks(lines()))
+    return blocks, parser.head if parser.head is not head else None, boundary
+
+
+def parse_parallel(
+    parser:'MDParser',
+    text:'str',
+    processes:'t.Optional[int]'=None,
+    segment_size:'int'=1 << 20,
+    executor:'t.Optional[Executor]'=None
+) -> 'list[ELEMENT]':
+    """
+    See `MDParser.parse_parallel`.
+    """
+    starts = split_points(text, segment_size)
+    if len(starts) == 1:
+        return parser.parse(text)
+
+    if executor is None:
+        with ProcessPoolExecutor(processes) as pool:
+            return parse_parallel(parser, text, processes, segment_size, pool)
+
+    starts.append(len(text))
+    count = len(starts) - 1
+    options = (parser.zero_copy, parser.compact, parser.builder)
+    results = executor.map(parse_segment, repeat(options), repeat(parser.extensions), (text[starts[i]:starts[i+1]] for i in range(count)))
+
+    blocks:'list[ELEMENT]' = []
+    head = []
+    i = 0
+    while i < count:
+        segment_blocks, segment_head, boundary = next(results)
+        if boundary or i == count - 1:
+            blocks.extend(segment_blocks)
+            if segment_head is not None:
+                head = segment_head
+            i += 1
+            continue
+
+        # The segment ends inside a block, the segments after it were parsed from the wrong
+        # state. Parse on from its start here until a segment ends at a boundary.
+        first = i
+        initial = None
+
+        def lines():
+            nonlocal i, initial
+            initial = parser.head
+            while i < count:
+                yield from text[starts[i]:starts[i+1]].splitlines()
+                i += 1
+                if parser.at_boundary():
+                    return
+
+        blocks.extend(parser.iter_line_blocks(lines()))
+        if parser.head is not initial:
+            head = parser.head
+        # Results of the segments parsed here
+        for _ in range(i - first - 1):
+            next(results)
+
+    parser.head = head
+    return blocks
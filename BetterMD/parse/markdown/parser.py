@@ -1,23 +1,143 @@
+import copy
+import mmap
 import re
-from ..typing import ELEMENT, TEXT
+import threading
+from collections import OrderedDict
+from ..typing import ELEMENT, TEXT, EVENT, Builder
+from ..nodes import LazyText, ElementNode, TextNode, copy_attributes
+from ..decoding import decode_lines
 import typing as t
 
 if t.TYPE_CHECKING:
+    from concurrent.futures import Executor
+    from ..decoding import SOURCE
     from .typing import ELM_TYPE_W_END, ELM_TYPE_WO_END, ELM_TEXT
     from . import Extension
 
+class Delimiter:
+    """
+    A run of delimiter characters in `MDParser.parse_text`, `text[start:end]` is the part
+    not paired up yet. `handlers` are the handlers of the tags pairing its character, by the
+    length of the runs they pair.
+    """
+    __slots__ = ("char", "start", "end", "handlers")
+
+    def __init__(self, char:'str', start:'int', end:'int', handlers:'dict[int, t.Callable]'):
+        self.char = char
+        self.start = start
+        self.end = end
+        self.handlers = handlers
+
+
+class Container:
+    """
+    The block state of one level of nested containers (e.g. blockquotes). Every level is
+    parsed by the same parser and extensions, the state of the level being parsed lives on
+    the parser and the others are kept here, see `MDParser.start_container`.
+    """
+    __slots__ = ("lines", "dom", "buffer_lines", "end_func", "block", "parsing", "head", "child", "states", "children")
+
+    def __init__(self, states:'list[t.Any]'):
+        # Lines given to the container, parsed when it is finished
+        self.lines:'list[str]' = []
+        self.dom:'list[ELEMENT|TEXT]' = []
+        self.buffer_lines:'list[str]' = []
+        self.end_func:'t.Optional[t.Callable[[], None]]' = None
+        self.block:'t.Optional[str]' = None
+        self.parsing:'tuple[bool, list[str]]' = True, []
+        self.head = []
+        self.child:'t.Optional[Container]' = None
+        # Extension states, see `Extension.save_state`
+        self.states = states
+        # The container's elements once it is finished
+        self.children:'t.Optional[list[ELEMENT|TEXT]]' = None
+
+
+class InlineMemo:
+    """
+    The inline elements of the last `maxsize` short texts `MDParser.parse_text` parsed, by the
+    text and the extensions and tags that parsed it, shared by every parser once it's set as
+    `MDParser.inline_memo`. Parsers with an extension that isn't `memoize` skip it. Repeated texts
+    (e.g. "Yes", "N/A" or the same link) are scanned twice at most, a text seen for the first
+    time is only remembered as seen, so texts seen once cost no more than without the memo.
+
+    Results are kept as `(name, attributes, children)` tuples, the memo is the parser's
+    builder while they are recorded. Every hit builds new elements from them with the
+    parser's own builder, callers never share elements.
+    """
+
+    def __init__(self, maxsize:'int'=4096, max_length:'int'=256):
+        self.maxsize = maxsize
+        # Longer texts are rarely repeated, and scanning them costs more than the memo saves
+        self.max_length = max_length
+        self.hits = 0
+        self.misses = 0
+        self.results:'OrderedDict[tuple, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def element(self, name:'str', attributes:'dict', children:'list') -> 'tuple':
+        return name, attributes, tuple(children)
+
+    def text(self, content:'t.Union[str, LazyText]') -> 'str':
+        return content if isinstance(content, str) else content["content"]
+
+    def get(self, key:'tuple') -> 't.Union[tuple, bool]':
+        """
+        The result for `key`, otherwise whether it was seen before and should be recorded.
+        """
+        with self._lock:
+            results = self.results
+            result = results.get(key)
+            if result is None:
+                self.misses += 1
+                if key in results:
+                    return True
+                results[key] = None
+                if len(results) > self.maxsize:
+                    results.popitem(last=False)
+                return False
+
+            results.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key:'tuple', result:'tuple'):
+        with self._lock:
+            self.results[key] = result
+            if len(self.results) > self.maxsize:
+                self.results.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.results.clear()
+            self.hits = self.misses = 0
+
+
 class MDParser:
+    # Never mutated in place, parsers running in other threads keep iterating the list they started with
     extensions:'list[type[Extension]]' = []
-    top_level_tags:'dict[str, t.Union[ELM_TYPE_W_END, ELM_TYPE_WO_END]]' = {}
-    text_tags:'dict[str, ELM_TEXT]' = {}
+    _extensions_lock = threading.Lock()
+    # Patterns extensions give as strings, compiled once per extension set
+    _patterns:'dict[str, re.Pattern[str]]' = {}
+    # Set to an `InlineMemo` to reuse the elements of repeated texts
+    inline_memo:'t.Optional[InlineMemo]' = None
+
+    top_level_tags:'dict[str, t.Union[ELM_TYPE_W_END, ELM_TYPE_WO_END]]'
+    text_tags:'dict[str, ELM_TEXT]'
 
     @classmethod
     def add_extension(cls, extension: 'type[Extension]'):
-        cls.extensions.append(extension)
+        with cls._extensions_lock:
+            cls.extensions = [*cls.extensions, extension]
+            cls._patterns = {}
 
     @classmethod
     def remove_extension(cls, extension: 'type[Extension]'):
-        cls.extensions.remove(extension)
+        with cls._extensions_lock:
+            extensions = list(cls.extensions)
+            extensions.remove(extension)
+            cls.extensions = extensions
+            cls._patterns = {}
 
     @classmethod
     def get_extension(cls, name: 'str') -> 't.Union[type[Extension], None]':
@@ -25,41 +145,130 @@ class MDParser:
             if extension.name == name:
                 return extension
 
+    @classmethod
+    def compile_pattern(cls, pattern: 't.Union[str, re.Pattern[str]]') -> 're.Pattern[str]':
+        if isinstance(pattern, re.Pattern):
+            return pattern
+
+        patterns = cls._patterns
+        compiled = patterns.get(pattern)
+        if compiled is None:
+            compiled = patterns[pattern] = re.compile(pattern)
+        return compiled
+
     def refresh_extensions(self):
+        """
+        Create this parser's extensions and its handler tables. They are kept until the
+        extension set changes with `add_extension`/`remove_extension`, so calling this for
+        every document costs nothing.
+        """
+        extensions = self.extensions
+        if extensions is self.extension_set:
+            return
+
         self.top_level_tags = {}
         self.text_tags = {}
+        self.exts = []
 
-        for extension in self.extensions:
+        for extension in extensions:
             ext = extension(MDParser)
             ext.init(self)
             self.top_level_tags.update(ext.top_level_tags)
             self.text_tags.update(ext.text_tags)
             self.exts.append(ext)
 
-    def __init__(self):
+        compile = self.compile_pattern
+        # Block tags by the first character of the lines they can match ("" for empty lines,
+        # " " for any whitespace), in registry order. Legacy tags without a `trigger` are in
+        # every list and get the line instead of the match.
+        entries = []
+        for tag, handler in self.top_level_tags.items():
+            trigger = handler.get("trigger")
+            if trigger is None:
+                entries.append((None, (tag, compile(handler["pattern"]).search, handler["handler"], handler["end"], False)))
+            else:
+                entries.append((trigger, (tag, compile(handler["pattern"]).match, handler["handler"], handler["end"], True)))
+
+        self.block_default:'list[tuple[str, t.Callable[[str], t.Optional[re.Match[str]]], t.Callable, t.Optional[t.Callable], bool]]' = [
+            entry for trigger, entry in entries if trigger is None
+        ]
+        self.block_handlers:'dict[str, list[tuple[str, t.Callable[[str], t.Optional[re.Match[str]]], t.Callable, t.Optional[t.Callable], bool]]]' = {
+            char: [entry for trigger, entry in entries if trigger is None or char in trigger]
+            for trigger, _ in entries if trigger is not None
+            for char in trigger
+        }
+
+        # Inline tags by the characters they can start with, legacy tags without a `trigger`
+        # are tried at every position
+        self.inline_handlers:'dict[str, list[tuple[str, tuple[t.Callable[[str, int], t.Optional[re.Match[str]]], ...], t.Callable, bool]]]' = {}
+        self.legacy_inline_handlers:'list[tuple[str, tuple[t.Callable[[str, int], t.Optional[re.Match[str]]], ...], t.Callable]]' = []
+        for tag, handler in self.text_tags.items():
+            patterns = handler["pattern"] if isinstance(handler["pattern"], list) else [handler["pattern"]]
+            trigger = handler.get("trigger")
+            if trigger is None:
+                # Written against the rest of the text, `^` is implied by `match(text, pos)`
+                matches = tuple(compile(pattern.removeprefix("^") if isinstance(pattern, str) else pattern).match for pattern in patterns)
+                self.legacy_inline_handlers.append((tag, matches, handler["handler"]))
+                continue
+
+            entry = (tag, tuple(compile(pattern).match for pattern in patterns), handler["handler"], handler.get("delimiter", False))
+            for char in trigger:
+                self.inline_handlers.setdefault(char, []).append(entry)
+
+        # Escapes and line breaks (emphasis doesn't span lines) are handled by `parse_text` itself
+        self.inline_trigger = re.compile(f"[{re.escape(''.join(self.inline_handlers))}\\\\\n]")
+        self.extension_set = extensions
+        # Part of the inline memo's keys, the extension set is replaced when it changes
+        self.extension_key = tuple(extensions)
+        self.memoize = all(ext.memoize for ext in self.exts)
+
+    def __init__(self, zero_copy:'bool'=False, compact:'bool'=False, builder:'t.Optional[Builder]'=None):
+        """
+        With `zero_copy`, plain inline text becomes `LazyText` slices of the paragraph it was
+        scanned from, built only when read.
+
+        With `compact`, elements are `ElementNode`/`TextNode` objects instead of dicts.
+
+        With a `builder`, elements are made by `builder.element`/`builder.text` instead,
+        extensions create them bottom up so their children are always finished first.
+        """
+        self.zero_copy = zero_copy
+        self.compact = compact
+        self.builder = builder
         self.exts:'list[Extension]' = []
+        self.extension_set:'t.Optional[list[type[Extension]]]' = None
         self.reset()
+        self.refresh_extensions()
 
     def reset(self):
         self.dom:'list[ELEMENT|TEXT]' = []
-        self.buffer = ""
+        self.buffer_lines:'list[str]' = []
         self.end_func:'t.Optional[t.Callable[[], None]]' = None
         self.dom_stack = []
         self.head = []
         self.block = None
         self.parsing:'tuple[bool, list[str]]' = True, [] # bool - is parsing, list[str] - tags
+        # The open container nested in the current level and the levels around the current one
+        self.child:'t.Optional[Container]' = None
+        self.containers:'list[Container]' = []
+        self.level = Container([])
 
         for extension in self.exts:
             extension.init(self)
 
-    @staticmethod
-    def create_element(name:'str', attrs:'dict[str, t.Union[str, bool, int, float]]'=None, children:'list[ELEMENT|TEXT]'=None) -> 'ELEMENT':
+    def create_element(self, name:'str', attrs:'dict[str, t.Union[str, bool, int, float]]'=None, children:'list[ELEMENT|TEXT]'=None) -> 'ELEMENT':
         if children is None:
             children = []
 
         if attrs is None:
             attrs = {}
 
+        if self.builder is not None:
+            return self.builder.element(name, attrs, children)
+
+        if self.compact:
+            return ElementNode(name, attrs, children)
+
         return {
             "type": "element",
             "name": name,
@@ -67,131 +276,488 @@ class MDParser:
             "children": children
         }
 
-    @staticmethod
-    def create_text(content:'str') -> 'TEXT':
+    def create_text(self, content:'str') -> 'TEXT':
+        if self.builder is not None:
+            return self.builder.text(content)
+
+        if self.compact:
+            return TextNode(content)
+
         return {
             "type": "text",
             "content": content,
             "name": "text"
         }
 
+    def text_slice(self, text:'str', start:'int', end:'int') -> 'TEXT':
+        if self.zero_copy:
+            lazy = LazyText(text, start, end)
+            return lazy if self.builder is None else self.builder.text(lazy)
+        return self.create_text(text[start:end])
+
     def end_block(self, parse=True):
-        if self.buffer and parse:
+        # The block gets the first look at the buffer, e.g. blockquotes parse it themselves
+        if self.end_func is not None:
+            self.dom.append(self.end_func())
+            self.end_func = None
+            self.block = None
+            self.parsing = True, []
+
+        if self.buffer_lines and parse:
             self.dom.append(self.parse_text(self.buffer))
 
-        if self.end_func is None:
-            return
-
-        self.dom.append(self.end_func())
-        self.end_func = None
-        self.block = None
-        self.parsing = True, []
+        self.buffer_lines = []
 
     def start_block(self, block, end_func=None):
         self.end_block()
         self.block = block
         self.end_func = end_func
 
+    # Containers
+
+    def start_container(self, block, end_func):
+        """
+        Start a block holding other blocks. Text handled while it is open (see `handle_text`)
+        becomes lines of the nested container. They are parsed by this parser and its
+        extensions when `end_func` gets the container's elements from `end_container`.
+        """
+        self.start_block(block, end_func)
+        self.child = Container([None] * len(self.exts))
+
+    def end_container(self) -> 'list[ELEMENT|TEXT]':
+        """
+        Finish the open nested container and return its top level elements.
+        """
+        child = self.child
+        if child.children is None:
+            # Every level's lines are parsed before the containers still open in it, which
+            # are finished innermost first. The `end_container` of the levels around them
+            # returns the elements kept here, so nesting doesn't recurse.
+            chain = []
+            level = child
+            while level is not None:
+                self.enter(level)
+                chain.append(level)
+
+                lines = level.lines
+                level.lines = []
+                # A last empty line only separates the container from what follows it
+                if lines and not lines[-1]:
+                    lines.pop()
+                handle_line = self.handle_line
+                for line in lines:
+                    handle_line(line)
+                level = self.child
+
+            for level in reversed(chain):
+                self.end_block()
+                level.children = list(self.flush())
+                self.leave()
+
+        self.child = None
+        return child.children
+
+    def save_level(self, level: 'Container'):
+        level.dom = self.dom
+        level.buffer_lines = self.buffer_lines
+        level.end_func = self.end_func
+        level.block = self.block
+        level.parsing = self.parsing
+        level.head = self.head
+        level.child = self.child
+        level.states = [ext.save_state() for ext in self.exts]
+
+    def load_level(self, level: 'Container'):
+        self.dom = level.dom
+        self.buffer_lines = level.buffer_lines
+        self.end_func = level.end_func
+        self.block = level.block
+        self.parsing = level.parsing
+        self.head = level.head
+        self.child = level.child
+        for ext, state in zip(self.exts, level.states):
+            ext.load_state(state)
+
+    def enter(self, level: 'Container'):
+        self.save_level(self.level)
+        self.containers.append(self.level)
+        self.level = level
+        self.load_level(level)
+
+    def leave(self):
+        self.save_level(self.level)
+        self.level = self.containers.pop()
+        self.load_level(self.level)
+
     # Text
 
-    def handle_text(self, line: 'str'):
-        # Buffer text content for paragraph handling
-        if self.buffer:
-            self.buffer += '\n' + line
-        else:
-            self.buffer = line
+    @property
+    def buffer(self) -> 'str':
+        # Lines are only joined when the block reads them, appending stays linear
+        lines = self.buffer_lines
+        if len(lines) > 1:
+            lines[:] = ["\n".join(lines)]
+        return lines[0] if lines else ""
 
-    def parse(self, markdown: 'str') -> 'list[ELEMENT]':
-        self.refresh_extensions()
+    @buffer.setter
+    def buffer(self, value: 'str'):
+        self.buffer_lines = [value] if value else []
 
-        for line in markdown.splitlines():
-            # Check for block-level elements
-            for tag, handler in self.top_level_tags.items():
-                if (not self.parsing[0]) and (tag not in self.parsing[1]):
-                    continue
-                if re.search(handler["pattern"], line):
-                    if handler["end"] is not None:
-                        handler["handler"](line)
-                    else:
-                        self.dom.append(handler["handler"](line))
-                    break
+    def handle_text(self, line: 'str'):
+        # Text goes to the open nested container, otherwise it is buffered for paragraph
+        # handling. Leading empty lines are dropped.
+        lines = self.buffer_lines if self.child is None else self.child.lines
+        if line or lines:
+            lines.append(line)
+
+    def parse(self, markdown: 'SOURCE', encoding: 't.Optional[str]' = None) -> 'list[ELEMENT]':
+        return list(self.iter_blocks(markdown, encoding))
+
+    def parse_parallel(self, markdown: 'SOURCE', encoding: 't.Optional[str]' = None, processes: 't.Optional[int]' = None, segment_size: 'int' = 1 << 20, executor: 't.Optional[Executor]' = None) -> 'list[ELEMENT]':
+        """
+        `parse` a large document on a pool of `processes` (all CPUs by default), or on
+        `executor` if given. The result is the same as `parse`.
+
+        The text is split into segments of about `segment_size` characters at empty lines
+        outside code fences, each parsed by a new parser in a worker. A segment that turns
+        out to end inside a block (see `at_boundary`) is parsed again here with the ones
+        after it, until one ends at a boundary. The builder, if any, and what it makes must
+        be picklable.
+        """
+        from .parallel import parse_parallel
+
+        if not isinstance(markdown, str):
+            markdown = "\n".join(decode_lines(markdown, encoding))
+        return parse_parallel(self, markdown, processes, segment_size, executor)
+
+    def iter_blocks(self, markdown: 'SOURCE', encoding: 't.Optional[str]' = None) -> 't.Iterator[ELEMENT]':
+        """
+        Yield top level elements as soon as their block is finished.
+
+        `markdown` can also be `bytes`, a `memoryview`, an `mmap`, a file, any iterable of
+        `str` lines (with or without their line endings, e.g. a generator) or of `bytes`
+        chunks (e.g. a socket reader). It is read and split into lines as it is consumed,
+        see `decode_lines`, so only the block being parsed is held in memory.
+        """
+        return self.iter_line_blocks(decode_lines(markdown, encoding))
+
+    def iter_line_blocks(self, lines: 't.Iterable[str]') -> 't.Iterator[ELEMENT]':
+        """
+        `iter_blocks` for lines that are already split, without their line endings.
+
+        The next line is only taken once the blocks the previous one finished have been
+        yielded, so `lines` can look at the parser's state in between, see `at_boundary`.
+        """
+        self.reset()
+        self.refresh_extensions()
 
-            else:
-                # Regular text gets buffered for paragraph handling
-                self.handle_text(line)
+        handle_line = self.handle_line
+        for line in lines:
+            handle_line(line)
+            if self.dom:
+                yield from self.flush()
 
         # End any remaining block
         self.end_block()
+        yield from self.flush()
+
+    def handle_line(self, line: 'str'):
+        # Only the tags that can start with the line's first character are tried
+        first = line[:1]
+        if first.isspace():
+            first = " "
+
+        parsing, tags = self.parsing
+        for tag, match, handler, end, takes_match in self.block_handlers.get(first, self.block_default):
+            if not parsing and tag not in tags:
+                continue
+
+            found = match(line)
+            if found:
+                arg = found if takes_match else line
+                if end is not None:
+                    handler(arg)
+                else:
+                    self.dom.append(handler(arg))
+                return
+
+        # Regular text gets buffered for paragraph handling
+        self.handle_text(line)
 
-        dom:'list[ELEMENT]' = []
+    def at_boundary(self) -> 'bool':
+        """
+        Whether the parser holds nothing between the last line and the next one, no open
+        block or buffered text. Parsing the rest of a document from here gives the same
+        blocks as a new parser would, `MDDocument` re-parses edits from these points.
+        """
+        return self.block is None and not self.buffer_lines and all(ext.at_boundary() for ext in self.exts)
 
+    def flush(self) -> 't.Iterator[ELEMENT]':
         for item in self.dom:
             if isinstance(item, list):
-                dom.extend(item)
+                yield from item
             else:
-                dom.append(item)
+                yield item
 
-        return dom
+        # Cleared in place, extensions hold a reference to it
+        self.dom.clear()
 
-    def parse_text(self, text: 'str') -> 'list[ELEMENT | TEXT]':
-        self.refresh_extensions()
-        plain_text = ""
-        dom = []
-        i = 0
+    def iterparse(self, markdown: 'SOURCE', encoding: 't.Optional[str]' = None) -> 't.Iterator[EVENT]':
+        """
+        Lazily yield `(event, name, data)` tuples, see `HTMLParser.iterparse`.
 
-        def handle(pattern, handler):
-            if re.match(pattern, text[i:]):
-                return True, *handler(text[i:])
+        Only the block currently being parsed is held in memory.
+        """
+        for block in self.iter_blocks(markdown, encoding):
+            yield from self.iter_events(block)
 
-            return False, None, 0
+    @staticmethod
+    def iter_events(node: 'ELEMENT|TEXT') -> 't.Iterator[EVENT]':
+        stack: 'list[ELEMENT|TEXT|str]' = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                yield "end", node, None
+            elif node["type"] == "text":
+                yield "text", "text", node["content"]
+            else:
+                yield "start", node["name"], node["attributes"]
+                stack.append(node["name"])
+                stack.extend(reversed(node["children"]))
 
-        while i < len(text):
-            for tag, handler in self.text_tags.items():
-                if not self.parsing[0] and tag not in self.parsing[1]:
+    def parse_text(self, text: 'str') -> 'list[ELEMENT | TEXT]':
+        """
+        Parse inline markup, see `scan_text`. With an `inline_memo`, texts up to its
+        `max_length` characters are only scanned the first time they are seen by any parser
+        with the same extensions.
+        """
+        memo = self.inline_memo
+        if memo is not None and self.memoize and len(text) <= memo.max_length and self.builder is not memo:
+            parsing, tags = self.parsing
+            key = (self.extension_key, parsing, tuple(tags), text)
+            result = memo.get(key)
+            if result is False:
+                return self.scan_text(text)
+            if result is True:
+                builder = self.builder
+                self.builder = memo
+                try:
+                    result = tuple(self.scan_text(text))
+                finally:
+                    self.builder = builder
+                memo.put(key, result)
+            return [self.build_inline(node) for node in result]
+
+        return self.scan_text(text)
+
+    def build_inline(self, node:'t.Any') -> 'ELEMENT | TEXT':
+        # An element of the inline memo, text is built as if it was sliced from the paragraph
+        if isinstance(node, str):
+            return self.text_slice(node, 0, len(node))
+        if isinstance(node, tuple):
+            name, attributes, children = node
+            return self.create_element(name, copy_attributes(attributes), [self.build_inline(child) for child in children])
+        # Made by an extension without `create_element`
+        return copy.deepcopy(node)
+
+    def scan_text(self, text: 'str') -> 'list[ELEMENT | TEXT]':
+        """
+        Parse inline markup in one pass.
+
+        Only positions holding a trigger character of some inline tag are looked at, and
+        patterns are matched in place with `pattern.match(text, pos)`. Handlers get the
+        match and return the element and where it ends, or `None` to pass.
+
+        Runs of delimiter tags (`*`, `_`) aren't parsed on their own. They are pushed on a
+        delimiter stack as possible openers and paired with later closing runs, the text
+        between becomes the children of the element the handler of the tag pairing runs of
+        that length builds (`italic`, `bold` or `bold_and_italic`).
+        """
+        inline_handlers = self.inline_handlers
+        legacy = self.legacy_inline_handlers
+        search = None if legacy else self.inline_trigger.search
+        parsing, tags = self.parsing
+
+        # Plain text spans as slices (builders can make elements of any type, tuples too),
+        # `Delimiter` runs and finished elements
+        items:'list[t.Union[slice, Delimiter, ELEMENT, TEXT]]' = []
+        # Runs that may still be closed, with their index in `items`
+        openers:'list[tuple[Delimiter, int]]' = []
+        open_chars:'dict[str, int]' = {}
+        # Handlers of the delimiter tags by character, see `Delimiter`
+        delimiters:'dict[str, dict[int, t.Callable]]' = {}
+        length = len(text)
+        plain = pos = 0
+
+        while pos < length:
+            if search is None:
+                p = pos
+            else:
+                found = search(text, pos)
+                if found is None:
+                    break
+                p = found.start()
+
+            char = text[p]
+            if char == "\\":
+                # The escaped character stays text
+                pos = p + 2
+                continue
+            if char == "\n":
+                openers.clear()
+                open_chars.clear()
+                pos = p + 1
+                continue
+
+            end = None
+            for tag, matches, handler, delimiter in inline_handlers.get(char, ()):
+                if not parsing and tag not in tags:
                     continue
 
-                if isinstance(handler["pattern"], list):
-                    b = False
-                    for pattern in handler["pattern"]:
-                        v, elm, l = handle(pattern, handler["handler"])
-                        if v:
-                            if plain_text:
-                                dom.append(self.create_text(plain_text))
-                                plain_text = ""
-
-                            dom.append(elm)
-                            i += l
-                            b = True
-                            break
-                    if b:
+                for match in matches:
+                    found = match(text, p)
+                    if found is not None:
                         break
                 else:
-                    v, elm, l = handle(handler["pattern"], handler["handler"])
-                    if v:
-                        if plain_text:
-                            dom.append(self.create_text(plain_text))
-                            plain_text = ""
-                        
-                        dom.append(elm)
-                        i += l
-                        break
-
-            else:
-                plain_text += text[i]
+                    continue
 
-            i += 1
+                if delimiter:
+                    end = found.end()
+                    if plain < p:
+                        items.append(slice(plain, p))
+                    handlers = delimiters.get(char)
+                    if handlers is None:
+                        # The first tag for a length wins
+                        handlers = delimiters[char] = {
+                            count: handler for tag, _, handler, count in reversed(inline_handlers[char])
+                            if count and (parsing or tag in tags)
+                        }
+                    self.push_delimiter(text, Delimiter(char, p, end, handlers), items, openers, open_chars)
+                    break
 
-        if plain_text:
-            dom.append(self.create_text(plain_text))
-            plain_text = ""
+                ret = handler(found)
+                if ret is not None:
+                    elm, end = ret
+                    if plain < p:
+                        items.append(slice(plain, p))
+                    items.append(elm)
+                    break
 
-        return dom
+            else:
+                for tag, matches, handler in legacy:
+                    if not parsing and tag not in tags:
+                        continue
+                    if any(match(text, p) for match in matches):
+                        elm, l = handler(text[p:])
+                        end = p + l
+                        if plain < p:
+                            items.append(slice(plain, p))
+                        items.append(elm)
+                        break
 
-    def from_file(self, file):
-        with open(file, "r") as f:
-            self.parse(f.read())
+            if end is None:
+                pos = p + 1
+            else:
+                plain = pos = end
+
+        if plain < length:
+            items.append(slice(plain, length))
+
+        return self.inline_nodes(text, items)
+
+    def push_delimiter(self, text:'str', run:'Delimiter', items:'list', openers:'list[tuple[Delimiter, int]]', open_chars:'dict[str, int]'):
+        """
+        Close what `run` can close, then keep the rest of it as a possible opener or text.
+
+        A run can open if it is followed by non whitespace and close if it follows it. The
+        longest length up to three both runs have and a tag pairs is used, e.g. `***` on both
+        sides is `bold_and_italic`, `**` and `***` is `bold`.
+        """
+        char = run.char
+        can_open = run.end < len(text) and not text[run.end].isspace()
+        can_close = run.start > 0 and not text[run.start - 1].isspace()
+
+        while can_close and open_chars.get(char) and run.start < run.end:
+            i = len(openers) - 1
+            while openers[i][0].char != char:
+                i -= 1
+
+            opener, index = openers[i]
+            used = min(3, opener.end - opener.start, run.end - run.start)
+            while used and used not in opener.handlers:
+                used -= 1
+            if not used:
+                break
+
+            # Runs between the pair can't be closed any more, they stay text
+            for skipped, _ in openers[i+1:]:
+                open_chars[skipped.char] -= 1
+            del openers[i+1:]
+
+            # The innermost characters of both runs are used
+            opener.end -= used
+            children = self.inline_nodes(text, items[index+1:])
+            del items[index+1:]
+            items.append(opener.handlers[used](char, children))
+            run.start += used
+
+            if opener.start == opener.end:
+                openers.pop()
+                open_chars[char] -= 1
+
+        if can_open and run.start < run.end:
+            openers.append((run, len(items)))
+            open_chars[char] = open_chars.get(char, 0) + 1
+        items.append(run)
+
+    def inline_nodes(self, text:'str', items:'list') -> 'list[ELEMENT | TEXT]':
+        # Neighbouring spans and unused delimiters become one text node
+        nodes = []
+        start = end = 0
+        for item in items:
+            if isinstance(item, slice):
+                item_start, item_end = item.start, item.stop
+            elif isinstance(item, Delimiter):
+                item_start, item_end = item.start, item.end
+            else:
+                if start < end:
+                    nodes.append(self.text_slice(text, start, end))
+                start = end = 0
+                nodes.append(item)
+                continue
+
+            if item_start == item_end:
+                continue
+            if start < end and end == item_start:
+                end = item_end
+            else:
+                if start < end:
+                    nodes.append(self.text_slice(text, start, end))
+                start, end = item_start, item_end
+
+        if start < end:
+            nodes.append(self.text_slice(text, start, end))
+        return nodes
+
+    def from_file(self, file, encoding: 't.Optional[str]' = None):
+        """
+        Parse the file at `file` into an `html` element. The file is memory mapped and
+        decoded a chunk at a time, it is never read into one string.
+        """
+        with open(file, "rb") as f:
+            try:
+                source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                # Empty files and pipes can't be mapped, read them a chunk at a time instead
+                source = f
+
+            try:
+                dom = self.parse(source, encoding)
+            finally:
+                if isinstance(source, mmap.mmap):
+                    source.close()
 
         head = self.create_element("head", children=self.head)
-        body = self.create_element("body", children=self.dom)
+        body = self.create_element("body", children=dom)
 
         return self.create_element("html", children=[head, body])
\ No newline at end of file
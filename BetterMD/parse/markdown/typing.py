@@ -1,3 +1,4 @@
+import re
 import typing as t
 
 if t.TYPE_CHECKING:
@@ -5,19 +6,32 @@ if t.TYPE_CHECKING:
     from ..typing import ELEMENT, TEXT
 
 class ELM_TYPE_W_END(t.TypedDict):
-    pattern: 't.Union[str, list[str]]'
-    handler: 't.Callable[[str], None | t.NoReturn]'
+    pattern: 't.Union[str, re.Pattern[str]]'
+    # Gets the match with a `trigger`, the line without one
+    handler: 't.Callable[[t.Union[re.Match[str], str]], None | t.NoReturn]'
     end: 't.Callable[[], None]'
+    # First characters of the lines the pattern can match, `""` for empty lines and `" "`
+    # for any whitespace
+    trigger: 't.NotRequired[t.Union[str, list[str]]]'
 
 
 class ELM_TYPE_WO_END(t.TypedDict):
-    pattern: 't.Union[str, list[str]]'
-    handler: 't.Callable[[str], ELEMENT]'
+    pattern: 't.Union[str, re.Pattern[str]]'
+    handler: 't.Callable[[t.Union[re.Match[str], str]], ELEMENT]'
     end: 'None'
+    trigger: 't.NotRequired[t.Union[str, list[str]]]'
 
 class ELM_TEXT(t.TypedDict):
-    pattern: 't.Union[str, list[str]]'
-    handler: 't.Callable[[str], tuple[TEXT | ELEMENT, int]]'
+    pattern: 't.Union[str, re.Pattern[str], list[t.Union[str, re.Pattern[str]]]]'
+    # With a `trigger`, the handler gets the match and returns the element and its end
+    # (or `None` to pass), with `delimiter` it gets `(char, children)` and returns the
+    # element wrapping a paired run. Without one it gets the rest of the text and returns
+    # the element and its length.
+    handler: 't.Union[t.Callable[[re.Match[str]], t.Optional[tuple[TEXT | ELEMENT, int]]], t.Callable[[str, list[TEXT | ELEMENT]], ELEMENT], t.Callable[[str], tuple[TEXT | ELEMENT, int]]]'
+    # Characters a match can start with
+    trigger: 't.NotRequired[str]'
+    # The length of the delimiter runs (e.g. `**`) the tag pairs, the pattern matches a run
+    delimiter: 't.NotRequired[int]'
 
 class OL_LIST(t.TypedDict):
     list: 't.Literal["ol"]'
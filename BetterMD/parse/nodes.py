@@ -0,0 +1,193 @@
+import typing as t
+
+if t.TYPE_CHECKING:
+    from ..typing import ATTRS
+
+
+def copy_attributes(attributes:'ATTRS') -> 'ATTRS':
+    """
+    A copy of `attributes` that can be changed without changing them, class lists and style
+    dicts are changed in place by symbols.
+    """
+    return {key: value.copy() if isinstance(value, (list, dict)) else value for key, value in attributes.items()}
+
+
+class LazyText(dict):
+    """
+    A `TEXT` node that references a slice of the source instead of owning a copy of it.
+
+    The content string is only built (and then cached) the first time it's read, the
+    reference to the source is dropped at that point.
+    """
+
+    __slots__ = ("source", "start", "end", "process", "parent")
+
+    def __init__(
+        self,
+        source: 'str',
+        start: 'int',
+        end: 'int',
+        process: 't.Optional[t.Callable[[str, str], str]]' = None,
+        parent: 'str' = ""
+    ):
+        super().__init__(type="text", name="text")
+        self.source = source
+        self.start = start
+        self.end = end
+        self.process = process
+        self.parent = parent
+
+    @property
+    def materialized(self) -> 'bool':
+        return self.source is None
+
+    def materialize(self) -> 'str':
+        # Read once, another thread may materialize the node at the same time
+        source, process = self.source, self.process
+        if source is None:
+            return dict.__getitem__(self, "content")
+
+        content = source[self.start:self.end]
+        if process is not None:
+            content = process(content, self.parent)
+
+        dict.__setitem__(self, "content", content)
+        self.source = self.process = None
+        return content
+
+    def __bool__(self):
+        return True
+
+    def __len__(self):
+        self.materialize()
+        return super().__len__()
+
+    def __missing__(self, key):
+        if key != "content":
+            raise KeyError(key)
+        return self.materialize()
+
+    def __contains__(self, key):
+        return key == "content" or super().__contains__(key)
+
+    def __iter__(self):
+        self.materialize()
+        return super().__iter__()
+
+    def __eq__(self, other):
+        self.materialize()
+        return super().__eq__(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        self.materialize()
+        return super().__repr__()
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        self.materialize()
+        return super().keys()
+
+    def values(self):
+        self.materialize()
+        return super().values()
+
+    def items(self):
+        self.materialize()
+        return super().items()
+
+    def copy(self) -> 'dict':
+        self.materialize()
+        return dict(super().items())
+
+    __hash__ = None
+
+
+class Node:
+    """
+    Base of the compact `__slots__` nodes, read (and written) like the `ELEMENT`/`TEXT`
+    dicts they replace.
+    """
+
+    __slots__ = ()
+    type: 'str'
+    # Keys seen through the dict interface, other slots are still reachable by subscript
+    fields: 'tuple[str, ...]' = ()
+
+    def __getitem__(self, key: 'str'):
+        if key in self.fields or key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key: 'str', value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.fields
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def get(self, key: 'str', default=None):
+        return self[key] if key in self.fields else default
+
+    def keys(self):
+        return self.fields
+
+    def values(self):
+        return [getattr(self, key) for key in self.fields]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.fields]
+
+    def copy(self) -> 'dict':
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (Node, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    __hash__ = None
+
+
+class ElementNode(Node):
+    """
+    Compact `ELEMENT`. `parent` is only used by the HTML tree builder and isn't one of its keys.
+    """
+
+    __slots__ = ("name", "attributes", "children", "parent")
+    type = "element"
+    fields = ("type", "name", "attributes", "children")
+
+    def __init__(self, name: 'str', attributes: 'dict' = None, children: 'list' = None, parent: 't.Optional[ElementNode]' = None):
+        self.name = name
+        self.attributes = {} if attributes is None else attributes
+        self.children = [] if children is None else children
+        self.parent = parent
+
+
+class TextNode(Node):
+    """
+    Compact `TEXT`.
+    """
+
+    __slots__ = ("content",)
+    type = "text"
+    name = "text"
+    fields = ("type", "content", "name")
+
+    def __init__(self, content: 'str'):
+        self.content = content
@@ -0,0 +1,164 @@
+import html.parser
+import re
+import typing as t
+
+from .html import HTMLParser
+
+class Tokenizer(html.parser.HTMLParser):
+    """
+    Drives `StdlibHTMLParser`: the stdlib tokenizer finds the markup, `StdlibHTMLParser`
+    turns it into the same events as `HTMLParser`.
+
+    Only the documented `html.parser` API is used, fed with `feed` and `close`. Where a
+    handler doesn't get the markup as written (the `;` of a reference, `<!--` or `<!` before
+    a comment), the construct is finished by `ended` once the next one starts, as `getpos`
+    then tells how much of the input it took.
+    """
+
+    # `textarea` and `pre` are raw text here too, not only `script` and `style`
+    CDATA_CONTENT_ELEMENTS = tuple(HTMLParser.NON_PARSING_TAGS)
+
+    def __init__(self, parser: 'StdlibHTMLParser'):
+        self.parser = parser
+        self.text: 'list[str]' = []
+        # The reference or comment `ended` finishes, with where it starts
+        self.pending: 't.Optional[tuple[str, str, tuple[int, int]]]' = None
+        super().__init__(convert_charrefs=False)
+
+    def ended(self):
+        if self.pending is None:
+            return
+        kind, data, (line, offset) = self.pending
+        self.pending = None
+        end = self.getpos()
+
+        if kind == "ref":
+            # References are kept as they are written, with or without their `;`
+            if end != (line, offset + len(data)):
+                data += ";"
+            self.text.append(data)
+            return
+
+        # `<!...>` bogus comments are declarations to `HTMLParser`, they end where `<!`,
+        # `data` and `>` would
+        newlines = data.count("\n")
+        if newlines:
+            bogus = (line + newlines, len(data) - data.rindex("\n"))
+        else:
+            bogus = (line, offset + len(data) + 3)
+        if end != bogus:
+            self.parser.events.append(("comment", "comment", self.parser.text_slice(data, 0, len(data))))
+
+    def flush_text(self):
+        self.ended()
+        if self.text:
+            text = "".join(self.text)
+            self.text = []
+            self.parser.handle_data(text, 0, len(text))
+
+    def handle_data(self, data: 'str'):
+        self.ended()
+        self.text.append(data)
+
+    def handle_entityref(self, name: 'str'):
+        self.ended()
+        self.pending = ("ref", "&" + name, self.getpos())
+
+    def handle_charref(self, name: 'str'):
+        self.ended()
+        self.pending = ("ref", "&#" + name, self.getpos())
+
+    def handle_starttag(self, tag: 'str', attrs):
+        self.flush_text()
+        parser = self.parser
+        # Re-read the raw tag so names keep their case and values aren't unescaped
+        parser.handle_opening_tag(self.get_starttag_text(), 1)
+        if parser.raw_tag is None and len(parser.events) >= parser.EVENTS_PER_BUILD:
+            parser.build_events()
+
+    def handle_startendtag(self, tag: 'str', attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag: 'str'):
+        parser = self.parser
+        if parser.raw_tag is not None:
+            text = "".join(self.text)
+            self.text = []
+            parser.events.append(("text", "text", parser.text_slice(text, 0, len(text))))
+            parser.raw_tag = None
+        else:
+            self.flush_text()
+
+        # Closing tags always close the innermost open element
+        if parser.open_tags:
+            parser.events.append(("end", parser.open_tags.pop(), None))
+        if len(parser.events) >= parser.EVENTS_PER_BUILD:
+            parser.build_events()
+
+    def handle_comment(self, data: 'str'):
+        self.flush_text()
+        self.pending = ("comment", data, self.getpos())
+
+    def handle_decl(self, decl: 'str'):
+        self.flush_text()
+
+    def unknown_decl(self, data: 'str'):
+        self.flush_text()
+
+    def handle_pi(self, data: 'str'):
+        self.flush_text()
+
+
+class StdlibHTMLParser(HTMLParser):
+    """
+    `HTMLParser` backend tokenizing with the standard library's `html.parser`.
+
+    It produces the same `ELEMENT`/`TEXT` tree (and `iterparse` events). Malformed
+    markup can be recovered from differently, the stdlib follows the HTML5 tokenizer
+    more closely, e.g. for unterminated tags and `<?...>` processing instructions. A `&#`
+    that doesn't start a character reference, with no `;` after it, ends the markup and
+    the rest is text.
+    """
+
+    # What can follow the `&` of a reference that isn't terminated yet
+    REF_NAME_RE = re.compile(r"[-.#a-zA-Z0-9]*")
+
+    def reset(self):
+        super().reset()
+        self.tokenizer = Tokenizer(self)
+
+    def unterminated(self, html: 'str') -> 'int':
+        """
+        Where the references at the end of `html` that aren't terminated yet start, e.g. the
+        `&b&c` of `a&b&c`. `len(html)` if there are none.
+        """
+        start = len(html)
+        while True:
+            i = html.rfind("&", 0, start)
+            if i < 0 or self.REF_NAME_RE.fullmatch(html, i + 1, start) is None:
+                return start
+            start = i
+
+    def goahead(self, end: 'bool'):
+        tokenizer = self.tokenizer
+        html = self.rawdata
+        # `close` drops the `&` of a reference at the end of the input, so they are kept
+        # back until more data comes and are text if none does
+        i = self.unterminated(html)
+        tokenizer.feed(html[:i])
+        self.rawdata = html[i:]
+
+        if end:
+            tokenizer.close()
+            if self.rawdata:
+                tokenizer.handle_data(self.rawdata)
+                self.rawdata = ""
+            if self.raw_tag is not None:
+                # Unterminated raw text element, its content runs to the end
+                tokenizer.handle_endtag(self.raw_tag)
+            else:
+                tokenizer.flush_text()
+
+            # Close anything left open so every start has a matching end
+            while self.open_tags:
+                self.events.append(("end", self.open_tags.pop(), None))
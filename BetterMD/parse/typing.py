@@ -2,6 +2,10 @@ import typing as t
 
 from ..typing import ATTRS
 
+if t.TYPE_CHECKING:
+    from .nodes import LazyText
+    from .decoding import SOURCE
+
 ELEMENT_TYPES:'dict[t.Literal["block", "inline", "void"], list[str]]' = {
     "block": [
         "address", "article", "aside", "blockquote", "canvas", "dd", "div",
@@ -32,6 +36,23 @@ class ELEMENT(t.TypedDict):
     attributes: 'ATTRS'
     children: 'list[t.Union[ELEMENT, TEXT]]'
 
+EVENT = t.Union[
+    tuple[t.Literal["start"], str, ATTRS],
+    tuple[t.Literal["end"], str, None],
+    tuple[t.Literal["text", "comment"], str, 't.Union[str, LazyText]']
+]
+
+class Builder(t.Protocol):
+    """
+    Turns nodes into the caller's own objects as the parser finishes them, instead of
+    `ELEMENT`/`TEXT` dicts. `children` are already built.
+    """
+    def element(self, name:'str', attributes:'ATTRS', children:'list[t.Any]') -> 't.Any': ...
+
+    def text(self, content:'t.Union[str, LazyText]') -> 't.Any': ...
+
 @t.runtime_checkable
 class Parser(t.Protocol):
-    def parse(self, html:'str') -> 'list[ELEMENT]': ...
\ No newline at end of file
+    def __init__(self, zero_copy:'bool'=False, compact:'bool'=False, builder:'t.Optional[Builder]'=None): ...
+
+    def parse(self, html:'SOURCE', encoding:'t.Optional[str]'=None) -> 'list[ELEMENT]': ...
\ No newline at end of file
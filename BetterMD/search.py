@@ -0,0 +1,513 @@
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import typing as t
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import merge
+
+from .elements.selector import tag_name
+from .elements.symbol import Symbol
+from .elements.text import Text
+
+if t.TYPE_CHECKING:
+    from .batch import TREE
+
+# A parsed document, its symbols or its `TREE`s from `parse_many`
+DOCUMENT = t.Union[Symbol, 'TREE', t.Sequence[t.Union[Symbol, 'TREE']]]
+
+WORD_RE = re.compile(r"\w+")
+
+# Words in these run on into the words around them, every other element ends a phrase
+PHRASING = frozenset({
+    "a", "abbr", "b", "bdi", "bdo", "big", "cite", "code", "data", "del", "dfn", "em", "font", "i",
+    "ins", "kbd", "mark", "q", "s", "samp", "small", "span", "strong", "sub", "sup", "time", "tt",
+    "u", "var",
+})
+# Text nobody searches for, not indexed
+SKIPPED = frozenset({"comment", "script", "style"})
+
+# Words outside any element
+NO_ELEMENT = 0xFFFFFFFF
+
+MAGIC = b"BMDINDEX"
+VERSION = 1
+# Magic, version, byte order, number of documents and terms, then the offset and length of
+# every section
+HEADER = struct.Struct("<8sBB2xII18Q")
+SECTIONS = (
+    "keys", "key_offsets", "starts", "elements", "map_offsets",
+    "terms", "term_offsets", "postings", "posting_offsets",
+)
+BYTE_ORDERS = {"little": 0, "big": 1}
+
+
+def roots(document: 'DOCUMENT') -> 'list[t.Union[Symbol, TREE]]':
+    if isinstance(document, (Symbol, str)):
+        return [document]
+    if isinstance(document, tuple) and len(document) == 3 and isinstance(document[1], dict):
+        return [document]
+    return list(document)
+
+
+def parts(node: 't.Union[Symbol, TREE]') -> 'tuple[str, t.Sequence[t.Union[Symbol, TREE]]]':
+    # The tag and children of an element
+    if isinstance(node, Symbol):
+        return tag_name(type(node)), node.children
+    return node[0].lower(), node[2]
+
+
+def read(document: 'DOCUMENT') -> 'tuple[dict[str, array], array, array]':
+    """
+    The positions of every word in the text of `document`, and the elements they are in:
+    words from position `starts[i]` on are in the element numbered `elements[i]`, counted
+    in document order. Positions skip one where a phrase ends.
+    """
+    terms: 'dict[str, array]' = {}
+    starts, elements = array("I"), array("I")
+    position = ordinal = 0
+    gap = False
+
+    # Each node with the number of the element it's in, `None` where an element ends
+    stack: 'list[tuple[t.Any, int]]' = [(node, NO_ELEMENT) for node in reversed(roots(document))]
+    while stack:
+        node, element = stack.pop()
+        if node is None:
+            gap = True
+            continue
+
+        text = node if isinstance(node, str) else node.text if isinstance(node, Text) else None
+        if text is not None:
+            words = WORD_RE.findall(text.casefold())
+            if not words:
+                continue
+            if gap:
+                # Not before the first word
+                position += bool(position)
+                gap = False
+            if not elements or elements[-1] != element:
+                starts.append(position)
+                elements.append(element)
+            for word in words:
+                positions = terms.get(word)
+                if positions is None:
+                    terms[word] = array("I", (position,))
+                else:
+                    positions.append(position)
+                position += 1
+            continue
+
+        name, children = parts(node)
+        number, ordinal = ordinal, ordinal + 1
+        if name in SKIPPED:
+            continue
+        if name not in PHRASING:
+            gap = True
+            stack.append((None, element))
+        stack.extend((child, number) for child in reversed(children))
+
+    return terms, starts, elements
+
+
+def phrase_starts(positions: 'list[t.Sequence[int]]') -> 'list[int]':
+    # Where the words of a phrase follow each other, the positions of each are sorted
+    if len(positions) == 1:
+        return list(positions[0])
+
+    rarest = min(range(len(positions)), key=lambda i: len(positions[i]))
+    others = [(offset - rarest, following) for offset, following in enumerate(positions) if offset != rarest]
+    found = []
+    for position in positions[rarest]:
+        for offset, following in others:
+            i = bisect_left(following, position + offset)
+            if i == len(following) or following[i] != position + offset:
+                break
+        else:
+            found.append(position - rarest)
+    return found
+
+
+class Segment:
+    """
+    A saved `SearchIndex`, read through `mmap` so only the parts queries touch are loaded.
+    """
+
+    def __init__(self, path:'str'):
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            self.file.close()
+            raise ValueError(f"`{path}` is not a search index")
+        self.view = memoryview(self.map)
+
+        try:
+            magic, version, byte_order, self.documents, self.size, *offsets = HEADER.unpack_from(self.map)
+        except struct.error:
+            magic = version = byte_order = None
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"`{path}` is not a search index of this version")
+        if byte_order != BYTE_ORDERS[sys.byteorder]:
+            self.close()
+            raise ValueError(f"`{path}` was saved on a machine with another byte order")
+
+        self.sections: 'dict[str, memoryview]' = {}
+        formats = {"keys": "B", "terms": "B", "starts": "I", "elements": "I", "postings": "I"}
+        for i, name in enumerate(SECTIONS):
+            offset, length = offsets[2 * i], offsets[2 * i + 1]
+            self.sections[name] = self.view[offset:offset + length].cast(formats.get(name, "Q"))
+
+    def key(self, id:'int') -> 'str':
+        offsets = self.sections["key_offsets"]
+        return bytes(self.sections["keys"][offsets[id]:offsets[id + 1]]).decode("utf-8")
+
+    def term(self, i:'int') -> 'bytes':
+        offsets = self.sections["term_offsets"]
+        return bytes(self.sections["terms"][offsets[i]:offsets[i + 1]])
+
+    def find(self, term:'str') -> 't.Optional[int]':
+        # Terms are sorted by their UTF-8 bytes, the same order as the strings
+        data = term.encode("utf-8")
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.term(mid) < data:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.size and self.term(lo) == data else None
+
+    def postings(self, i:'int') -> 'memoryview':
+        # `[n, documents..., n + 1 offsets into the positions..., positions...]`
+        offsets = self.sections["posting_offsets"]
+        return self.sections["postings"][offsets[i]:offsets[i + 1]]
+
+    def term_documents(self, i:'int') -> 'memoryview':
+        data = self.postings(i)
+        return data[1:1 + data[0]]
+
+    def element_map(self, id:'int') -> 'tuple[memoryview, memoryview]':
+        offsets = self.sections["map_offsets"]
+        return self.sections["starts"][offsets[id]:offsets[id + 1]], self.sections["elements"][offsets[id]:offsets[id + 1]]
+
+    def close(self):
+        for view in self.__dict__.pop("sections", {}).values():
+            view.release()
+        if hasattr(self, "view"):
+            self.view.release()
+        try:
+            self.map.close()
+        except BufferError:
+            # Postings still used by a caller, closed once those are gone
+            pass
+        self.file.close()
+
+
+class SearchIndex:
+    """
+    An inverted index of the words in the text of many documents, each added under a key
+    (e.g. its path) as symbols or as the `TREE`s `parse_many` yields, so documents parsed on
+    a pool can be indexed as they come.
+
+    `search` finds a word or a phrase and where it is in each document: the number of the
+    element it's in, counting elements in document order (`element` finds it again), and
+    the position of its first word. Phrases don't run across elements other than inline
+    ones like `b` or `a`.
+
+    With a `path`, the index saved there is read through `mmap`, documents added or removed
+    since are kept in memory until `save` writes them all to a new file. Postings are arrays
+    of native 32 bit integers, a saved index is only read on machines of the same byte order.
+    """
+
+    def __init__(self, path:'t.Optional[t.Union[str, os.PathLike]]'=None):
+        self.path = None if path is None else os.fspath(path)
+        self.segment: 't.Optional[Segment]' = None
+        if self.path is not None and os.path.exists(self.path):
+            self.segment = Segment(self.path)
+
+        # Saved documents by key, read on first use
+        self._saved: 't.Optional[dict[str, int]]' = None
+        self.removed: 'set[int]' = set()
+
+        # Documents added since, and their postings by term
+        self.added: 'dict[str, tuple[dict[str, array], array, array]]' = {}
+        self.postings: 'dict[str, dict[str, array]]' = {}
+        self._lock = threading.RLock()
+
+    @property
+    def saved(self) -> 'dict[str, int]':
+        if self._saved is None:
+            segment = self.segment
+            self._saved = {} if segment is None else {segment.key(id): id for id in range(segment.documents)}
+        return self._saved
+
+    def __contains__(self, key:'str') -> 'bool':
+        with self._lock:
+            return key in self.added or (key in self.saved and self.saved[key] not in self.removed)
+
+    def __len__(self) -> 'int':
+        with self._lock:
+            saved = 0 if self.segment is None else self.segment.documents
+            return saved - len(self.removed) + len(self.added)
+
+    def add(self, key:'str', document:'DOCUMENT'):
+        """
+        Index `document` under `key`, replacing the document indexed under it before.
+        """
+        terms, starts, elements = read(document)
+        with self._lock:
+            self.discard(key)
+            self.added[key] = terms, starts, elements
+            for term, positions in terms.items():
+                self.postings.setdefault(term, {})[key] = positions
+
+    def remove(self, key:'str'):
+        """
+        Remove the document indexed under `key`, `KeyError` if there isn't one.
+        """
+        with self._lock:
+            if not self.discard(key):
+                raise KeyError(key)
+
+    def discard(self, key:'str') -> 'bool':
+        with self._lock:
+            if key in self.added:
+                terms = self.added.pop(key)[0]
+                for term in terms:
+                    documents = self.postings[term]
+                    del documents[key]
+                    if not documents:
+                        del self.postings[term]
+                return True
+
+            id = self.saved.get(key)
+            if id is not None and id not in self.removed:
+                self.removed.add(id)
+                return True
+            return False
+
+    def search(self, query:'str') -> 'list[tuple[str, list[tuple[t.Optional[int], int]]]]':
+        """
+        Documents with the words of `query` one after another, with the element and
+        position of every match. Saved documents come first in the order they were added,
+        then the ones added since.
+        """
+        words = WORD_RE.findall(query.casefold())
+        if not words:
+            return []
+
+        found = []
+        with self._lock:
+            segment = self.segment
+            if segment is not None:
+                terms = [segment.find(word) for word in words]
+                if None not in terms:
+                    found.extend(self.search_saved(segment, [segment.postings(i) for i in terms]))
+
+            documents = [self.postings.get(word) for word in words]
+            if None not in documents:
+                rarest = min(documents, key=len)
+                for key in rarest:
+                    if all(key in positions for positions in documents):
+                        starts = phrase_starts([positions[key] for positions in documents])
+                        if starts:
+                            _, map_starts, map_elements = self.added[key]
+                            found.append((key, self.locate(map_starts, map_elements, starts)))
+        return found
+
+    def search_saved(self, segment:'Segment', postings:'list[memoryview]') -> 't.Iterator[tuple[str, list[tuple[t.Optional[int], int]]]]':
+        # The documents, offsets and positions of every term, by the rarest
+        terms = []
+        for data in postings:
+            n = data[0]
+            terms.append((data[1:1 + n], data[1 + n:2 + 2 * n], data[2 + 2 * n:]))
+        rarest = min(terms, key=lambda term: len(term[0]))
+
+        for id in rarest[0]:
+            if id in self.removed:
+                continue
+
+            positions = []
+            for documents, offsets, term_positions in terms:
+                i = bisect_left(documents, id)
+                if i == len(documents) or documents[i] != id:
+                    break
+                positions.append(term_positions[offsets[i]:offsets[i + 1]])
+            else:
+                starts = phrase_starts(positions)
+                if starts:
+                    map_starts, map_elements = segment.element_map(id)
+                    yield segment.key(id), self.locate(map_starts, map_elements, starts)
+
+    @staticmethod
+    def locate(starts:'t.Sequence[int]', elements:'t.Sequence[int]', positions:'list[int]') -> 'list[tuple[t.Optional[int], int]]':
+        return [
+            (None if element == NO_ELEMENT else element, position)
+            for position in positions
+            for element in (elements[bisect_right(starts, position) - 1],)
+        ]
+
+    @staticmethod
+    def element(document:'DOCUMENT', number:'int') -> 't.Union[Symbol, TREE]':
+        """
+        The element numbered `number` in `document` by `search`.
+        """
+        ordinal = 0
+        stack = list(reversed(roots(document)))
+        while stack:
+            node = stack.pop()
+            if isinstance(node, (str, Text)):
+                continue
+            if ordinal == number:
+                return node
+            ordinal += 1
+            name, children = parts(node)
+            if name not in SKIPPED:
+                stack.extend(reversed(children))
+        raise IndexError(f"`document` has no element {number}")
+
+    def save(self, path:'t.Optional[t.Union[str, os.PathLike]]'=None):
+        """
+        Write every document to `path` (the index's own by default) and read them from there
+        from now on. Written next to it and renamed, readers of the old file never see part
+        of the new one.
+        """
+        path = self.path if path is None else os.fspath(path)
+        if path is None:
+            raise ValueError("The index has no path to save to")
+
+        with self._lock:
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    self.write(f)
+                if self.segment is not None:
+                    # The old file can't be replaced while it's mapped on some systems
+                    self.segment.close()
+                    self.segment = None
+                os.replace(tmp, path)
+            except BaseException:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                raise
+
+            self.path = path
+            self.segment = Segment(path)
+            self._saved = None
+            self.removed = set()
+            self.added = {}
+            self.postings = {}
+
+    def write(self, f:'t.BinaryIO'):
+        segment = self.segment
+        saved = [] if segment is None else [id for id in range(segment.documents) if id not in self.removed]
+        added = list(self.added)
+        # New numbers of the saved documents, the added ones follow them
+        renumber = {old: new for new, old in enumerate(saved)}
+        added_ids = {key: len(saved) + i for i, key in enumerate(added)}
+
+        sections: 'dict[str, tuple[int, int]]' = {}
+
+        def section(name:'str', data:'t.Union[bytes, array]'):
+            start = f.tell()
+            f.write(data)
+            sections[name] = start, f.tell() - start
+            # Every section starts 8 byte aligned
+            f.write(b"\0" * (-f.tell() % 8))
+
+        f.write(b"\0" * HEADER.size)
+        f.write(b"\0" * (-f.tell() % 8))
+
+        keys = [segment.key(id) for id in saved] + added
+        blob, offsets = bytearray(), array("Q", [0])
+        for key in keys:
+            blob += key.encode("utf-8")
+            offsets.append(len(blob))
+        section("keys", bytes(blob))
+        section("key_offsets", offsets)
+
+        starts, elements, offsets = array("I"), array("I"), array("Q", [0])
+        for id in saved:
+            map_starts, map_elements = segment.element_map(id)
+            starts.extend(map_starts)
+            elements.extend(map_elements)
+            offsets.append(len(starts))
+        for key in added:
+            _, map_starts, map_elements = self.added[key]
+            starts.extend(map_starts)
+            elements.extend(map_elements)
+            offsets.append(len(starts))
+        section("starts", starts)
+        section("elements", elements)
+        section("map_offsets", offsets)
+
+        saved_terms = [] if segment is None else ((segment.term(i).decode("utf-8"), i) for i in range(segment.size))
+        added_terms = ((term, None) for term in sorted(self.postings))
+        terms: 'list[tuple[str, t.Optional[int], bool]]' = []
+        for term, i in merge(saved_terms, added_terms, key=lambda entry: entry[0]):
+            if terms and terms[-1][0] == term:
+                terms[-1] = (term, terms[-1][1], True)
+            else:
+                terms.append((term, i, i is None))
+        if self.removed:
+            # Terms only in removed documents aren't written
+            terms = [
+                (term, i, in_added) for term, i, in_added in terms
+                if in_added or any(id in renumber for id in segment.term_documents(i))
+            ]
+
+        blob, offsets = bytearray(), array("Q", [0])
+        for term, _, _ in terms:
+            blob += term.encode("utf-8")
+            offsets.append(len(blob))
+        section("terms", bytes(blob))
+        section("term_offsets", offsets)
+
+        start = f.tell()
+        offsets = array("Q", [0])
+        written = 0
+        for term, i, in_added in terms:
+            documents, position_offsets, positions = array("I"), array("I", [0]), array("I")
+            if i is not None:
+                data = segment.postings(i)
+                n = data[0]
+                term_documents, term_offsets, term_positions = data[1:1 + n], data[1 + n:2 + 2 * n], data[2 + 2 * n:]
+                if not self.removed:
+                    documents.extend(term_documents)
+                    position_offsets = array("I", term_offsets)
+                    positions.extend(term_positions)
+                else:
+                    for j, id in enumerate(term_documents):
+                        if id in renumber:
+                            documents.append(renumber[id])
+                            positions.extend(term_positions[term_offsets[j]:term_offsets[j + 1]])
+                            position_offsets.append(len(positions))
+            if in_added:
+                for key, term_positions in self.postings[term].items():
+                    documents.append(added_ids[key])
+                    positions.extend(term_positions)
+                    position_offsets.append(len(positions))
+
+            data = array("I", [len(documents)])
+            data.extend(documents)
+            data.extend(position_offsets)
+            data.extend(positions)
+            f.write(data)
+            written += len(data)
+            offsets.append(written)
+        sections["postings"] = start, f.tell() - start
+        f.write(b"\0" * (-f.tell() % 8))
+        section("posting_offsets", offsets)
+
+        f.seek(0)
+        f.write(HEADER.pack(
+            MAGIC, VERSION, BYTE_ORDERS[sys.byteorder], len(keys), len(terms),
+            *(value for name in SECTIONS for value in sections[name]),
+        ))
@@ -0,0 +1,54 @@
+"""
+Batch benchmark: many small documents rendered to HTML one `from_string` call at a time
+against `render_many` on a pool of processes.
+
+`render_many` reuses one parser per worker and sends chunks of documents to the workers
+and strings back. With one process it is about as fast as `from_string`, the saved parser
+setup pays for starting the worker and pickling. More processes scale with the number of
+cores, on a single core machine they only add overhead.
+
+Usage:
+    python benchmarks/batch.py [--docs N] [--processes 1,2,4,8] [--chunksize N] [--format html|md]
+"""
+
+import argparse
+import os
+import time
+
+from BetterMD import HTML, MD
+
+SNIPPETS = {
+    "html": '<div class="card"><h2 id="t{n}">Title {n}</h2><p>Some <b>bold</b> text <a href="/page/{n}">link</a></p>'
+            '<ul><li>one</li><li><span class="tag">two</span></li></ul></div>\n',
+    "md": "# Title {n}\n\nSome **bold** and *italic* text {n} [link](/page/{n})\n\n- one\n- two\n\n> quoted\n\n",
+}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--docs", type=int, default=5000)
+    arg_parser.add_argument("--processes", default="1,2,4,8")
+    arg_parser.add_argument("--chunksize", type=int, default=64)
+    arg_parser.add_argument("--format", choices=["html", "md"], default="md")
+    args = arg_parser.parse_args()
+
+    api = HTML if args.format == "html" else MD
+    docs = ["".join(SNIPPETS[args.format].format(n=n + i) for i in range(3)) for n in range(args.docs)]
+    print(f"{os.cpu_count()} CPUs, {args.docs} documents of {len(docs[0])} characters")
+
+    start = time.perf_counter()
+    for doc in docs:
+        "\n".join(elm.to_html() for elm in api.from_string(doc))
+    base = time.perf_counter() - start
+    print(f"  from_string: {args.docs / base:8.0f} docs/s")
+
+    for processes in map(int, args.processes.split(",")):
+        start = time.perf_counter()
+        for _ in api.render_many(docs, processes=processes, chunksize=args.chunksize):
+            pass
+        seconds = time.perf_counter() - start
+        print(f"{processes:>3} processes: {args.docs / seconds:8.0f} docs/s ({base / seconds:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
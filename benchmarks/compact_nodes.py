@@ -0,0 +1,80 @@
+"""
+Peak RSS benchmark for the parser intermediate tree: dict nodes against compact nodes.
+
+Every mode runs in its own process so its peak resident set size isn't hidden by an
+earlier, larger run. The number reported is the peak RSS reached while the tree is
+held, minus the RSS after the source document was generated.
+
+Usage:
+    python benchmarks/compact_nodes.py [--size MB]
+"""
+
+import argparse
+import gc
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+from html_parser import generate  # noqa: E402
+
+MODES = {
+    "dicts": {},
+    "compact": {"compact": True},
+    "zero copy": {"zero_copy": True},
+    "compact + zero copy": {"compact": True, "zero_copy": True},
+}
+
+
+def rss() -> 'int':
+    # Peak RSS in bytes, ru_maxrss is in KB on Linux and bytes on macOS
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def nodes(dom) -> 'int':
+    count = 0
+    stack = list(dom)
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node["type"] == "element":
+            stack.extend(node["children"])
+    return count
+
+
+def child(mode: 'str', size: 'int'):
+    from BetterMD.parse import HTMLParser
+
+    html = generate(size)
+    gc.collect()
+    before = rss()
+    dom = HTMLParser(**MODES[mode]).parse(html)
+    count = nodes(dom)
+    print(count, rss() - before)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--size", type=float, default=20, help="size of the synthetic HTML document in MB")
+    arg_parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    size = int(args.size * 1_000_000)
+    if args.child:
+        return child(args.child, size)
+
+    base = None
+    for mode in MODES:
+        out = subprocess.run(
+            [sys.executable, __file__, "--size", str(args.size), "--child", mode],
+            capture_output=True, text=True, check=True
+        ).stdout.split()
+        count, peak = int(out[0]), int(out[1])
+        base = base or peak
+        print(f"{mode:>20}: {count} nodes, peak RSS +{peak / 1_000_000:.1f} MB ({peak / base:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+`InnerHTML.select` on a large document, against finding the same symbols the way
+`advanced_find` does: everything with the tag, filtered in Python.
+
+A selector starts from the smallest index list it can (ids, classes, tags and `[a=b]`
+attributes), of its last compound or of one before it, so a rare class or an id is
+cheaper the rarer it is, whatever the tag. Selectors with nothing indexed (`*`,
+`:nth-child` only) walk the subtree like the filters do. `select_one` stops at the
+first match.
+
+Usage:
+    python benchmarks/css_select.py [--sections N] [--repeat N]
+"""
+
+import argparse
+import time
+
+from BetterMD import HTML
+
+
+def filtered(root, tag, test):
+    return [symbol for symbol in root.inner_html.find(tag) if test(symbol)]
+
+
+CASES = [
+    ("p.rare", "p", lambda s: "rare" in s.classes),
+    ("section > p.c3", "p", lambda s: "c3" in s.classes and type(s.parent).__name__ == "Section"),
+    ("#s500 h2", "h2", lambda s: s.parent.get_prop("id") == "s500"),
+    ("p[data-n='3']", "p", lambda s: s.get_prop("data-n") == "3"),
+    ("section:nth-child(10n+1) h2", "h2", lambda s: s.parent.parent.children.index(s.parent) % 10 == 0),
+]
+
+
+def timed(function, repeat: 'int') -> 'float':
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--sections", type=int, default=20000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    html = "<div>" + "".join(
+        f'<section id="s{n}"><h2>Title {n}</h2><p class="c{n % 10}{" rare" if n % 1000 == 0 else ""}" data-n="{n % 7}">Body</p></section>'
+        for n in range(args.sections)
+    ) + "</div>"
+    root = HTML.from_string(html)[0].ensure_prepared()
+
+    for selector, tag, test in CASES:
+        assert root.inner_html.select(selector) == filtered(root, tag, test)
+        select = timed(lambda: root.inner_html.select(selector), args.repeat)
+        one = timed(lambda: root.inner_html.select_one(selector), args.repeat)
+        plain = timed(lambda: filtered(root, tag, test), args.repeat)
+        print(f"{selector:>30}: select {select * 1000:7.2f} ms, select_one {one * 1000:6.3f} ms, filtered {plain * 1000:7.2f} ms ({plain / select:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Editing a prepared document: add a paragraph somewhere, query the root, repeat. The index
+is updated in place for every change, compared with preparing the whole document again
+after each one (which is what a change to a table still does).
+
+Every size should take about as long per edit as the one before it, preparing again grows
+with the document. `--batch` adds that many paragraphs in one `batch()` per query, `--text`
+queries the text of the document instead of a class (its text index is patched for the new
+paragraph and its ancestors, not built again).
+
+Usage:
+    python benchmarks/edit_index.py [--nodes 25000,50000,100000] [--edits N] [--batch N] [--text]
+"""
+
+import argparse
+import random
+import time
+
+from BetterMD import HTML
+
+
+def document(nodes: 'int'):
+    # Five symbols per section: section, h2, its text, p and its text
+    return HTML.from_string("<div>" + "".join(
+        f'<section class="c{n % 10}"><h2>Title {n % 100}</h2><p>Body</p></section>'
+        for n in range(nodes // 5)
+    ) + "</div>")[0]
+
+
+def timed(root, edits: 'int', batch: 'int', again: 'bool', text: 'bool' = False) -> 'float':
+    rng = random.Random(0)
+    root.ensure_prepared()
+    start = time.perf_counter()
+    for n in range(edits):
+        with root.batch():
+            for _ in range(batch):
+                rng.choice(root.children).add_child(HTML.from_string(f'<p class="new">Edit {n}</p>')[0])
+        if again:
+            root.prepare()
+        if text:
+            root.inner_html.get_by_text(f"Edit {n}")
+        else:
+            root.inner_html.get_elements_by_class_name("new")
+    return (time.perf_counter() - start) / edits
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--nodes", default="25000,50000,100000")
+    arg_parser.add_argument("--edits", type=int, default=200)
+    arg_parser.add_argument("--batch", type=int, default=1)
+    arg_parser.add_argument("--text", action="store_true")
+    args = arg_parser.parse_args()
+
+    for nodes in map(int, args.nodes.split(",")):
+        in_place = timed(document(nodes), args.edits, args.batch, again=False, text=args.text)
+        again = timed(document(nodes), max(args.edits // 20, 1), args.batch, again=True, text=args.text)
+        print(f"{nodes:>7} nodes: in place {in_place * 1000:7.2f} ms, prepared again {again * 1000:8.1f} ms per edit ({again / in_place:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
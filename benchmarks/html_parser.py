@@ -0,0 +1,77 @@
+"""
+Throughput benchmark for `HTMLParser.parse`.
+
+Usage:
+    python benchmarks/html_parser.py [--size MB] [--repeat N] [--backend NAME] [file ...]
+
+Without files a synthetic document of `--size` megabytes is generated.
+"""
+
+import argparse
+import random
+import time
+
+from BetterMD.parse import html_backends
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit"]
+
+SNIPPETS = [
+    '<div class="card"><h2 id="t{n}">Title {n}</h2><p>{words} <a href="/page/{n}" title="Page {n}">link</a></p></div>\n',
+    '<ul>\n  <li>{words}</li>\n  <li><span class="tag">{words}</span></li>\n</ul>\n',
+    '<table><tr><td>{n}</td><td>{words}</td></tr></table>\n',
+    '<script type="text/javascript">var x{n} = "<b>" + {n};</script>\n',
+    '<p>{words}<br><img src="/img/{n}.png" alt="image {n}" /><!-- comment {n} --></p>\n',
+    '<pre>  {words}\n    {words}\n</pre>\n',
+]
+
+
+def generate(size: 'int', seed: 'int' = 0) -> 'str':
+    rng = random.Random(seed)
+    parts = ["<html><body>\n"]
+    total = 0
+    n = 0
+    while total < size:
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 30)))
+        part = rng.choice(SNIPPETS).format(n=n, words=words)
+        parts.append(part)
+        total += len(part)
+        n += 1
+    parts.append("</body></html>\n")
+    return "".join(parts)
+
+
+def bench(html: 'str', repeat: 'int', backend: 'str' = None) -> 'float':
+    best = float("inf")
+    for _ in range(repeat):
+        parser = html_backends.get_backend(backend)()
+        start = time.perf_counter()
+        parser.parse(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("files", nargs="*")
+    arg_parser.add_argument("--size", type=float, default=5, help="size of the synthetic document in MB")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--backend", action="append", help="backend(s) to run, all of them by default")
+    args = arg_parser.parse_args()
+
+    if args.files:
+        docs = []
+        for path in args.files:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                docs.append((path, f.read()))
+    else:
+        docs = [("synthetic", generate(int(args.size * 1_000_000)))]
+
+    for backend in args.backend or list(html_backends.backends):
+        for name, html in docs:
+            seconds = bench(html, args.repeat, backend)
+            mb = len(html.encode("utf-8")) / 1_000_000
+            print(f"{backend} {name}: {mb:.2f} MB in {seconds:.3f}s -> {mb / seconds:.2f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
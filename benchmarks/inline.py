@@ -0,0 +1,64 @@
+"""
+Scaling benchmark for `MDParser.parse_text` on single long paragraphs.
+
+Every size should take about twice as long as the one before it, the inline scanner is
+linear in the length of the paragraph.
+
+Usage:
+    python benchmarks/inline.py [--sizes 12.5,25,50,100,200] [--repeat N]
+"""
+
+import argparse
+import random
+import time
+
+from BetterMD.parse import MDParser
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit"]
+
+SNIPPETS = [
+    "{words} **{word}** ",
+    "{words} *{word}* ",
+    "{words} ***{word}*** ",
+    "{words} [{word}](/page/{n} \"{word}\") ",
+    "{words} `{word}` ",
+    "{words} <http://x/{n}> ",
+    "{words} a * b [c] ",
+]
+
+
+def generate(size: 'int', seed: 'int' = 0) -> 'str':
+    rng = random.Random(seed)
+    parts = []
+    total = n = 0
+    while total < size:
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 20)))
+        part = rng.choice(SNIPPETS).format(n=n, words=words, word=rng.choice(WORDS))
+        parts.append(part)
+        total += len(part)
+        n += 1
+    return "".join(parts)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--sizes", default="12.5,25,50,100,200", help="paragraph sizes in KB")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    parser = MDParser()
+    previous = None
+    for size in map(float, args.sizes.split(",")):
+        text = generate(int(size * 1000))
+        seconds = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            parser.parse_text(text)
+            seconds = min(seconds, time.perf_counter() - start)
+        ratio = f" ({seconds / previous:.2f}x)" if previous else ""
+        print(f"{size:>7.1f} KB: {seconds * 1000:8.2f} ms, {len(text) / seconds / 1_000_000:6.2f} MB/s{ratio}")
+        previous = seconds
+
+
+if __name__ == "__main__":
+    main()
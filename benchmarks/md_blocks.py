@@ -0,0 +1,60 @@
+"""
+Scaling benchmark for `MDParser.iter_blocks` on documents with many lines.
+
+Every size should take about twice as long as the one before it, lines are classified
+by their first character and paragraphs are buffered as lists of lines.
+
+Usage:
+    python benchmarks/md_blocks.py [--lines 125000,250000,500000,1000000]
+"""
+
+import argparse
+import random
+import time
+
+from BetterMD.parse import MDParser
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit"]
+
+BLOCKS = [
+    ["# Title {n}"],
+    ["{words}", "{words}", "{words}"],
+    ["- {words}", "- {words}", "  - {words}"],
+    ["1. {words}", "2. {words}"],
+    ["> {words}", "> {words}"],
+    ["```py", "x = {n}", "  {words}", "```"],
+    ["| a | b |", "|:-|-:|", "| {n} | {words} |"],
+    ["---"],
+]
+
+
+def generate(lines: 'int', seed: 'int' = 0) -> 'str':
+    rng = random.Random(seed)
+    out = []
+    n = 0
+    while len(out) < lines:
+        for line in rng.choice(BLOCKS):
+            out.append(line.format(n=n, words=" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))))
+        out.append("")
+        n += 1
+    return "\n".join(out[:lines])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--lines", default="125000,250000,500000,1000000")
+    args = arg_parser.parse_args()
+
+    previous = None
+    for lines in map(int, args.lines.split(",")):
+        md = generate(lines)
+        start = time.perf_counter()
+        blocks = sum(1 for _ in MDParser().iter_blocks(md))
+        seconds = time.perf_counter() - start
+        ratio = f" ({seconds / previous:.2f}x)" if previous else ""
+        print(f"{lines:>8} lines: {blocks:>7} blocks, {seconds:6.2f} s, {lines / seconds:9.0f} lines/s{ratio}")
+        previous = seconds
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Latency of `MDDocument.edit` against parsing the whole document again, for one character
+typed at random places in documents of growing size.
+
+A full parse takes about twice as long for every size. An edit only re-parses the blocks
+around it and finds them in the `FenwickTree`s of the document's chunks, so the median
+barely moves with the size of the document (the blocks after the edit are still moved in
+`MDDocument.blocks`, a memmove). Edits that open or close a code fence change every block
+after them, they are the slowest edits and grow with the document like a full parse.
+
+Usage:
+    python benchmarks/md_edit.py [--lines 12500,25000,50000,100000] [--edits N]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+from md_blocks import generate  # noqa: E402
+
+from BetterMD.parse import MDDocument, MDParser  # noqa: E402
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--lines", default="12500,25000,50000,100000")
+    arg_parser.add_argument("--edits", type=int, default=200)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(0)
+    for lines in map(int, args.lines.split(",")):
+        md = generate(lines)
+
+        start = time.perf_counter()
+        MDParser().parse(md)
+        full = time.perf_counter() - start
+
+        doc = MDDocument(md)
+        times = []
+        for _ in range(args.edits):
+            start = time.perf_counter()
+            doc.edit(rng.randint(0, doc.length), 0, "x")
+            times.append(time.perf_counter() - start)
+        edit = statistics.median(times)
+
+        print(f"{lines:>7} lines: full parse {full * 1000:8.1f} ms, edit median {edit * 1000:6.3f} ms ({full / edit:.0f}x), max {max(times) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+`MDParser.inline_memo` on a document of short, often repeated paragraphs and quotes (status
+lines, badges, the same links), with the memo and without.
+
+Table cells and list items are kept as plain text by `BaseExtension`, only paragraphs
+(also those inside blockquotes) are parsed for inline markup. A hit still builds new
+elements, what it saves is scanning the text and running the handlers, so it gains most
+on texts with markup. `--unique` sets the share of paragraphs seen only once, those are
+only remembered as seen and cost a lookup more than without the memo.
+
+Usage:
+    python benchmarks/md_inline_memo.py [--paragraphs N] [--unique 0.0,0.5,1.0] [--repeat N]
+"""
+
+import argparse
+import random
+import time
+
+from BetterMD.parse import MDParser
+from BetterMD.parse.markdown.parser import InlineMemo
+
+REPEATED = [
+    "Yes", "N/A", "**Stable**", "*deprecated*", "[docs](https://example.com/docs \"Docs\")",
+    "![build](https://example.com/badge.svg) **passing**", "See <https://example.com> for details",
+    "`code` and **bold _nested_ text** with a [link](/a)",
+]
+
+
+def generate(paragraphs: 'int', unique: 'float', seed: 'int' = 0) -> 'str':
+    rng = random.Random(seed)
+    out = []
+    for n in range(paragraphs):
+        text = rng.choice(REPEATED)
+        if rng.random() < unique:
+            text = f"{text} {n}"
+        out.append(f"> {text}" if n % 4 == 0 else text)
+    return "\n\n".join(out)
+
+
+def timed(md: 'str', repeat: 'int') -> 'float':
+    parser = MDParser()
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser.parse(md)
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--paragraphs", type=int, default=50000)
+    arg_parser.add_argument("--unique", default="0.0,0.5,1.0")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    for unique in map(float, args.unique.split(",")):
+        md = generate(args.paragraphs, unique)
+
+        MDParser.inline_memo = None
+        off = timed(md, args.repeat)
+
+        MDParser.inline_memo = memo = InlineMemo()
+        on = timed(md, args.repeat)
+        hit_rate = memo.hits / (memo.hits + memo.misses)
+
+        print(f"unique {unique:.0%}: without {off * 1000:7.1f} ms, with {on * 1000:7.1f} ms ({off / on:.2f}x), hit rate {hit_rate:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Benchmark for blockquotes: many small ones, and a few nested `--depth` levels deep.
+
+Every level of a blockquote is parsed by the same parser with a container stack, no
+parser is created and no text is joined per blockquote or per level.
+
+Usage:
+    python benchmarks/md_nesting.py [--quotes N] [--depth 1,4,16,64] [--repeat N]
+"""
+
+import argparse
+import time
+
+from BetterMD.parse import MDParser
+
+
+def timed(md: 'str', repeat: 'int') -> 'float':
+    parser = MDParser()
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser.parse(md)
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--quotes", type=int, default=20000)
+    arg_parser.add_argument("--depth", default="1,4,16,64")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    md = "".join(f"> quote {n} with **bold**\n> second line\n\npara {n}\n\n" for n in range(args.quotes))
+    seconds = timed(md, args.repeat)
+    print(f"{args.quotes} quotes: {seconds * 1000:8.1f} ms, {args.quotes / seconds:9.0f} quotes/s")
+
+    for depth in map(int, args.depth.split(",")):
+        lines = 2000
+        md = "".join("> " * depth + f"line {n}\n" + ("\n" if n % 20 == 19 else "") for n in range(lines))
+        seconds = timed(md, args.repeat)
+        print(f"depth {depth:>3}: {seconds * 1000:8.1f} ms, {lines / seconds:9.0f} lines/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+`MDParser.parse_parallel` against `parse` for one large document.
+
+The pre-scan and the splitting take a small part of a full parse, the rest is divided
+between the workers, less what it costs to pickle the segments to them and their blocks
+back. More processes only help with as many cores, on a single core machine they add
+that overhead.
+
+Usage:
+    python benchmarks/md_parallel.py [--lines N] [--processes 1,2,4,8] [--segment-size N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+from md_blocks import generate  # noqa: E402
+
+from BetterMD.parse import MDParser  # noqa: E402
+from BetterMD.parse.markdown.parallel import split_points  # noqa: E402
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--lines", type=int, default=1000000)
+    arg_parser.add_argument("--processes", default="1,2,4,8")
+    arg_parser.add_argument("--segment-size", type=int, default=1 << 20)
+    args = arg_parser.parse_args()
+
+    md = generate(args.lines)
+    print(f"{os.cpu_count()} CPUs, {args.lines} lines, {len(md) / 1e6:.1f} MB")
+
+    start = time.perf_counter()
+    starts = split_points(md, args.segment_size)
+    print(f"   pre-scan: {(time.perf_counter() - start) * 1000:8.1f} ms, {len(starts)} segments")
+
+    start = time.perf_counter()
+    MDParser().parse(md)
+    base = time.perf_counter() - start
+    print(f" sequential: {base * 1000:8.1f} ms")
+
+    for processes in map(int, args.processes.split(",")):
+        start = time.perf_counter()
+        MDParser().parse_parallel(md, processes=processes, segment_size=args.segment_size)
+        seconds = time.perf_counter() - start
+        print(f"{processes:>3} processes: {seconds * 1000:8.1f} ms ({base / seconds:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
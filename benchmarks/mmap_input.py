@@ -0,0 +1,80 @@
+"""
+Peak RSS benchmark for file input: reading the whole file into a `str` against
+decoding a binary file or a memory mapped file a chunk at a time.
+
+The document is written to a temporary file and streamed through `iterparse`, so no
+tree is kept and the difference is the decoded copy of the source. Pages of a mapped
+file count towards RSS, but they are clean and shared with every other process mapping
+it. Every mode runs in its own process, see `compact_nodes.py`.
+
+Usage:
+    python benchmarks/mmap_input.py [--size MB]
+"""
+
+import argparse
+import mmap
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+from compact_nodes import rss  # noqa: E402
+from html_parser import generate  # noqa: E402
+
+MODES = ["read", "binary file", "mmap"]
+
+
+def child(mode: 'str', path: 'str'):
+    from BetterMD.parse import HTMLParser
+
+    before = rss()
+    parser = HTMLParser(zero_copy=True)
+    with open(path, "rb") as f:
+        if mode == "read":
+            source = f.read().decode("utf-8")
+        elif mode == "binary file":
+            source = f
+        else:
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        count = sum(1 for event in parser.iterparse(source) if event[0] == "start")
+    print(count, rss() - before)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--size", type=float, default=50, help="size of the synthetic HTML document in MB")
+    arg_parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    arg_parser.add_argument("--write", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        return child(*args.child)
+    if args.write:
+        with open(args.write, "wb") as f:
+            f.write(generate(int(args.size * 1_000_000)).encode("utf-8"))
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".html", delete=False) as f:
+        pass
+
+    try:
+        # Written by another process too, children inherit the peak RSS of this one
+        subprocess.run([sys.executable, __file__, "--size", str(args.size), "--write", f.name], check=True)
+
+        base = None
+        for mode in MODES:
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", mode, f.name],
+                capture_output=True, text=True, check=True
+            ).stdout.split()
+            count, peak = int(out[0]), int(out[1])
+            base = base or peak
+            print(f"{mode:>12}: {count} elements, peak RSS +{peak / 1_000_000:.1f} MB ({peak / base:.2f}x)")
+    finally:
+        os.unlink(f.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+`Symbol.from_md` with and without a `ParseCache`, for a build that parses the same
+fragments over and over.
+
+A hit hashes the text and builds symbols from the cached `TREE` tuples, it skips the
+parser but not building the symbols. Hits from the directory also read and unmarshal
+the file, the first read of every entry in a new build.
+
+Usage:
+    python benchmarks/parse_cache.py [--fragments N] [--repeat N] [--directory PATH]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+from md_blocks import generate  # noqa: E402
+
+from BetterMD import ParseCache  # noqa: E402
+from BetterMD.elements import Symbol  # noqa: E402
+
+
+def timed(fragments: 'list[str]', repeat: 'int') -> 'float':
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for fragment in fragments:
+            Symbol.from_md(fragment)
+    return time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--fragments", type=int, default=200)
+    arg_parser.add_argument("--repeat", type=int, default=10)
+    arg_parser.add_argument("--directory", default=None)
+    args = arg_parser.parse_args()
+
+    fragments = [generate(60, seed) for seed in range(args.fragments)]
+    parses = args.fragments * args.repeat
+
+    seconds = timed(fragments, args.repeat)
+    print(f"   no cache: {parses / seconds:8.0f} fragments/s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.directory or tmp
+
+        Symbol.parse_cache = ParseCache(directory=directory)
+        seconds = timed(fragments, args.repeat)
+        print(f"     memory: {parses / seconds:8.0f} fragments/s (first round parses)")
+
+        Symbol.parse_cache = ParseCache(maxsize=0, directory=directory)
+        seconds = timed(fragments, args.repeat)
+        print(f"  directory: {parses / seconds:8.0f} fragments/s (every read from disk)")
+        Symbol.parse_cache = None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Scaling benchmark for `Symbol.prepare` and the `inner_html` queries it indexes for.
+
+The index of the whole tree is built in the one walk `prepare` makes, so every size should
+take about twice as long as the one before it. A query on any symbol bisects the label
+lists of the whole tree for the symbol's range, apart from that it costs what it returns
+(queries on the root return more for bigger trees). The text of the tree is indexed by the
+first text query, that walk is counted in the queries.
+
+Usage:
+    python benchmarks/prepare_index.py [--nodes 25000,50000,100000,200000] [--queries N]
+"""
+
+import argparse
+import random
+import time
+
+from BetterMD import HTML
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--nodes", default="25000,50000,100000,200000")
+    arg_parser.add_argument("--queries", type=int, default=10000)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(0)
+    for nodes in map(int, args.nodes.split(",")):
+        # Five symbols per section: section, h2, its text, p and its text
+        sections = nodes // 5
+        html = "<div>" + "".join(
+            f'<section id="s{n}" class="c{n % 10}"><h2>Title {n % 100}</h2><p data-n="{n % 7}">Body</p></section>'
+            for n in range(sections)
+        ) + "</div>"
+        root = HTML.from_string(html)[0]
+
+        start = time.perf_counter()
+        root.ensure_prepared()
+        prepare = time.perf_counter() - start
+
+        targets = [root] + [rng.choice(root.children) for _ in range(args.queries - 1)]
+        start = time.perf_counter()
+        for i, target in enumerate(targets):
+            inner = target.inner_html
+            inner.get_elements_by_class_name(f"c{i % 10}")
+            inner.get_by_attr("data-n", str(i % 7))
+            inner.get_by_text(f"Title {i % 100}")
+        query = (time.perf_counter() - start) / (3 * len(targets))
+
+        print(f"{nodes:>7} nodes: prepare {prepare * 1000:8.1f} ms, query {query * 1e6:6.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark for `SearchIndex`: index pages given as the `TREE`s `parse_many` yields, save
+them, load the saved index and query it, compared with scanning the text of every page for
+each query (what finding a phrase takes without an index).
+
+Loading only maps the file, a query reads the postings of its words and costs about what it
+finds: phrases are several times faster than scanning (7x at 20000 pages), a common word
+found in most pages costs about as much as a scan as every position in every page is
+returned. Scanning only says which pages have the phrase.
+
+Usage:
+    python benchmarks/search_index.py [--pages 10000] [--words 300] [--queries 200] [--path FILE]
+"""
+
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+
+from BetterMD import SearchIndex
+
+
+def pages(count: 'int', words: 'int'):
+    rng = random.Random(0)
+    # Zipf-like vocabulary, a few common words and many rare ones
+    vocabulary = [f"w{n}" for n in range(50000)]
+    weights = [1 / (n + 1) for n in range(len(vocabulary))]
+    for n in range(count):
+        paragraphs = []
+        for _ in range(words // 50):
+            text = " ".join(rng.choices(vocabulary, weights, k=50))
+            paragraphs.append(("p", {}, (text[:100], ("b", {}, ("bold",)), text[100:])))
+        yield f"page{n}", [("div", {}, (("h1", {}, (f"Page {n}",)),) + tuple(paragraphs))]
+
+
+def text(trees) -> 'str':
+    stack, found = list(trees), []
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            found.append(node)
+        else:
+            stack.extend(reversed(node[2]))
+    return " ".join(found)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--pages", type=int, default=10000)
+    arg_parser.add_argument("--words", type=int, default=300)
+    arg_parser.add_argument("--queries", type=int, default=200)
+    arg_parser.add_argument("--path")
+    args = arg_parser.parse_args()
+
+    path = args.path or os.path.join(tempfile.mkdtemp(), "pages.idx")
+    documents = list(pages(args.pages, args.words))
+
+    index = SearchIndex(path)
+    start = time.perf_counter()
+    for key, trees in documents:
+        index.add(key, trees)
+    add = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index.save()
+    save = time.perf_counter() - start
+    del index
+
+    start = time.perf_counter()
+    index = SearchIndex(path)
+    load = time.perf_counter() - start
+
+    rng = random.Random(1)
+    queries = []
+    for _ in range(args.queries):
+        words = text(rng.choice(documents)[1]).split()
+        i = rng.randrange(2, len(words) - 3)
+        queries.append(" ".join(words[i:i + rng.choice((1, 2, 3))]))
+
+    texts = [(key, " " + " ".join(re.findall(r"\w+", text(trees).casefold())) + " ") for key, trees in documents]
+
+    print(f"{args.pages} pages: add {add:.1f} s, save {save:.1f} s ({os.path.getsize(path) / 2**20:.1f} MiB), load {load * 1000:.2f} ms")
+    for words in (1, 2, 3):
+        group = [query for query in queries if len(query.split()) == words]
+        start = time.perf_counter()
+        found = [index.search(query) for query in group]
+        search = (time.perf_counter() - start) / len(group)
+
+        scans = group[:max(len(group) // 10, 1)]
+        start = time.perf_counter()
+        for query in scans:
+            phrase = " " + query.casefold() + " "
+            [key for key, page in texts if phrase in page]
+        scan = (time.perf_counter() - start) / len(scans)
+
+        print(f"{words} word queries: {search * 1000:7.2f} ms ({sum(map(len, found)) / len(found):5.0f} pages each), scanning the text {scan * 1000:6.1f} ms ({scan / search:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
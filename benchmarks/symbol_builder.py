@@ -0,0 +1,67 @@
+"""
+`Symbol.from_html`/`from_md` building symbols directly against parsing to an `ELEMENT`
+tree first and converting it with `Symbol.parse`.
+
+Usage:
+    python benchmarks/symbol_builder.py [--size MB] [--md-size MB] [--repeat N]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+from BetterMD.elements import Symbol
+from BetterMD.parse import HTMLParser, MDParser
+
+sys.path.insert(0, os.path.dirname(__file__))
+from html_parser import generate  # noqa: E402
+from zero_copy import generate_md  # noqa: E402
+
+
+def via_tree(parser, source: 'str'):
+    find_symbol = Symbol.collection.find_symbol
+    return [find_symbol(elm["name"], raise_errors=True).parse(elm) for elm in parser.parse(source)]
+
+
+def run(func, source: 'str', repeat: 'int') -> 'tuple[float, int]':
+    best = float("inf")
+    for _ in range(repeat):
+        # Don't let the previous run's trees be collected on this run's clock
+        gc.collect()
+        start = time.perf_counter()
+        func(source)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(source)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--size", type=float, default=2, help="size of the synthetic HTML document in MB")
+    arg_parser.add_argument("--md-size", type=float, default=0.05, help="size of the synthetic Markdown document in MB")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    html = generate(int(args.size * 1_000_000))
+    md = generate_md(int(args.md_size * 1_000_000))
+
+    cases = [
+        ("html via tree", lambda s: via_tree(HTMLParser(), s), html),
+        ("html direct", Symbol.from_html, html),
+        ("md via tree", lambda s: via_tree(MDParser(), s), md),
+        ("md direct", Symbol.from_md, md),
+    ]
+    for name, func, source in cases:
+        seconds, peak = run(func, source, args.repeat)
+        print(f"{name:>14}: {seconds:.3f}s, peak {peak / 1_000_000:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Reading `text` of a prepared document while editing it: every round adds a paragraph
+somewhere and reads the text of the root and of random sections. The text is kept by every
+symbol it was gathered from and only dropped up the ancestors of a change, so a read after
+an edit only walks the sections that changed.
+
+Also times making `Text` symbols, which only hold their string until something asks for
+the rest of what a `Symbol` has.
+
+Usage:
+    python benchmarks/text_cache.py [--nodes 25000,50000,100000] [--rounds N] [--reads N]
+"""
+
+import argparse
+import random
+import time
+
+from BetterMD import HTML
+from BetterMD.elements import Text
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--nodes", default="25000,50000,100000")
+    arg_parser.add_argument("--rounds", type=int, default=200)
+    arg_parser.add_argument("--reads", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    start = time.perf_counter()
+    for _ in range(100000):
+        Text("x")
+    print(f"Text(): {(time.perf_counter() - start) * 10:.2f} us")
+
+    rng = random.Random(0)
+    for nodes in map(int, args.nodes.split(",")):
+        # Five symbols per section: section, h2, its text, p and its text
+        root = HTML.from_string("<div>" + "".join(
+            f"<section><h2>Title {n}</h2><p>Body</p></section>" for n in range(nodes // 5)
+        ) + "</div>")[0]
+        root.ensure_prepared()
+        root.text
+
+        start = time.perf_counter()
+        for n in range(args.rounds):
+            rng.choice(root.children).add_child(Text(f"edit {n}"))
+            root.text
+            for _ in range(args.reads):
+                rng.choice(root.children).text
+        elapsed = (time.perf_counter() - start) / args.rounds
+        print(f"{nodes:>7} nodes: {elapsed * 1000:7.2f} ms per edit and {args.reads + 1} reads")
+
+
+if __name__ == "__main__":
+    main()
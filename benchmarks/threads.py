@@ -0,0 +1,74 @@
+"""
+Thread scaling benchmark: documents parsed and rendered per second against thread count.
+
+Usage:
+    python benchmarks/threads.py [--docs N] [--doc-size KB] [--threads 1,2,4,8] [--format html|md]
+
+Every thread parses whole documents with its own parser and renders them back to HTML.
+On a regular build the GIL keeps the numbers flat, run it with a free-threaded build
+(`python3.13t`, `PYTHON_GIL=0`) to see them scale with the number of cores.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from BetterMD import HTML, MD
+
+SNIPPETS = {
+    "html": '<div class="card"><h2 id="t{n}">Title {n}</h2><p>Some <b>bold</b> text <a href="/page/{n}">link</a></p>'
+            '<ul><li>one</li><li><span class="tag">two</span></li></ul><pre>  raw {n}\n</pre></div>\n',
+    "md": "# Title {n}\n\nSome **bold** and *italic* text {n}\n\n- one\n- two\n\n> quoted\n\n",
+}
+
+
+def generate(fmt: 'str', size: 'int') -> 'str':
+    parts = []
+    total = n = 0
+    while total < size:
+        part = SNIPPETS[fmt].format(n=n)
+        parts.append(part)
+        total += len(part)
+        n += 1
+    return "".join(parts)
+
+
+def work(args: 'tuple[str, str]'):
+    fmt, doc = args
+    ret = HTML.from_string(doc) if fmt == "html" else MD.from_string(doc)
+    if not isinstance(ret, list):
+        ret = [ret]
+    return sum(len(elm.to_html()) for elm in ret)
+
+
+def bench(fmt: 'str', docs: 'list[str]', threads: 'int') -> 'float':
+    with ThreadPoolExecutor(threads) as pool:
+        start = time.perf_counter()
+        list(pool.map(work, [(fmt, doc) for doc in docs]))
+        return time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--docs", type=int, default=64)
+    arg_parser.add_argument("--doc-size", type=float, default=20, help="size of each document in KB")
+    arg_parser.add_argument("--threads", default="1,2,4,8")
+    arg_parser.add_argument("--format", choices=["html", "md"], default="html")
+    args = arg_parser.parse_args()
+
+    docs = [generate(args.format, int(args.doc_size * 1000))] * args.docs
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}, {os.cpu_count()} CPUs")
+
+    base = None
+    for threads in map(int, args.threads.split(",")):
+        seconds = bench(args.format, docs, threads)
+        base = base or seconds
+        print(f"{threads:>3} threads: {args.docs / seconds:8.1f} docs/s ({base / seconds:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Allocation benchmark for zero copy text nodes.
+
+Parses a text heavy document with and without `zero_copy`, finds the links in
+it and throws the tree away, reporting the peak traced allocation of each run.
+
+Usage:
+    python benchmarks/zero_copy.py [--size MB] [--md-size MB]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from BetterMD.parse import HTMLParser, MDParser
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit"]
+
+
+def generate_html(size: 'int', seed: 'int' = 0) -> 'str':
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    n = 0
+    while total < size:
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(50, 200)))
+        part = f'<p>{words} <a href="/page/{n}">link {n}</a> {words}</p>\n<pre>{words}</pre>\n'
+        parts.append(part)
+        total += len(part)
+        n += 1
+    return "<body>" + "".join(parts) + "</body>"
+
+
+def generate_md(size: 'int', seed: 'int' = 0) -> 'str':
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    n = 0
+    while total < size:
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(50, 200)))
+        part = f"{words} [link {n}](/page/{n}) {words}\n\n"
+        parts.append(part)
+        total += len(part)
+        n += 1
+    return "".join(parts)
+
+
+def links(nodes) -> 'int':
+    found = 0
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        if node["type"] == "element":
+            found += node["name"] == "a"
+            stack.extend(node["children"])
+    return found
+
+
+def run(parser, source: 'str'):
+    tracemalloc.start()
+    start = time.perf_counter()
+    found = links(parser.parse(source))
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return found, peak, seconds
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--size", type=float, default=5, help="size of the synthetic HTML document in MB")
+    arg_parser.add_argument("--md-size", type=float, default=0.1, help="size of the synthetic Markdown document in MB")
+    args = arg_parser.parse_args()
+
+    html = generate_html(int(args.size * 1_000_000))
+    md = generate_md(int(args.md_size * 1_000_000))
+
+    for name, parser_cls, source in [("html", HTMLParser, html), ("md", MDParser, md)]:
+        for zero_copy in (False, True):
+            found, peak, seconds = run(parser_cls(zero_copy=zero_copy), source)
+            mode = "zero copy" if zero_copy else "eager"
+            print(f"{name} {mode:>9}: {found} links, peak {peak / 1_000_000:.1f} MB above the source, {seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import pytest
+
+from BetterMD import HTML
+from BetterMD.parse import HTMLParser, StdlibHTMLParser, html_backends
+
+from .test_html_parser import strip_parents
+
+
+CORPUS = [
+    '<div class="a b"><p>Hello <b>x</b></p><br><!-- c --><script>if (a<b) x</script></div>',
+    '<!DOCTYPE html><html><head><title>T</title><style>p > a { color: red }</style></head><body>\n'
+    '  <h1 id="top">Title</h1>\n<p>Some   text\n with <a href="https://x.y/?a=1&amp;b=2" title=\'q "x"\'>link</a>'
+    ' and <img src="i.png" alt="pic" /> done.</p></body></html>',
+    '<ul>\n <li>one</li>\n <li>two <span>  spaced   out  </span></li>\n</ul>',
+    '<pre>  keep\n   spacing <b>not</b> parsed\n</pre><textarea name=t rows=3>raw <text></textarea>',
+    '<input type="checkbox" checked disabled><input value=`tick` data-x = "y" >',
+    '<DIV CLASS="Up"><P>Caps</P></DIV>',
+    '<table><thead><tr><th>H</th></tr></thead><tbody><tr><td>1</td><td>2</td></tr></tbody></table>',
+    'plain text only   with   spaces',
+    '<p>a</p>   \n  <p>b</p>',
+    '<div><!--\n multi\n line --> after</div>',
+    '<p>fish &amp; chips &copy 2024 &#169; &#xA9; a & b, q=1&r=2</p>',
+    '<script type="text/javascript">\nvar s = "</div>";\n</SCRIPT><p>after</p>',
+    '<a href=unquoted>u</a><br /><hr/><div/>',
+    '<p title="a>b">gt in attr</p><script></script>',
+    '<p>unclosed <b>tags',
+    '<!x>a<!x\ny>b<!--x\ny-->c<!---->d&amp\n&lt;&#60&#x3C;',
+    'a&b',
+    'a&ba&b',
+    '<p>x &amp;&#1&amp</p>&#x3C',
+    '<script>x&b',
+]
+
+
+@pytest.mark.parametrize("html", CORPUS)
+def test_backends_agree(html):
+    expected = strip_parents(HTMLParser().parse(html))
+    assert strip_parents(StdlibHTMLParser().parse(html)) == expected
+    assert strip_parents(StdlibHTMLParser(zero_copy=True, compact=True).parse(html)) == expected
+    assert list(StdlibHTMLParser().iterparse(html, chunk_size=7)) == list(HTMLParser().iterparse(html))
+
+    parser = StdlibHTMLParser()
+    for char in html:
+        parser.feed(char)
+    assert strip_parents(parser.close()) == expected
+
+
+def test_backend_registry():
+    html = "<p>x &amp; y</p>"
+    assert html_backends.get_backend() is HTMLParser
+    assert html_backends.get_backend("stdlib") is StdlibHTMLParser
+    assert HTML.from_string(html, backend="stdlib").to_html() == HTML.from_string(html).to_html()
+
+    with pytest.raises(ValueError):
+        HTML.from_string(html, backend="missing")
+
+    class Upper(HTMLParser):
+        def parse(self, html):
+            return super().parse(html.upper())
+
+    html_backends.add_backend("upper", Upper)
+    html_backends.set_default("upper")
+    try:
+        assert HTML.from_string(html).to_html() == "<p>X &AMP; Y</p>"
+        with pytest.raises(ValueError):
+            html_backends.remove_backend("upper")
+    finally:
+        html_backends.set_default("builtin")
+        html_backends.remove_backend("upper")
+
+    assert HTML.from_string(html).to_html() == "<p>x &amp; y</p>"
@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from BetterMD import HTML, MD
+from BetterMD.batch import TreeBuilder
+from BetterMD.elements import Symbol
+from BetterMD.parse import HTMLParser, MDParser
+
+
+MD_DOCS = [f"# Title {i}\n\nSome **bold** text {i}\n\n- one\n- two\n\n> quoted {i}\n" for i in range(40)]
+
+HTML_DOCS = [f'<div id="d{i}"><p>Para {i} <b>bold</b></p><ul>{"<li>x</li>" * (i % 3 + 1)}</ul></div>' for i in range(40)]
+
+
+def render(elements, format="html"):
+    return "\n".join(getattr(elm, f"to_{format}")() for elm in elements)
+
+
+def test_parse_many():
+    trees = list(MD.parse_many(MD_DOCS, processes=2, chunksize=3))
+    assert trees == [MDParser(builder=TreeBuilder()).parse(doc) for doc in MD_DOCS]
+    assert [render(Symbol.from_tree(tree) for tree in doc) for doc in trees] == [render(MD.from_string(doc)) for doc in MD_DOCS]
+
+    assert list(HTML.parse_many(HTML_DOCS, processes=2)) == [HTMLParser(builder=TreeBuilder()).parse(doc) for doc in HTML_DOCS]
+
+
+def test_render_many():
+    assert list(MD.render_many(MD_DOCS, processes=2, chunksize=3)) == [render(MD.from_string(doc)) for doc in MD_DOCS]
+    assert list(MD.render_many(MD_DOCS[:5], "md", processes=1)) == [render(MD.from_string(doc), "md") for doc in MD_DOCS[:5]]
+    assert list(HTML.render_many(iter(HTML_DOCS), processes=2)) == [render(HTML.from_string(doc)) for doc in HTML_DOCS]
+
+
+def test_unordered_and_paths(tmp_path):
+    paths = []
+    for i, doc in enumerate(MD_DOCS):
+        paths.append(tmp_path / f"{i}.md")
+        paths[-1].write_bytes(doc.encode("utf-16"))
+
+    results = dict(MD.render_many(paths, processes=2, chunksize=7, ordered=False))
+    assert [results[i] for i in range(len(MD_DOCS))] == list(MD.render_many(MD_DOCS, processes=1))
+
+
+def test_executor_is_reused():
+    with ThreadPoolExecutor(2) as pool:
+        first = list(MD.render_many(MD_DOCS, chunksize=5, executor=pool))
+        assert list(MD.render_many(MD_DOCS, chunksize=5, executor=pool)) == first
+
+
+def test_title_lines():
+    # The parsers return a `None` block for a `title:` line
+    docs = ["title: T\n\n# H\n\ntext", "title: U\n"]
+    trees = list(MD.parse_many(docs, processes=1))
+    assert trees == [MDParser(builder=TreeBuilder()).parse(doc) for doc in docs]
+    assert trees[0][0] is None and Symbol.from_tree(None) is None
+    assert [render(Symbol.from_tree(tree) for tree in doc if tree is not None) for doc in trees] == [render(elm for elm in MD.from_string(doc) if elm is not None) for doc in docs]
+
+    assert list(MD.render_many(docs, processes=1)) == [render(elm for elm in MD.from_string(doc) if elm is not None) for doc in docs]
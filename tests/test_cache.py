@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+from BetterMD import HTML, MD, ParseCache
+from BetterMD.elements import Symbol
+
+
+DOC = "# Title\n\nSome **bold** text\n\n```py\ncode\n```\n"
+
+
+def render(elements):
+    return "\n".join(elm.to_html() for elm in elements)
+
+
+@pytest.fixture
+def cache(request):
+    cache = ParseCache(**getattr(request, "param", {}))
+    Symbol.parse_cache = cache
+    yield cache
+    Symbol.parse_cache = None
+
+
+def test_hits_match_parsing():
+    expected = render(MD.from_string(DOC)), render(HTML.from_string("<p class='a b'>x <b>y</b></p>"))
+
+    Symbol.parse_cache = cache = ParseCache()
+    try:
+        for _ in range(3):
+            assert (render(MD.from_string(DOC)), render(HTML.from_string("<p class='a b'>x <b>y</b></p>"))) == expected
+    finally:
+        Symbol.parse_cache = None
+
+    assert (cache.hits, cache.misses) == (4, 2)
+
+
+def test_reads_are_independent(cache):
+    first = MD.from_string(DOC)
+    first[-1].props["class"].append("changed")
+    first[0].children.clear()
+
+    second = MD.from_string(DOC)
+    assert cache.hits == 1
+    assert "changed" not in second[-1].props["class"]
+    assert render(second) == render(Symbol.from_md(DOC, backend="builtin"))
+
+
+def test_keys(cache):
+    assert cache.key("md", Symbol.md_backends.get_backend(), "x") != cache.key("html", Symbol.md_backends.get_backend(), "x")
+    assert cache.key("md", Symbol.md_backends.get_backend(), "x") != cache.key("md", Symbol.md_backends.get_backend(), b"x")
+    assert cache.key("md", Symbol.md_backends.get_backend(), iter(["x"])) is None
+
+    # Files and iterables are parsed without the cache
+    MD.from_file(iter([b"# a\n"]))
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_title_line(cache):
+    # The parser returns a `None` block for the `title:` line, and so must the cache
+    doc = "title: T\n\n# H\n"
+    Symbol.parse_cache = None
+    expected = [elm and elm.to_html() for elm in MD.from_string(doc)]
+    Symbol.parse_cache = cache
+
+    for _ in range(2):
+        assert [elm and elm.to_html() for elm in MD.from_string(doc)] == expected
+    assert expected[0] is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.parametrize("cache", [{"maxsize": 2}], indirect=True)
+def test_memory_lru(cache):
+    for doc in ["a", "b", "a", "c", "a", "b"]:
+        MD.from_string(doc)
+    # `b` was evicted by `c`
+    assert (cache.hits, cache.misses) == (2, 4)
+    assert list(cache.memory) == [cache.key("md", Symbol.md_backends.get_backend(), doc) for doc in ["a", "b"]]
+
+
+def test_directory(tmp_path):
+    docs = [f"# Doc {i}\n\n" + "text " * 200 for i in range(10)]
+    first = ParseCache(maxsize=1, directory=tmp_path)
+    Symbol.parse_cache = first
+    try:
+        expected = [render(MD.from_string(doc)) for doc in docs]
+        size = first.size
+
+        # A new cache, e.g. in the next build, reads the entries from the directory
+        Symbol.parse_cache = second = ParseCache(maxsize=1, directory=tmp_path)
+        assert second.size == size
+        assert [render(MD.from_string(doc)) for doc in docs] == expected
+        assert second.hits == 10
+
+        # The least recently used files are removed when they take too much space
+        Symbol.parse_cache = third = ParseCache(maxsize=1, directory=tmp_path, max_bytes=size // 2)
+        assert third.size <= size // 2
+        assert [render(MD.from_string(doc)) for doc in docs] == expected
+        assert 0 < third.hits < 10 and third.hits + third.misses == 10
+    finally:
+        Symbol.parse_cache = None
+
+    assert third.size <= size // 2
+    assert sorted(os.listdir(tmp_path)) == sorted(key + ParseCache.SUFFIX for key in third.files)
+
+    third.clear()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,96 @@
+import io
+import mmap
+
+import pytest
+
+from BetterMD import HTML, MD
+from BetterMD.parse import HTMLParser, MDParser, decode_chunks, detect_encoding
+from BetterMD.parse.decoding import iter_lines
+
+
+HTML_DOC = '<html><head><meta charset="{charset}"></head><body><p>Café <b>naïve</b> – ünïcödé</p>' + "<p>x é</p>" * 5000 + "</body></html>"
+
+MD_DOC = "# Café\r\n\r\nnaïve **ünïcödé** text\r\n\r\n- one\n- two\r> quoted é\n" * 2000
+
+
+def parse_html(html, encoding=None):
+    # Compact nodes compare without their `parent`
+    return HTMLParser(compact=True).parse(html, encoding)
+
+
+def render(elements):
+    return [elm.to_html() for elm in elements]
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-16", "utf-32", "utf-8-sig"])
+def test_bom_is_detected(encoding):
+    html = HTML_DOC.format(charset="utf-8")
+    assert parse_html(html.encode(encoding)) == parse_html(html)
+    assert MDParser().parse(MD_DOC.encode(encoding)) == MDParser().parse(MD_DOC)
+
+
+def test_meta_charset_is_detected():
+    html = HTML_DOC.format(charset="windows-1252")
+    assert detect_encoding(html.encode("cp1252"), html=True) == "cp1252"
+    assert detect_encoding(b'<meta http-equiv="Content-Type" content="text/html; charset=ISO-8859-1">', html=True) == "iso8859-1"
+    assert detect_encoding(b'<meta charset="not-a-charset">', html=True) == "utf-8"
+    assert parse_html(html.encode("cp1252")) == parse_html(html)
+
+
+def test_declared_encoding_wins():
+    html = HTML_DOC.format(charset="utf-8")
+    data = html.encode("latin-1", "replace")
+    assert parse_html(data, "latin-1") == parse_html(data.decode("latin-1"))
+    assert MDParser().parse(MD_DOC.encode("cp1252"), "cp1252") == MDParser().parse(MD_DOC)
+
+
+def test_encoding_is_detected_across_chunks():
+    # `<meta charset>` on the second line of an iterable of lines
+    lines = [b'<!DOCTYPE html>\n', b'<meta charset="iso-8859-1">\n', "<p>café</p>".encode("latin-1")]
+    assert render(HTML.from_string(iter(lines))) == render(HTML.from_string(b"".join(lines)))
+
+    # A BOM split across chunks
+    data = MD_DOC[:3000].encode("utf-16")
+    assert "".join(decode_chunks(iter(data[i:i+1] for i in range(len(data))))) == MD_DOC[:3000]
+    assert MDParser().parse(iter([data[:1], data[1:3], data[3:]])) == MDParser().parse(MD_DOC[:3000])
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1024])
+def test_chunks_split_characters_and_lines(chunk_size):
+    text = MD_DOC[:3000]
+    for source in [text.encode(), memoryview(text.encode()), bytearray(text.encode("utf-16")), io.BytesIO(text.encode()), io.StringIO(text)]:
+        chunks = list(decode_chunks(source, chunk_size=chunk_size))
+        assert "".join(chunks) == text
+        assert list(iter_lines(chunks)) == text.splitlines()
+
+
+def test_symbols_from_buffers(tmp_path):
+    html = HTML_DOC.format(charset="utf-8")
+    path = tmp_path / "doc.html"
+    path.write_bytes(html.encode())
+    expected = render(HTML.from_string(html))
+
+    assert render(HTML.from_string(html.encode())) == expected
+    assert render(HTML.from_string(memoryview(html.encode()))) == expected
+    with open(path, "rb") as f:
+        assert render(HTML.from_file(f)) == expected
+    with open(path, "r", encoding="utf-8") as f:
+        assert render(HTML.from_file(f)) == expected
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        assert render(HTML.from_file(mapped)) == expected
+
+
+def test_md_from_file(tmp_path):
+    path = tmp_path / "doc.md"
+    path.write_bytes(MD_DOC.encode("utf-16"))
+    expected = render(MD.from_string(MD_DOC))
+
+    with open(path, "rb") as f:
+        assert render(MD.from_file(f)) == expected
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        assert render(MD.from_file(mapped)) == expected
+
+    html = MDParser().from_file(path)
+    assert html["children"][1]["children"] == MDParser().parse(MD_DOC)
+
+    (tmp_path / "empty.md").write_bytes(b"")
+    assert MDParser().from_file(tmp_path / "empty.md")["children"][1]["children"] == []
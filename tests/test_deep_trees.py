@@ -0,0 +1,44 @@
+import subprocess
+import sys
+
+from BetterMD import HTML
+from BetterMD.elements import Symbol
+from BetterMD.parse import HTMLParser
+
+
+# Deeper than the default recursion limit (1000)
+DEPTH = 1500
+
+
+def test_recursion_limit_is_left_alone():
+    code = "import sys; limit = sys.getrecursionlimit(); import BetterMD; assert sys.getrecursionlimit() == limit"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_deep_html_round_trip():
+    html = "<div>" * DEPTH + "x" + "</div>" * DEPTH
+    doc = HTML.from_string(html)[0]
+
+    assert doc.to_html() == html
+    assert doc.text == "x"
+    assert doc.to_md().strip() == "x"
+    assert doc.to_rst().count("\n") == DEPTH
+
+
+def test_deep_symbol_parse():
+    html = "<ul><li>" * DEPTH + "x" + "</li></ul>" * DEPTH
+    tree = HTMLParser().parse(html)[0]
+    symbol = Symbol.collection.find_symbol("ul").parse(tree)
+
+    depth = 0
+    while symbol.children:
+        symbol = symbol.children[0]
+        depth += 1
+    assert depth == 2 * DEPTH
+    assert symbol.text == "x"
+
+
+def test_nested_custom_renderers():
+    html = "<p>" + "<b>" * DEPTH + "x" + "</b>" * DEPTH + "</p>"
+    doc = HTML.from_string(html)[0]
+    assert doc.to_md() == "**" * DEPTH + "x" + "**" * DEPTH
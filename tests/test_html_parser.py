@@ -0,0 +1,218 @@
+import sys
+
+from BetterMD.parse import HTMLParser
+
+
+def strip_parents(nodes):
+    ret = []
+    for node in nodes:
+        node = {k: v for k, v in node.items() if k != "parent"}
+        if "children" in node:
+            node["children"] = strip_parents(node["children"])
+        ret.append(node)
+    return ret
+
+
+def parse(html):
+    return strip_parents(HTMLParser().parse(html))
+
+
+def text(content):
+    return {"type": "text", "content": content, "name": "text"}
+
+
+def element(name, attributes=None, children=None):
+    return {"type": "element", "name": name, "attributes": attributes or {}, "children": children or []}
+
+
+def test_nested_elements_and_whitespace():
+    assert parse('<ul>\n <li>one</li>\n <li>two <span>  spaced   out  </span></li>\n</ul>') == [
+        element("ul", children=[
+            element("li", children=[text("one")]),
+            element("li", children=[text("two"), element("span", children=[text(" spaced out ")])]),
+        ])
+    ]
+
+
+def test_attributes():
+    assert parse('<input type="checkbox" checked disabled><input value=`tick` data-x = "y" >') == [
+        element("input", {"type": "checkbox", "checked": True, "disabled": True}),
+        element("input", {"value": "tick", "data-x": "y"}),
+    ]
+    assert parse('<p title="a>b" alt=\'q "x"\' href=unquoted>t</p>') == [
+        element("p", {"title": "a>b", "alt": 'q "x"', "href": "unquoted"}, [text("t")])
+    ]
+
+
+def test_self_closing_and_void():
+    assert parse('<br><br /><hr/><img src="i.png"/>') == [
+        element("br"), element("br"), element("hr"), element("img", {"src": "i.png"}),
+    ]
+
+
+def test_comments():
+    assert parse('<div><!--\n multi\n line --> after</div>') == [
+        element("div", children=[element("comment", children=[text("\n multi\n line ")]), text("after")])
+    ]
+
+
+def test_raw_text_tags():
+    assert parse('<script type="text/javascript">\nvar s = "</div>";\n</SCRIPT><p>after</p>') == [
+        element("script", {"type": "text/javascript"}, [text('\nvar s = "</div>";\n')]),
+        element("p", children=[text("after")]),
+    ]
+    assert parse('<pre>  keep\n   <b>not</b> parsed\n</pre><textarea rows=3>raw <text></textarea>') == [
+        element("pre", children=[text("  keep\n   <b>not</b> parsed\n")]),
+        element("textarea", {"rows": "3"}, [text("raw <text>")]),
+    ]
+
+
+def test_tag_names_are_interned():
+    dom = HTMLParser().parse("<section></section>")
+    assert dom[0]["name"] is sys.intern("section")
+
+
+def test_feed_matches_parse_at_every_split():
+    html = '<div class="a b"><p title="x>y">Hello <b>x</b></p><br/><!-- c --><script>if (a<b) x</script></div>'
+    expected = parse(html)
+
+    for i in range(len(html) + 1):
+        parser = HTMLParser()
+        parser.feed(html[:i])
+        parser.feed(html[i:])
+        assert strip_parents(parser.close()) == expected
+
+    parser = HTMLParser()
+    for char in html:
+        parser.feed(char)
+    assert strip_parents(parser.close()) == expected
+
+
+def test_feed_unterminated_constructs():
+    parser = HTMLParser()
+    parser.feed("<p>a <!-- never")
+    parser.feed(" closed")
+    assert strip_parents(parser.close()) == [element("p", children=[text("a"), element("comment", children=[text(" never closed")])])]
+
+
+def test_feed_joins_split_constructs_once():
+    body = "if (a < b) x;\n" * 100
+    parser = HTMLParser()
+    parser.feed("<div><script>")
+    for i in range(0, len(body), 7):
+        parser.feed(body[i:i+7])
+        # Chunks that can't close the script are only kept
+        assert len(parser.rawdata) < 7
+    parser.feed("</scr")
+    parser.feed("IPT><p>x</p></div>")
+    expected = [element("div", children=[element("script", children=[text(body)]), element("p", children=[text("x")])])]
+    assert strip_parents(parser.close()) == expected
+
+    # Text, tags and comments waiting for their end
+    html = '<p>' + "words " * 50 + '<a title="' + "x>" * 20 + '">y</a><!-- ' + "c " * 50 + '--></p>'
+    parser = HTMLParser()
+    for char in html:
+        parser.feed(char)
+    assert strip_parents(parser.close()) == parse(html)
+
+
+def test_parse_builds_while_tokenizing():
+    sizes = []
+
+    class Recording(HTMLParser):
+        def build(self, events):
+            events = list(events)
+            sizes.append(len(events))
+            super().build(events)
+
+    html = "<div>" + "<p>x <b>y</b></p>" * 2000 + "</div>"
+    expected = [element("div", children=[element("p", children=[text("x"), element("b", children=[text("y")])])] * 2000)]
+    assert strip_parents(Recording().parse(html)) == expected
+    # One chunk, but never all of its events at once
+    assert len(sizes) > 1 and max(sizes) <= HTMLParser.EVENTS_PER_BUILD
+
+
+def test_doctype_is_skipped():
+    assert parse("<!DOCTYPE html><p>x</p>") == [element("p", children=[text("x")])]
+
+
+def test_from_file_reads_in_chunks():
+    import io
+    from BetterMD import HTML
+
+    html = "<div>" + "<p>para</p>" * 10000 + "</div>"
+    ret = HTML.from_file(io.StringIO(html))
+    assert len(ret) == 1
+    assert len(ret[0].children) == 10000
+
+
+def test_iterparse_events():
+    events = list(HTMLParser().iterparse('<div class="a"><p>Hi <b>x</b></p><br><!-- c --><script>a<b</script></div>'))
+    assert events == [
+        ("start", "div", {"class": "a"}),
+        ("start", "p", {}),
+        ("text", "text", "Hi"),
+        ("start", "b", {}),
+        ("text", "text", "x"),
+        ("end", "b", None),
+        ("end", "p", None),
+        ("start", "br", {}),
+        ("end", "br", None),
+        ("comment", "comment", " c "),
+        ("start", "script", {}),
+        ("text", "text", "a<b"),
+        ("end", "script", None),
+        ("end", "div", None),
+    ]
+
+
+def test_iterparse_is_lazy_and_balanced():
+    html = "<ul>" + "<li><a href='/x'>x</a></li>" * 50000
+    events = HTMLParser().iterparse(html, chunk_size=1024)
+    assert next(events) == ("start", "ul", {})
+    assert next(events) == ("start", "li", {})
+    events.close()
+
+    starts = ends = 0
+    for event, name, data in HTMLParser().iterparse(iter([html[:7], html[7:]])):
+        starts += event == "start"
+        ends += event == "end"
+    assert starts == ends == 100001
+
+
+def test_zero_copy_matches_eager():
+    html = '<div class="a b"><p>Hello   <b>x</b>\n</p>  <br><!-- c --><span> a  b </span><script>if (a<b) x</script></div>'
+    assert strip_parents(HTMLParser(zero_copy=True).parse(html)) == parse(html)
+
+
+def test_zero_copy_text_is_lazy():
+    from BetterMD.parse import LazyText
+
+    html = "<p>some   text</p><pre> raw </pre>"
+    dom = HTMLParser(zero_copy=True).parse(html)
+    node = dom[0]["children"][0]
+    assert isinstance(node, LazyText)
+    assert not node.materialized
+    assert node.source is html
+
+    assert node["content"] == "some text"
+    assert node.materialized
+    assert dom[1]["children"][0]["content"] == " raw "
+
+
+def test_compact_nodes():
+    from BetterMD import HTML
+    from BetterMD.elements import Symbol
+    from BetterMD.parse import ElementNode, TextNode
+
+    html = '<div class="a b"><p>Hello   <b>x</b>\n</p><br><!-- c --><pre>\n raw </pre></div>'
+    dom = HTMLParser(compact=True).parse(html)
+    assert strip_parents(dom) == parse(html)
+    assert strip_parents(HTMLParser(compact=True, zero_copy=True).parse(html)) == parse(html)
+
+    div = dom[0]
+    assert isinstance(div, ElementNode) and isinstance(div["children"][0]["children"][0], TextNode)
+    assert div["children"][0]["parent"] is div
+    assert not hasattr(div, "__dict__")
+
+    assert [Symbol.collection.find_symbol(elm["name"]).parse(elm).to_html() for elm in dom] == [HTML.from_string(html).to_html()]
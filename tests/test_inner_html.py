@@ -0,0 +1,184 @@
+import pytest
+
+from BetterMD import HTML
+from BetterMD.elements import Text
+
+
+DOC = (
+    '<div id="root" class="page">'
+    '<p id="a" class="x y" data-k="1">one <b class="x">two</b></p>'
+    '<div id="b" style="color:red"><p class="y" data-k="1">one two</p><span>three</span></div>'
+    '</div>'
+)
+
+
+def ids(symbols):
+    return [symbol.get_prop("id") or type(symbol).__name__ for symbol in symbols]
+
+
+def test_queries_are_scoped_to_the_subtree():
+    root = HTML.from_string(DOC)[0]
+    a, b = root.children
+
+    assert ids(root.inner_html.get_elements_by_class_name("x")) == ["a", "B"]
+    assert ids(a.inner_html.get_elements_by_class_name("x")) == ["B"]
+    assert ids(b.inner_html.get_elements_by_class_name("x")) == []
+    assert ids(root.inner_html.find(".y")) == ["a", "P"]
+    assert ids(root.inner_html.find("#b")) == ["b"]
+    assert ids(b.inner_html.find("#b")) == []
+    assert ids(root.inner_html.get_elements_by_tag_name("p")) == ["a", "P"]
+    assert ids(b.inner_html.get_elements_by_tag_name("span")) == ["Span"]
+
+    assert ids(root.inner_html.get_by_attr("data-k", "1")) == ["a", "P"]
+    assert ids(root.inner_html.get_by_attr("class", ["x", "y"])) == ["a"]
+    assert ids(root.inner_html.get_by_attr("style", {"color": "red"})) == ["b"]
+
+    # Text around elements is stripped by the parser
+    assert ids(root.inner_html.get_by_text("onetwo")) == ["a"]
+    assert ids(root.inner_html.get_by_text("one two")) == ["P", "Text"]
+    assert ids(b.inner_html.get_by_text("one two")) == ["P", "Text"]
+    assert ids(root.inner_html.get_by_text("two")) == ["B", "Text"]
+    assert ids(root.inner_html.advanced_find("p", {"text": "one two", "class": "y"})) == ["P"]
+
+    assert ids(root.inner_html.children_ids["a"]) == ["a"]
+    assert list(a.inner_html.children_text) == ["one", "two"]
+
+
+def test_index_is_rebuilt_after_changes():
+    root = HTML.from_string(DOC)[0]
+    assert len(root.inner_html.get_elements_by_tag_name("span")) == 1
+
+    root.add_child(HTML.from_string("<span class='x'>four</span>")[0])
+    assert len(root.inner_html.get_elements_by_tag_name("span")) == 2
+    assert ids(root.inner_html.get_by_text("four")) == ["Span", "Text"]
+
+
+def test_changes_update_the_index_in_place():
+    root = HTML.from_string(DOC)[0]
+    a, b = root.children
+    root.ensure_prepared()
+    index = root.document.index
+
+    # Ancestors see a symbol added deep down without being prepared again
+    b.children[1].add_child(HTML.from_string("<i class='x'>five</i>")[0])
+    assert root.prepared and root.document.index is index
+    assert ids(root.inner_html.get_elements_by_class_name("x")) == ["a", "B", "I"]
+    assert ids(b.inner_html.get_elements_by_class_name("x")) == ["I"]
+    assert ids(root.inner_html.get_by_text("threefive")) == ["Span"]
+
+    # Moved symbols are only found where they are now
+    bold = a.children[1]
+    bold.change_parent(b)
+    assert ids(a.inner_html.get_elements_by_class_name("x")) == []
+    assert ids(b.inner_html.get_elements_by_class_name("x")) == ["I", "B"]
+    assert ids(root.inner_html.get_elements_by_class_name("x")) == ["a", "I", "B"]
+
+    b.remove_child(bold)
+    assert ids(root.inner_html.get_elements_by_tag_name("b")) == []
+    assert root.text == "oneone twothreefive"
+
+
+def test_text_index_is_patched(monkeypatch):
+    root = HTML.from_string(DOC)[0]
+    a, b = root.children
+    assert ids(root.inner_html.get_by_text("one two")) == ["P", "Text"]
+
+    # Only the changed subtree and its ancestors are read again
+    index = root.document.index
+    monkeypatch.setattr(index, "build_text_index", None)
+    b.children[0].add_child(HTML.from_string("<i>!</i>")[0])
+    assert ids(root.inner_html.get_by_text("one two")) == ["Text"]
+    assert ids(root.inner_html.get_by_text("one two!")) == ["P"]
+    assert ids(root.inner_html.get_by_text("one two!three")) == ["b"]
+
+    a.remove_child(a.children[1])
+    assert ids(root.inner_html.get_by_text("one")) == ["a", "Text"]
+    assert root.inner_html.get_by_text("oneone two!three") == []
+
+    # Inside a symbol with its own text, the text is read by the query
+    text = a.children[0]
+    text.add_child(HTML.from_string("<i>one</i>")[0])
+    assert ids(root.inner_html.get_by_text("one")) == ["a", "Text", "I", "Text"]
+
+
+def test_removed_subtrees_can_be_queried():
+    root = HTML.from_string(DOC)[0]
+    root.ensure_prepared()
+    b = root.children[1]
+    root.remove_child(b)
+
+    span = b.children[1]
+    assert not span.prepared
+    assert ids(b.inner_html.get_elements_by_tag_name("span")) == ["Span"]
+    assert ids(b.children[0].inner_html.get_by_text("one two")) == ["Text"]
+    assert ids(root.inner_html.get_elements_by_tag_name("span")) == []
+
+
+def test_batch_applies_changes_when_done():
+    root = HTML.from_string(DOC)[0]
+    a, b = root.children
+    root.ensure_prepared()
+
+    with root.batch():
+        for n in range(3):
+            a.add_child(HTML.from_string(f"<i class='z'>{n}</i>")[0])
+        a.remove_child(a.children[-1])
+        assert root.inner_html.get_elements_by_class_name("z") == []
+
+    assert [i.text for i in root.inner_html.get_elements_by_class_name("z")] == ["0", "1"]
+    assert ids(root.inner_html.get_by_text("1")) == ["I", "Text"]
+
+
+def test_changes_in_tables_prepare_again():
+    root = HTML.from_string("<div><table><tbody><tr><td>a</td></tr></tbody></table></div>")[0]
+    row = root.inner_html.get_elements_by_tag_name("tr")[0]
+
+    # The table reads its rows when it's prepared, adding one can't be done in place
+    row.add_child(HTML.from_string("<td>b</td>")[0])
+    assert not root.prepared
+    assert [td.text for td in root.inner_html.get_elements_by_tag_name("td")] == ["a", "b"]
+
+
+def test_text_follows_changes():
+    root = HTML.from_string(DOC)[0]
+    a, b = root.children
+    assert (root.text, a.text, b.text) == ("onetwoone twothree", "onetwo", "one twothree")
+
+    b.children[1].add_child(Text("four"))
+    assert (root.text, a.text, b.text) == ("onetwoone twothreefour", "onetwo", "one twothreefour")
+
+    with root.batch():
+        a.replace_child(a.children[1], Text("2"))
+        assert root.text == "one2one twothreefour"
+    b.remove_child(b.children[0])
+    assert (root.text, a.text, b.text) == ("one2threefour", "one2", "threefour")
+
+
+def test_text_symbols():
+    text = Text("x", lang="en")
+    assert (text.text, text.props, text.children, text.parent) == ("x", {"lang": "en"}, (), None)
+    assert Text("y").props == {} and Text("y").uuid != Text("y").uuid
+
+    # A `Text` gets its own children when the first one is added
+    child = Text("z")
+    text.add_child(child)
+    text.extend_children([Text("w")])
+    assert child.parent is text and len(text.children) == 2
+    assert Text("y").children == ()
+
+    # Removing or replacing a child that isn't there fails as for any symbol
+    for change in (lambda text: text.remove_child(child), lambda text: text.replace_child(child, Text("v"))):
+        with pytest.raises(ValueError):
+            change(Text("y"))
+    text.replace_child(child, Text("v"))
+    text.remove_child(text.children[0])
+    assert child.parent is None and [str(elm) for elm in text.children] == ["w"]
+
+
+def test_wide_document():
+    # Merging every child's index into its parent's takes minutes for this many
+    n = 50000
+    root = HTML.from_string("<div>" + "<p class='x'><b>t</b>u</p>" * n + "</div>")[0]
+    assert len(root.inner_html.get_elements_by_class_name("x")) == n
+    assert len(root.inner_html.get_by_text("tu")) == n
+    assert len(root.children[-1].inner_html.get_by_text("t")) == 2
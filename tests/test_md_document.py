@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from BetterMD import MD
+from BetterMD.parse import MDDocument, MDParser
+from BetterMD.parse.markdown import document
+from BetterMD.parse.markdown.document import FenwickTree
+
+
+PIECES = [
+    "# Title\n", "para line\n", "more **bold** text\n", "\n", "\n\n", "- item\n", "  - nested\n",
+    "1. one\n", "> quote\n", "```py\n", "```\n", "| a | b |\n", "|-|-|\n", "| 1 | 2 |\n",
+    "---\n", "title: doc\n", "*", "`", "[x](y)", "\r", "\r\n", "word ",
+]
+
+
+def random_text(rng, pieces):
+    return "".join(rng.choice(PIECES) for _ in range(pieces))
+
+
+def assert_matches(doc):
+    parser = MDParser()
+    assert doc.blocks == parser.parse(doc.text)
+    assert doc.head == parser.head
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_edits_match_full_parse(seed):
+    rng = random.Random(seed)
+    doc = MDDocument(random_text(rng, 60))
+    assert_matches(doc)
+
+    for _ in range(40):
+        offset = rng.randint(0, len(doc.text))
+        deleted = rng.randint(0, min(20, len(doc.text) - offset))
+        doc.edit(offset, deleted, random_text(rng, rng.randint(0, 3)))
+        assert_matches(doc)
+
+
+def test_edits_across_chunks(monkeypatch):
+    # Chunks of a few segments, so edits span, split and empty them
+    monkeypatch.setattr(document, "CHUNK", 2)
+    rng = random.Random(0)
+    doc = MDDocument(random_text(rng, 200))
+
+    for _ in range(100):
+        offset = rng.randint(0, len(doc.text))
+        deleted = rng.randint(0, min(rng.choice([5, 200]), len(doc.text) - offset))
+        doc.edit(offset, deleted, random_text(rng, rng.randint(0, 20)))
+        assert_matches(doc)
+        assert all(doc.chunks) and doc.length == len(doc.text)
+        assert doc.chunk_lengths.values == [sum(len(text) for text, _, _ in chunk) for chunk in doc.chunks]
+        assert doc.chunk_blocks.prefix(len(doc.chunks)) == len(doc.blocks)
+
+
+def test_empty_document():
+    doc = MDDocument("")
+    assert doc.blocks == [] and doc.chunks == []
+    doc.edit(0, 0, "# A\n\npara\n")
+    assert_matches(doc)
+    doc.edit(0, doc.length, "")
+    assert doc.text == "" and doc.blocks == [] and doc.chunks == []
+    doc.edit(0, 0, "text")
+    assert_matches(doc)
+
+
+def test_fenwick_tree():
+    values = [3, 0, 5, 1, 0, 2]
+    tree = FenwickTree(values)
+    tree.set(2, 4)
+    values[2] = 4
+    assert [tree.prefix(i) for i in range(7)] == [0, 3, 3, 7, 8, 8, 10]
+    assert [tree.search(total) for total in (0, 2, 3, 6, 7, 9, 10)] == [(0, 0), (0, 0), (2, 3), (2, 3), (3, 7), (5, 8), (6, 10)]
+
+
+def test_edit_only_replaces_touched_blocks():
+    doc = MDDocument("# A\n\nfirst\n\nsecond\nparagraph\n\n# B\n")
+    blocks = list(doc.blocks)
+    start, stop, new = doc.edit(doc.text.index("second"), len("second"), "2nd")
+
+    # The paragraph and the line break ending it
+    assert (start, stop) == (4, 6)
+    assert new == MDParser().parse("2nd\nparagraph\n\n") == doc.blocks[4:6]
+    assert all(a is b for a, b in zip(doc.blocks[:4] + doc.blocks[6:], blocks[:4] + blocks[6:]))
+
+
+def test_edit_can_open_a_block():
+    doc = MDDocument("a\n\nb\n\n# c\n")
+    # Everything after an unclosed fence is code
+    doc.edit(0, 0, "```\n")
+    assert_matches(doc)
+    doc.edit(0, 4, "")
+    assert_matches(doc)
+
+
+def test_edit_outside_document():
+    doc = MDDocument("text")
+    with pytest.raises(ValueError):
+        doc.edit(3, 2, "")
+    assert doc.edit(2, 0, "") == (0, 0, [])
+
+
+def test_symbol_document():
+    text = "# Title\n\nsome *text*\n\n- a\n- b\n"
+    doc = MD.document(text)
+    doc.edit(text.index("some"), 4, "other")
+    assert [elm.to_html() for elm in doc.blocks] == [elm.to_html() for elm in MD.from_string(doc.text)]
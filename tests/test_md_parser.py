@@ -0,0 +1,354 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from BetterMD.parse import MDParser
+from BetterMD.parse.markdown.parser import InlineMemo
+
+
+def text(content):
+    return {"type": "text", "content": content, "name": "text"}
+
+
+def element(name, attributes=None, children=None):
+    return {"type": "element", "name": name, "attributes": attributes or {}, "children": children or []}
+
+
+def test_parser_is_reusable():
+    parser = MDParser()
+    assert parser.parse("hello") == [text("hello")]
+    assert parser.parse("# x") == [element("h1", {"id": "x"}, [text("x")])]
+
+
+def test_code_block():
+    assert MDParser().parse("```py\ncode\n# not a header\n```\nafter") == [
+        element("code", {"class": ["codeblock"], "language": "py"}, [element("pre", children=[text("code\n# not a header")])]),
+        text("after"),
+    ]
+
+
+def test_iterparse_events():
+    assert list(MDParser().iterparse("# T\n\nsee [x](http://a)\n")) == [
+        ("start", "h1", {"id": "T"}),
+        ("text", "text", "T"),
+        ("end", "h1", None),
+        ("start", "br", {}),
+        ("end", "br", None),
+        ("text", "text", "see "),
+        ("start", "a", {"class": "inline-link", "href": "http://a"}),
+        ("text", "text", "x"),
+        ("end", "a", None),
+    ]
+
+
+def test_iterparse_can_stop_early():
+    events = MDParser().iterparse("# First\n" + "para\n\n" * 10000)
+    assert next(events) == ("start", "h1", {"id": "First"})
+    events.close()
+
+
+def test_zero_copy_matches_eager():
+    text = "some **bold** text and *it* [link](http://x) `c` end"
+    assert MDParser(zero_copy=True).parse_text(text) == MDParser().parse_text(text)
+
+
+def test_zero_copy_symbols():
+    from BetterMD import MD
+
+    ret = MD.from_string("hello **world**", zero_copy=True)
+    assert [e.text for e in ret] == ["hello ", "world"]
+
+
+def test_compact_matches_dicts():
+    from BetterMD.parse.nodes import Node
+
+    md = "# T\n\nsome **bold** text\n\n- a\n- b\n\n> quote\n\n```\ncode\n```\n"
+    compact = MDParser(compact=True).parse(md)
+    assert all(isinstance(node, Node) for node in compact)
+    assert compact == MDParser().parse(md)
+
+
+def test_extension_tables_are_built_once():
+    from BetterMD.parse.markdown import Extension
+
+    class Mark(Extension):
+        @property
+        def name(self):
+            return "mark"
+
+        @property
+        def top_level_tags(self):
+            return {}
+
+        @property
+        def text_tags(self):
+            return {"mark": {"pattern": r"^==([^=]+)==", "handler": self.mark}}
+
+        def mark(self, text):
+            match = MDParser.compile_pattern(r"^==([^=]+)==").match(text)
+            return self.create_element("mark", children=[self.create_text(match.group(1))]), match.end()
+
+    parser = MDParser()
+    handlers = parser.inline_handlers
+    parser.parse("**a** and *b*\n\n> **c**")
+    assert parser.inline_handlers is handlers
+    assert parser.parse("==x==") == [text("==x==")]
+
+    MDParser.add_extension(Mark)
+    try:
+        assert parser.parse("==x==") == [element("mark", children=[text("x")])]
+        assert parser.inline_handlers is not handlers
+    finally:
+        MDParser.remove_extension(Mark)
+
+    assert parser.parse("==x==") == [text("==x==")]
+
+
+def test_inline_markup():
+    parse = MDParser().parse_text
+    assert parse("a **b** c") == [text("a "), element("strong", children=[text("b")]), text(" c")]
+    assert parse("**a *b* c**") == [element("strong", children=[text("a "), element("em", children=[text("b")]), text(" c")])]
+    assert parse("***bi*** t") == [element("strong", {"class": ["italic-bold"]}, [element("em", children=[text("bi")])]), text(" t")]
+    assert parse("**a*") == [text("*"), element("em", children=[text("a")])]
+    assert parse("***a* b**") == [element("strong", children=[element("em", children=[text("a")]), text(" b")])]
+    assert parse("*a `b*` c*") == [element("em", children=[text("a "), element("code", {"class": ["codespan"]}, [text("b*")]), text(" c")])]
+    assert parse("![alt](src) q") == [element("img", {"href": "src"}, [text("alt")]), text(" q")]
+    assert parse("[a](<u v> 't') z") == [element("a", {"class": "inline-link", "href": "u v", "title": "t"}, [text("a")]), text(" z")]
+
+
+def inline_html(nodes):
+    html = []
+    for node in nodes:
+        if node["type"] == "text":
+            html.append(node["content"])
+        else:
+            attributes = "".join(f' {k}="{" ".join(v) if isinstance(v, list) else v}"' for k, v in node["attributes"].items())
+            html.append(f"<{node['name']}{attributes}>{inline_html(node['children'])}</{node['name']}>")
+    return "".join(html)
+
+
+# `(text, before the one pass scanner, now)`. Before it, the character after emphasis, code and
+# automatic links was dropped, image alt text kept its `[`, every `[` was an inline link (so
+# references were never found) and emphasis was three regexes tried in order.
+INLINE_TREES = [
+    ("[ref][r]", '<a class="inline-link" href="r]">ref</a>', '<a class="ref" ref="True" refId="r">ref</a>'),
+    ("[id]: http://u", '<a class="inline-link" href=" http://u">id</a>', '<a class="ref-def" href="http://u" ref="True" refId="id">id</a>'),
+    ("[x]", "AssertionError", "[x]"),
+    ("[x](", "IndexError", "[x]("),
+    ("![alt](src)", '<img href="src">[alt</img>', '<img href="src">alt</img>'),
+    ("a **b** c", "a <strong>b</strong>c", "a <strong>b</strong> c"),
+    ("`c` d", '<code class="codespan">c</code>d', '<code class="codespan">c</code> d'),
+    ("<http://u> d", '<a class="automatic-link" href="http://u">http://u</a>d', '<a class="automatic-link" href="http://u">http://u</a> d'),
+    # Emphasis nests
+    ("*a **b** c*", "<em>a </em>b*<em> c</em>", "<em>a <strong>b</strong> c</em>"),
+    # Runs next to whitespace on the wrong side neither open nor close
+    ("2 * 3 * 4", "2 <em> 3 </em>4", "2 * 3 * 4"),
+    # A backslash keeps the next character as text
+    ("\\*a\\*", "\\<em>a\\</em>", "\\*a\\*"),
+    # Runs of different lengths pair their innermost characters, the rest is text
+    ("***b**", "<strong>*b</strong>", "*<strong>b</strong>"),
+    # Runs of different characters are separate runs
+    ("__*x*__", '<strong class="bold-italic"><em>x</em></strong>', "<strong><em>x</em></strong>"),
+    ("*__x__*", '<strong class="italic-bold"><em>x</em></strong>', "<em><strong>x</strong></em>"),
+    ("snake_case_name", "snake<em>case</em>ame", "snake<em>case</em>name"),
+    ("a*b*c", "a<em>b</em>", "a<em>b</em>c"),
+    # Unchanged
+    ("*a*", "<em>a</em>", "<em>a</em>"),
+    ("***d***", '<strong class="italic-bold"><em>d</em></strong>', '<strong class="italic-bold"><em>d</em></strong>'),
+    ("**a*", "*<em>a</em>", "*<em>a</em>"),
+    ("*a\nb*", "*a\nb*", "*a\nb*"),
+]
+
+
+@pytest.mark.parametrize("source, before, now", INLINE_TREES)
+def test_inline_trees(source, before, now):
+    assert inline_html(MDParser().parse_text(source)) == now
+
+
+def test_emphasis_tags():
+    from BetterMD.parse.markdown import Extension
+
+    # The emphasis tags can be looked up and overridden like any other
+    class Bold(Extension):
+        @property
+        def name(self):
+            return "bold"
+
+        @property
+        def top_level_tags(self):
+            return {}
+
+        @property
+        def text_tags(self):
+            return {"bold": {"pattern": r"\*+|_+", "trigger": "*_", "handler": self.bold, "delimiter": 2}}
+
+        def bold(self, char, children):
+            return self.create_element("b", children=children)
+
+    assert set(MDParser().exts[0].text_tags) >= {"bold_and_italic", "bold", "italic"}
+    MDParser.add_extension(Bold)
+    try:
+        assert inline_html(MDParser().parse_text("**a *b*** ***c***")) == '<b>a <em>b</em></b> <strong class="italic-bold"><em>c</em></strong>'
+    finally:
+        MDParser.remove_extension(Bold)
+
+
+def test_inline_text_stays_text():
+    parse = MDParser().parse_text
+    for source in ["a * b", "a ** b", "\\*a*", "*a\nb*", "[x] y", "[x", "![x", "<a", "`a"]:
+        assert "".join(node["content"] for node in parse(source) if node["type"] == "text") == source, source
+
+
+def test_long_paragraph():
+    unit = "some **bold** and *it* text [l](http://x) `c` plain "
+    ret = MDParser().parse_text(unit * 20000 + "[ " * 20000 + "** " * 20000)
+    assert len([node for node in ret if node["type"] == "element"]) == 4 * 20000
+
+
+def test_block_tags_without_trigger():
+    from BetterMD.parse.markdown import Extension
+
+    class Note(Extension):
+        @property
+        def name(self):
+            return "note"
+
+        @property
+        def top_level_tags(self):
+            return {"note": {"pattern": r"^!!! (.*)$", "handler": self.note, "end": None}}
+
+        @property
+        def text_tags(self):
+            return {}
+
+        def note(self, line):
+            self.end_block()
+            return self.create_element("aside", children=[self.create_text(line[4:])])
+
+    MDParser.add_extension(Note)
+    try:
+        assert MDParser().parse("para\n!!! careful\n# h") == [
+            text("para"),
+            element("aside", children=[text("careful")]),
+            element("h1", {"id": "h"}, [text("h")]),
+        ]
+    finally:
+        MDParser.remove_extension(Note)
+
+
+def test_long_paragraph_lines():
+    lines = ["line **%d**" % i for i in range(50000)]
+    ret = MDParser().parse("\n".join(lines) + "\n\n> " + "\n> ".join(lines[:100]))
+    assert len(ret) == 2 * 50000 + 2
+    assert ret[-1]["name"] == "blockquote"
+
+
+def test_nested_blockquotes():
+    assert MDParser().parse("> a\n> > b\n> > - c\nlazy\n> d\n\nafter") == [
+        element("blockquote", children=[
+            text("a"),
+            element("blockquote", children=[
+                text("b"),
+                element("ul", {"class": ["list--"]}, [element("ul", {"class": ["list--"]}, [element("li", children=[text("c")])])]),
+                text("lazy\nd"),
+            ]),
+        ]),
+        element("br"),
+        text("after"),
+    ]
+
+
+def test_deeply_nested_blockquotes():
+    depth = 5000
+    node = MDParser().parse("> " * depth + "x\n" + "> " * depth + "y")[0]
+    for _ in range(depth - 1):
+        assert node["name"] == "blockquote" and len(node["children"]) == 1
+        node = node["children"][0]
+    assert node == element("blockquote", children=[text("x\ny")])
+
+
+PARALLEL_BLOCKS = [
+    "# Title {n}", "para {n}\nwith **bold**", "- a\n- b\n  - c", "1. one\n2. two", "> a\n> > b {n}",
+    "```py\n\ncode {n}\n\n```", "| a | b |\n|:-|-:|\n| {n} | x |", "| lone {n} |", "title: Doc {n}", "---",
+    # Missed by the pre-scan, split inside and parsed again
+    "```\r\n\r\ncode {n}\r\n```",
+]
+
+
+def test_parse_parallel():
+    rng = random.Random(0)
+    with ThreadPoolExecutor(3) as pool:
+        for _ in range(50):
+            md = "\n\n".join(rng.choice(PARALLEL_BLOCKS).format(n=n) for n in range(rng.randint(1, 200)))
+            parser, parallel = MDParser(), MDParser()
+            assert parallel.parse_parallel(md, segment_size=rng.randint(1, 300), executor=pool) == parser.parse(md)
+            assert parallel.head == parser.head
+
+    md = "\n\n".join(block.format(n=n) for n in range(100) for block in PARALLEL_BLOCKS)
+    assert MDParser().parse_parallel(md, processes=2, segment_size=1000) == MDParser().parse(md)
+
+
+def test_inline_memo(monkeypatch):
+    md = "\n\n".join(["**Yes** [docs](/a \"Docs\")", "N/A", "> **Yes** [docs](/a \"Docs\")", "`x` *y*"] * 3)
+    # Opt in
+    assert MDParser.inline_memo is None
+    expected = MDParser().parse(md)
+    compact = MDParser(compact=True).parse(md)
+
+    memo = InlineMemo()
+    monkeypatch.setattr(MDParser, "inline_memo", memo)
+    first = MDParser().parse(md)
+    assert first == expected
+    # Texts are recorded the second time they are seen (the quote holds the first text
+    # too) and used from the third
+    assert (memo.hits, memo.misses) == (6, 6)
+
+    # Every parse gets its own elements
+    strong, link = first[0], next(node for node in first if node["name"] == "a")
+    strong["children"].clear()
+    link["attributes"]["href"] = "changed"
+    assert MDParser().parse(md) == expected
+    assert MDParser(compact=True).parse(md) == compact
+
+    memo.clear()
+    assert MDParser(zero_copy=True).parse(md) == expected
+
+
+def test_extensions_can_refuse_the_inline_memo(monkeypatch):
+    from BetterMD.parse.markdown import Extension
+
+    class Footnote(Extension):
+        # Numbered in the order they are found, the same text gets another number
+        memoize = False
+
+        def init(self, parser):
+            super().init(parser)
+            self.count = 0
+
+        @property
+        def name(self):
+            return "footnote"
+
+        @property
+        def top_level_tags(self):
+            return {}
+
+        @property
+        def text_tags(self):
+            return {"footnote": {"pattern": r"\^\^", "trigger": "^", "handler": self.footnote}}
+
+        def footnote(self, match):
+            self.count += 1
+            return self.create_element("sup", children=[self.create_text(str(self.count))]), match.end()
+
+    memo = InlineMemo()
+    monkeypatch.setattr(MDParser, "inline_memo", memo)
+    MDParser.add_extension(Footnote)
+    try:
+        parsed = MDParser().parse("a^^\n\na^^\n\na^^")
+    finally:
+        MDParser.remove_extension(Footnote)
+
+    assert [node["children"][0]["content"] for node in parsed if node["name"] == "sup"] == ["1", "2", "3"]
+    assert (memo.hits, memo.misses) == (0, 0)
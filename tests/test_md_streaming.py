@@ -0,0 +1,49 @@
+import io
+
+from BetterMD import MD
+from BetterMD.parse import MDParser
+
+
+DOC = "# Log {n}\n\nentry **{n}** with `code`\nsecond line\n\n- a\n- b\n\n> quoted {n}\n\n```\nraw {n}\n```\n"
+
+
+def lines(count, consumed):
+    for n in range(count):
+        for line in DOC.format(n=n).splitlines(True):
+            consumed.append(line)
+            yield line
+
+
+def test_line_iterator_matches_string():
+    text = "".join(DOC.format(n=n) for n in range(50))
+    assert list(MDParser().iter_blocks(lines(50, []))) == MDParser().parse(text)
+    assert MDParser().parse(io.StringIO(text)) == MDParser().parse(text)
+    assert MDParser().parse(line.encode() for line in text.splitlines(True)) == MDParser().parse(text)
+    assert MDParser().parse((line.encode("utf-16-le") for line in text.splitlines(True)), "utf-16-le") == MDParser().parse(text)
+
+
+def test_lines_without_line_endings():
+    text = "".join(DOC.format(n=n) for n in range(50))
+    assert MDParser().parse(iter(["# Title", "", "para"])) == MDParser().parse("# Title\n\npara")
+    assert MDParser().parse(iter(text.splitlines())) == MDParser().parse(text)
+    assert list(MDParser().iter_blocks(line.rstrip("\n") for line in lines(50, []))) == MDParser().parse(text)
+    assert [elm.to_html() for elm in MD.iter_file(text.splitlines())] == [elm.to_html() for elm in MD.from_string(text)]
+
+
+def test_blocks_are_emitted_while_reading():
+    consumed = []
+    blocks = MDParser().iter_blocks(lines(10_000, consumed))
+    assert next(blocks)["name"] == "h1"
+    # Only the lines up to the end of the first block have been read
+    assert len(consumed) < 5
+    for _ in range(20):
+        next(blocks)
+    assert len(consumed) < 30
+    blocks.close()
+
+
+def test_md_iter_file():
+    text = "".join(DOC.format(n=n) for n in range(20))
+    expected = [elm.to_html() for elm in MD.from_string(text)]
+    assert [elm.to_html() for elm in MD.iter_file(io.BytesIO(text.encode()))] == expected
+    assert [elm.to_html() for elm in MD.iter_file(lines(20, []))] == expected
@@ -0,0 +1,97 @@
+import pytest
+
+from BetterMD import HTML, MD, SearchIndex
+from BetterMD.batch import TreeBuilder
+
+
+PAGE = "<div><h1>Search</h1><p>Full <b>text</b> search over pages</p><p>Text search</p><script>var text</script></div>"
+
+
+def test_terms_and_phrases():
+    page = HTML.from_string(PAGE)[0]
+    index = SearchIndex()
+    index.add("page", page)
+    index.add("other", MD.from_string("Some *text* here"))
+
+    assert [key for key, _ in index.search("TEXT")] == ["page", "other"]
+    # Across the inline `b`, but not from one paragraph into the next
+    assert index.search("full text search") == [("page", [(2, 2)])]
+    assert index.search("pages text") == []
+    assert index.search("var") == []
+
+    [(first, _), (second, _)] = index.search("text search")[0][1]
+    assert SearchIndex.element(page, first).to_html() == "<b>text</b>"
+    assert SearchIndex.element(page, second).text == "Text search"
+
+
+def test_trees():
+    trees = [TreeBuilder().element("p", {}, ["One ", TreeBuilder().element("em", {}, ["two"]), " three"])]
+    index = SearchIndex()
+    index.add("tree", trees)
+
+    assert index.search("one two three") == [("tree", [(0, 0)])]
+    assert SearchIndex.element(trees, 1)[0] == "em"
+
+
+def test_add_and_remove():
+    index = SearchIndex()
+    index.add("a", HTML.from_string("<p>old words</p>"))
+    index.add("a", HTML.from_string("<p>new words</p>"))
+    index.add("b", HTML.from_string("<p>more words</p>"))
+
+    assert index.search("old") == []
+    assert [key for key, _ in index.search("words")] == ["a", "b"]
+
+    index.remove("a")
+    assert [key for key, _ in index.search("words")] == ["b"]
+    assert len(index) == 1 and "a" not in index
+    with pytest.raises(KeyError):
+        index.remove("a")
+
+
+def test_save_and_load(tmp_path):
+    path = tmp_path / "pages.idx"
+    index = SearchIndex(path)
+    for n in range(20):
+        index.add(f"page{n}", HTML.from_string(f"<div><h2>Page {n}</h2><p>shared text {n % 3}</p></div>"))
+    expected = index.search("shared text 1")
+    index.save()
+    assert index.search("shared text 1") == expected
+
+    loaded = SearchIndex(path)
+    assert len(loaded) == 20
+    assert loaded.search("shared text 1") == expected
+
+    loaded.remove("page1")
+    loaded.add("page4", HTML.from_string("<p>replaced</p>"))
+    loaded.add("new", HTML.from_string("<p>shared text 1</p>"))
+    after = [key for key, _ in loaded.search("shared text 1")]
+    assert after == ["page7", "page10", "page13", "page16", "page19", "new"]
+
+    loaded.save()
+    again = SearchIndex(path)
+    assert [key for key, _ in again.search("shared text 1")] == after
+    assert [key for key, _ in again.search("replaced")] == ["page4"]
+    assert len(again) == 20
+
+
+def test_not_an_index(tmp_path):
+    path = tmp_path / "other"
+    path.write_bytes(b"not an index at all, just some bytes" * 10)
+    with pytest.raises(ValueError):
+        SearchIndex(path)
+
+
+def test_saving_after_every_document_of_a_term_is_removed(tmp_path):
+    index = SearchIndex(tmp_path / "pages.idx")
+    index.add("a", HTML.from_string("<p>beta</p>"))
+    index.save()
+    index.remove("a")
+    index.save()
+    assert index.search("beta") == []
+
+    index.add("b", HTML.from_string("<p>beta</p>"))
+    index.add("c", HTML.from_string("<p>beta gamma</p>"))
+    index.save()
+    assert index.search("beta") == [("b", [(0, 0)]), ("c", [(0, 0)])]
+    assert SearchIndex(tmp_path / "pages.idx").search("gamma") == [("c", [(0, 1)])]
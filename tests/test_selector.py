@@ -0,0 +1,82 @@
+import pytest
+
+from BetterMD import HTML
+from BetterMD.elements import Div, P
+from BetterMD.elements.selector import compile_selector
+
+
+DOC = (
+    '<div id="root" class="page">'
+    '<p id="a" class="x y" data-k="1">one <b class="x">two</b></p>'
+    '<div id="b" style="color:red"><p class="y" data-k="1">one two</p><span lang="en-GB">three</span><p>four</p></div>'
+    '</div>'
+)
+
+
+def ids(symbols):
+    return [symbol.get_prop("id") or type(symbol).__name__ for symbol in symbols]
+
+
+@pytest.mark.parametrize("selector, expected", [
+    ("p", ["a", "P", "P"]),
+    ("p.y", ["a", "P"]),
+    ("#b p", ["P", "P"]),
+    ("#root > .x", ["a"]),
+    ("div b", ["B"]),
+    ("[data-k=1]", ["a", "P"]),
+    ("[data-k]", ["a", "P"]),
+    ("span[lang|=en]", ["Span"]),
+    ("[style*=red] > *", ["P", "Span", "P"]),
+    ("[class~='y']", ["a", "P"]),
+    ("p:first-child", ["a", "P"]),
+    ("p:last-child", ["P"]),
+    ("div > :nth-child(2)", ["b", "Span"]),
+    (":nth-child(odd)", ["a", "B", "P", "P"]),
+    ("#b :nth-last-child(-n+2)", ["Span", "P"]),
+    ("span, #root > .x", ["a", "Span"]),
+])
+def test_select(selector, expected):
+    root = HTML.from_string(DOC)[0]
+    assert ids(root.inner_html.select(selector)) == expected
+
+
+def test_select_is_scoped_to_the_subtree():
+    root = HTML.from_string(DOC)[0].ensure_prepared()
+    a, b = root.children
+
+    # Ancestors outside the subtree still count for combinators, as in browsers
+    assert ids(b.inner_html.select("#root p")) == ["P", "P"]
+    assert ids(b.inner_html.select(".x")) == []
+    assert b.inner_html.select_one("p").text == "one two"
+    assert a.inner_html.select_one("span") is None
+
+
+def test_select_sees_changes():
+    root = HTML.from_string(DOC)[0]
+    root.ensure_prepared()
+
+    root.children[1].add_child(HTML.from_string("<p class='x'>five</p>")[0])
+    assert [p.text for p in root.inner_html.select("#b > p.x:last-child")] == ["five"]
+
+
+def test_attributes_as_written():
+    root = Div(inner=[P(**{"data-k": 1}), P(**{"data-k": "1"}), P(**{"data-k": True}), P(**{"class": ["a", "b"]})])
+
+    assert len(root.inner_html.select("[data-k='1']")) == 2
+    assert len(root.inner_html.select("p[data-k='']")) == 1
+    assert len(root.inner_html.select("[class='a b']")) == 1
+
+    # Equal numbers share one index key but are written differently
+    assert len(Div(inner=[P(hidden=True), P(hidden=1)]).inner_html.select('[hidden="1"]')) == 1
+    assert len(Div(inner=[P(w=1.0), P(w=1)]).inner_html.select('[w="1"]')) == 1
+    assert len(Div(inner=[P(w=1), P(w=1.0)]).inner_html.select('[w="1.0"]')) == 1
+
+
+@pytest.mark.parametrize("selector", ["", "p >", "> p", "p[", "p..x", "a,,b", ":nth-child(x)", ".x p:nth-child"])
+def test_invalid_selectors(selector):
+    with pytest.raises(ValueError):
+        compile_selector(selector)
+
+
+def test_selectors_are_compiled_once():
+    assert compile_selector("div > p.x") is compile_selector("div > p.x")
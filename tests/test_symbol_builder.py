@@ -0,0 +1,41 @@
+from BetterMD import HTML, MD
+from BetterMD.elements import Symbol
+from BetterMD.parse import HTMLParser, MDParser
+
+from .test_backends import CORPUS
+
+
+MD_CORPUS = [
+    "# Title\n\nsome **bold** and *it* text [link](http://x) `c`\n\n- a\n- b\n  - c\n\n1. one\n2. two\n",
+    "> quote **b**\n> more\n\n```py\nx = 1\n```\n\n---\n",
+    "| a | b |\n|:--|--:|\n| 1 | 2 |\n",
+]
+
+
+def via_tree(parsed):
+    return [Symbol.collection.find_symbol(elm["name"], raise_errors=True).parse(elm).to_html() for elm in parsed]
+
+
+def render(symbols):
+    return [symbol.to_html() for symbol in symbols]
+
+
+def test_html_direct_matches_tree():
+    for html in CORPUS:
+        expected = via_tree(HTMLParser().parse(html))
+        assert render(Symbol.from_html(html)) == expected
+        assert render(Symbol.from_html(html, zero_copy=True)) == expected
+        assert render(Symbol.from_html(html, backend="stdlib")) == expected
+
+
+def test_md_direct_matches_tree():
+    for md in MD_CORPUS:
+        expected = via_tree(MDParser().parse(md))
+        assert render(Symbol.from_md(md)) == expected
+        assert render(Symbol.from_md(md, zero_copy=True)) == expected
+
+
+def test_tag_dispatch_is_cached():
+    collection = Symbol.collection
+    HTML.from_string("<DIV><p>x</p></DIV>")
+    assert collection.names_cache["DIV"] is collection.find_symbol("div")
@@ -0,0 +1,99 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from BetterMD import HTML, MD
+from BetterMD.parse import MDParser
+from BetterMD.parse.markdown import Extension
+
+
+THREADS = 8
+
+HTML_DOCS = [
+    f'<div id="d{i}" class="a b"><p>Para {i} <b>bold</b> <a href="/{i}">link</a></p>'
+    f'<ul>{"<li>item</li>" * (i % 5 + 1)}</ul><!-- c --><pre>  raw {i} </pre></div>'
+    for i in range(64)
+]
+
+MD_DOCS = [
+    f"# Title {i}\n\nSome **bold** text {i}\n\n- one\n- two\n\n```py\nx = {i}\n```\n\n> quoted {i}\n"
+    for i in range(64)
+]
+
+
+def render_html(html):
+    return [elm.to_html() for elm in HTML.from_string(html, zero_copy=True)]
+
+
+def render_md(md):
+    return [elm.to_html() for elm in MD.from_string(md)]
+
+
+def run_concurrently(func, docs):
+    barrier = threading.Barrier(THREADS)
+
+    def task(doc):
+        barrier.wait()
+        return func(doc)
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        # Every thread parses every document so the same inputs really overlap
+        return list(pool.map(task, [doc for doc in docs for _ in range(THREADS)]))
+
+
+def test_concurrent_html_parsing_matches_sequential():
+    expected = [render_html(html) for html in HTML_DOCS for _ in range(THREADS)]
+    assert run_concurrently(render_html, HTML_DOCS) == expected
+
+
+def test_concurrent_md_parsing_matches_sequential():
+    expected = [render_md(md) for md in MD_DOCS for _ in range(THREADS)]
+    assert run_concurrently(render_md, MD_DOCS) == expected
+
+
+def test_shared_tree_is_prepared_once():
+    for _ in range(10):
+        doc = HTML.from_string("<div>" + "<p class='x'>text</p>" * 50 + "</div>")[0]
+        barrier = threading.Barrier(THREADS)
+
+        def render():
+            barrier.wait()
+            return doc.to_html()
+
+        with ThreadPoolExecutor(THREADS) as pool:
+            results = list(pool.map(lambda _: render(), range(THREADS)))
+
+        assert len(set(results)) == 1
+        assert len(doc.inner_html.get_elements_by_class_name("x")) == 50
+
+
+def test_extensions_can_change_while_parsing():
+    class Noop(Extension):
+        @property
+        def name(self):
+            return "noop"
+
+        @property
+        def top_level_tags(self):
+            return {}
+
+        @property
+        def text_tags(self):
+            return {}
+
+    stop = threading.Event()
+
+    def toggle():
+        while not stop.is_set():
+            MDParser.add_extension(Noop)
+            MDParser.remove_extension(Noop)
+
+    toggler = threading.Thread(target=toggle)
+    toggler.start()
+    try:
+        expected = [render_md(md) for md in MD_DOCS]
+        assert run_concurrently(render_md, MD_DOCS) == [r for r in expected for _ in range(THREADS)]
+    finally:
+        stop.set()
+        toggler.join()
+
+    assert MDParser.get_extension("noop") is None